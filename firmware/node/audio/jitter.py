@@ -0,0 +1,347 @@
+"""Voice session reassembly and adaptive jitter buffer (PROTOCOL_SPEC §3.4-3.6)"""
+
+import asyncio
+import math
+import time
+from array import array
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+from protocol.packet import PacketType, VoicePacket
+
+FRAME_DURATION = 0.04   # Codec2 700C/1300/1600 frame length (s)
+MAX_FRAME = 64          # Largest encoded frame kept per slot (bytes)
+JITTER_GAIN = 1 / 16    # RFC 3550 interarrival jitter smoothing
+JITTER_MARGIN = 4       # Target delay is one frame plus this many jitter estimates
+OVERRUN_SLACK = 2       # Frames above target before one is dropped to cut latency
+
+_SEQ_MOD = 0x10000
+_SEQ_HALF = 0x8000
+
+# (source_id, session_id, frame, concealed); the frame view is only valid during the call
+VoiceSink = Callable[[int, int, memoryview, bool], None]
+
+
+class _Session:
+    """One voice stream: a ring of frame slots indexed by extended sequence"""
+
+    def __init__(self, slots: int, max_frame: int):
+        self.slots = slots
+        self.mask = slots - 1
+        self.max_frame = max_frame
+        self.data = bytearray(slots * max_frame)
+        self.view = memoryview(self.data)
+        self.lengths = array('H', bytes(2 * slots))
+        self.seqs = array('q', [-1]) * slots
+        self.arrivals = array('d', bytes(8 * slots))
+        self.last = bytearray(max_frame)
+        self.last_view = memoryview(self.last)
+        self._empty = array('q', [-1]) * slots
+
+    def reset(self, source_id: int, session_id: int, codec: int, now: float):
+        self.source_id = source_id
+        self.session_id = session_id
+        self.codec = codec
+        self.seqs[:] = self._empty
+        self.highest = -1         # Highest extended sequence stored
+        self.cursor = 0           # Next extended sequence to play
+        self.final: Optional[int] = None
+        self.started = False
+        self.opened = now
+        self.first_arrival = now
+        self.last_arrival = now
+        self.last_transit: Optional[float] = None
+        self.jitter = 0.0
+        self.last_len = 0
+        self.repeats = 0
+
+        self.received = 0
+        self.played = 0
+        self.lost = 0
+        self.inserted = 0
+        self.skipped = 0
+        self.late = 0
+        self.duplicates = 0
+        self.overflow = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def extend(self, seq: int) -> int:
+        """Map a 16-bit sequence number onto the session's extended sequence"""
+        if self.highest < 0:
+            return _SEQ_MOD + seq
+        return self.highest + ((seq - self.highest + _SEQ_HALF) & 0xFFFF) - _SEQ_HALF
+
+    def put(self, seq: int, frame, now: float, frame_duration: float):
+        ext = self.extend(seq)
+        if self.highest < 0:
+            self.highest = self.cursor = ext
+            self.first_arrival = now
+        elif ext < self.cursor:
+            if self.started or self.highest - ext >= self.slots:
+                self.late += 1
+                return
+            self.cursor = ext  # Reordered ahead of playout start
+        if ext >= self.cursor + self.slots:
+            self.overflow += 1
+            return
+        slot = ext & self.mask
+        if self.seqs[slot] == ext:
+            self.duplicates += 1
+            return
+
+        transit = now - ext * frame_duration
+        if self.last_transit is not None:
+            self.jitter += (abs(transit - self.last_transit) - self.jitter) * JITTER_GAIN
+        self.last_transit = transit
+
+        size = min(len(frame), self.max_frame)
+        start = slot * self.max_frame
+        self.data[start:start + size] = frame[:size]
+        self.lengths[slot] = size
+        self.seqs[slot] = ext
+        self.arrivals[slot] = now
+        if ext > self.highest:
+            self.highest = ext
+        self.received += 1
+        self.last_arrival = now
+
+
+class VoiceReceiver:
+    """Reassembles concurrent voice sessions and plays them out on a steady clock
+
+    Sessions are keyed by (source, session ID) and drawn from a pool of
+    preallocated rings, so the receive path does not allocate per frame.
+    Each frame is stored at its sequence number's slot, which absorbs
+    reordering and drops duplicates and frames that arrive after their
+    playout time.
+
+    Playout starts once the first frame has waited the target delay: one
+    frame plus ``JITTER_MARGIN`` times the RFC 3550 interarrival jitter,
+    clamped to [min_delay, max_delay]. Every ``tick`` releases one frame per
+    session. A missing frame with later ones already buffered is concealed
+    and counted lost. An empty buffer gets a concealment frame without
+    advancing, which grows the delay when jitter rises. A buffer more than
+    ``OVERRUN_SLACK`` frames over target drops a frame to shrink it again.
+    Concealment repeats the last frame up to ``max_repeats`` times and then
+    sends silence.
+    """
+
+    def __init__(self, sink: VoiceSink, frame_duration: float = FRAME_DURATION,
+                 max_sessions: int = 4, slots: int = 64, max_frame: int = MAX_FRAME,
+                 min_delay: float = FRAME_DURATION, max_delay: float = 1.0,
+                 max_repeats: int = 2, idle_timeout: float = 2.0,
+                 clock: Callable[[], float] = time.monotonic):
+        if slots & (slots - 1) or slots < 1:
+            raise ValueError("slots must be a power of two")
+        self.sink = sink
+        self.frame_duration = frame_duration
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.max_repeats = max_repeats
+        self.idle_timeout = idle_timeout
+        self.clock = clock
+        self._free = [_Session(slots, max_frame) for _ in range(max_sessions)]
+        self._sessions: Dict[Tuple[int, int], _Session] = {}
+        self._silence = memoryview(bytes(max_frame))
+        self.finished: Deque[dict] = deque(maxlen=32)
+        self._closed: Deque[Tuple[int, int]] = deque(maxlen=32)
+        self.rejected = 0
+        self.stale = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def on_packet(self, packet, now: Optional[float] = None) -> bool:
+        """Feed a received VOICE_* packet (RoamENPacket or PacketView).
+
+        Returns:
+            True if the packet was a voice packet for an accepted session
+        """
+        packet_type = packet.packet_type
+        if packet_type not in (PacketType.VOICE_DATA, PacketType.VOICE_START,
+                               PacketType.VOICE_END):
+            return False
+        payload = packet.payload
+        if len(payload) < 4:
+            return False
+        if now is None:
+            now = self.clock()
+
+        if packet_type == PacketType.VOICE_DATA:
+            session_id, seq = VoicePacket.DATA.unpack_from(payload)
+            session = self._open(packet.source_id, session_id, VoicePacket.CODEC2, now)
+            if session is None:
+                return False
+            session.put(seq, payload[VoicePacket.DATA.size:], now, self.frame_duration)
+        elif packet_type == PacketType.VOICE_START:
+            codec, _, session_id = VoicePacket.START.unpack_from(payload)
+            session = self._open(packet.source_id, session_id, codec, now, reopen=True)
+            if session is None:
+                return False
+            session.codec = codec
+        else:
+            session_id, final = VoicePacket.END.unpack_from(payload)
+            session = self._sessions.get((packet.source_id, session_id))
+            if session is None:
+                return False
+            session.final = session.extend(final) if session.highest >= 0 else -1
+            session.last_arrival = now
+        return True
+
+    def target_delay(self, session: _Session) -> float:
+        delay = self.frame_duration + JITTER_MARGIN * session.jitter
+        return min(max(delay, self.min_delay), self.max_delay)
+
+    def tick(self, now: Optional[float] = None) -> int:
+        """Release one frame per playing session.
+
+        Returns:
+            Number of frames handed to the sink
+        """
+        if now is None:
+            now = self.clock()
+        released = 0
+        for key, session in list(self._sessions.items()):
+            if self._play(session, now):
+                released += 1
+            elif self._finished(session, now):
+                self._close(key, session)
+        return released
+
+    async def run(self):
+        """Call ``tick`` every frame period on absolute deadlines (no drift)"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while True:
+            self.tick(self.clock())
+            deadline += self.frame_duration
+            delay = deadline - loop.time()
+            if delay < -self.frame_duration:
+                # Fell behind by more than a frame: resync instead of bursting
+                deadline = loop.time()
+                delay = 0.0
+            await asyncio.sleep(max(delay, 0.0))
+
+    def _open(self, source_id: int, session_id: int, codec: int, now: float,
+              reopen: bool = False) -> Optional[_Session]:
+        key = (source_id, session_id)
+        session = self._sessions.get(key)
+        if session is not None:
+            return session
+        closed = key in self._closed
+        if closed and not reopen:
+            # Straggler from a session that has already ended
+            self.stale += 1
+            return None
+        if not self._free:
+            self.rejected += 1
+            return None
+        if closed:
+            # VOICE_START: the sender is reusing the session id for a new call
+            self._closed.remove(key)
+        session = self._free.pop()
+        session.reset(source_id, session_id, codec, now)
+        self._sessions[key] = session
+        return session
+
+    def _finished(self, session: _Session, now: float) -> bool:
+        if session.final is not None and session.cursor > session.final:
+            return True
+        return now - session.last_arrival > self.idle_timeout
+
+    def _close(self, key: Tuple[int, int], session: _Session):
+        self.finished.append(self._session_metrics(session))
+        self._closed.append(key)
+        del self._sessions[key]
+        self._free.append(session)
+
+    def _play(self, session: _Session, now: float) -> bool:
+        if not session.started:
+            if session.highest < 0 or now - session.first_arrival < self.target_delay(session):
+                return False
+            session.started = True
+        if session.final is not None and session.cursor > session.final:
+            return False
+
+        seqs = session.seqs
+        cursor = session.cursor
+        slot = cursor & session.mask
+        if seqs[slot] == cursor:
+            target_frames = math.ceil(self.target_delay(session) / self.frame_duration)
+            if (session.highest - cursor > target_frames + OVERRUN_SLACK
+                    and seqs[(cursor + 1) & session.mask] == cursor + 1):
+                # Too much buffered: drop the oldest frame to cut latency
+                seqs[slot] = -1
+                session.skipped += 1
+                cursor = session.cursor = cursor + 1
+                slot = cursor & session.mask
+            self._release(session, slot, now)
+            return True
+
+        if session.highest > cursor or session.final is not None:
+            # Later frames (or the end) are in: this one is lost or late
+            session.lost += 1
+            session.cursor += 1
+        elif now - session.last_arrival > self.idle_timeout:
+            return False
+        else:
+            # Buffer ran dry: stretch by one frame and wait for it
+            session.inserted += 1
+        self._conceal(session)
+        return True
+
+    def _release(self, session: _Session, slot: int, now: float):
+        size = session.lengths[slot]
+        start = slot * session.max_frame
+        session.last[:size] = session.view[start:start + size]
+        session.last_len = size
+        session.repeats = 0
+        session.seqs[slot] = -1
+        session.cursor += 1
+        session.played += 1
+        latency = now - session.arrivals[slot]
+        session.latency_total += latency
+        if latency > session.latency_max:
+            session.latency_max = latency
+        self.sink(session.source_id, session.session_id, session.last_view[:size], False)
+
+    def _conceal(self, session: _Session):
+        if session.repeats < self.max_repeats:
+            frame = session.last_view[:session.last_len]
+        else:
+            frame = self._silence[:session.last_len]
+        session.repeats += 1
+        self.sink(session.source_id, session.session_id, frame, True)
+
+    def _session_metrics(self, session: _Session) -> dict:
+        expected = session.played + session.lost
+        return {
+            'source': session.source_id,
+            'session_id': session.session_id,
+            'codec': session.codec,
+            'received': session.received,
+            'played': session.played,
+            'lost': session.lost,
+            'concealed': session.lost + session.inserted,
+            'inserted': session.inserted,
+            'skipped': session.skipped,
+            'late': session.late,
+            'duplicates': session.duplicates,
+            'overflow': session.overflow,
+            'loss_ratio': session.lost / expected if expected else 0.0,
+            'jitter': session.jitter,
+            'target_delay': self.target_delay(session),
+            'latency_mean': session.latency_total / session.played if session.played else 0.0,
+            'latency_max': session.latency_max,
+        }
+
+    def metrics(self) -> dict:
+        """Per-session latency and loss for active and recently finished sessions"""
+        return {
+            'active': {f"{source}:{session_id}": self._session_metrics(session)
+                       for (source, session_id), session in self._sessions.items()},
+            'finished': list(self.finished),
+            'rejected': self.rejected,
+            'stale': self.stale,
+        }
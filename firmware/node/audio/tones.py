@@ -0,0 +1,265 @@
+"""Alert tone bank and priority-aware alert playback (PROTOCOL_SPEC §3.7)"""
+
+import asyncio
+import mmap
+import os
+import threading
+import wave
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from protocol import crc
+from protocol.packet import AlertPacket, PacketType, Priority
+
+SAMPLE_RATE = 8000
+AMPLITUDE = 32767
+BLOCK = 160  # 20 ms at 8 kHz: how quickly a preempted tone goes quiet
+
+# Tone IDs carried in the ALERT payload
+STANDARD = 1
+URGENT = 2
+EMERGENCY = 3
+
+# tone_id -> (name, frequencies in Hz (0 = silence), durations in s)
+TONES: Dict[int, Tuple[str, Sequence[float], Sequence[float]]] = {
+    STANDARD: ('standard', (800, 1000), (0.3, 0.3)),
+    URGENT: ('urgent', (800, 1200, 800, 1200, 800), (0.2, 0.2, 0.2, 0.2, 0.2)),
+    EMERGENCY: ('emergency', (600, 1200, 600, 1200, 600, 1200),
+                (0.15, 0.15, 0.15, 0.15, 0.15, 0.15)),
+}
+
+# Priority a tone plays at when the alert does not say otherwise
+TONE_PRIORITY = {
+    STANDARD: Priority.NORMAL,
+    URGENT: Priority.URGENT,
+    EMERGENCY: Priority.EMERGENCY,
+}
+
+
+def tone_for_alert(alert_type: int) -> int:
+    """Tone ID for an ALERT type (9 = emergency, 2 = urgent, others standard)"""
+    if alert_type == 9:
+        return EMERGENCY
+    if alert_type == 2:
+        return URGENT
+    return STANDARD
+
+
+def synthesize(frequencies: Sequence[float], durations: Sequence[float],
+               sample_rate: int = SAMPLE_RATE, amplitude: int = AMPLITUDE) -> 'np.ndarray':
+    """Render a sequence of tones as int16 PCM in one vectorised pass.
+
+    The phase is the running sum of the per-sample frequency, so it carries
+    across tone changes and the waveform has no clicks at the boundaries.
+
+    Args:
+        frequencies: Tone frequencies in Hz, 0 for silence
+        durations: Seconds for each tone
+        sample_rate: Output sample rate
+        amplitude: Peak sample value
+
+    Returns:
+        1-D int16 array
+    """
+    counts = np.round(np.asarray(durations, dtype=np.float64) * sample_rate).astype(np.int64)
+    freq = np.repeat(np.asarray(frequencies, dtype=np.float64), counts)
+    phase = np.cumsum(freq) * (2 * np.pi / sample_rate)
+    phase -= phase[0] if len(phase) else 0.0
+    samples = np.sin(phase)
+    samples *= amplitude * (freq != 0)
+    return samples.astype(np.int16)
+
+
+def write_wav(path: str, pcm: 'np.ndarray', sample_rate: int = SAMPLE_RATE):
+    """Write mono int16 PCM as a WAV file"""
+    with wave.open(path, 'w') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm.tobytes())
+
+
+class ToneBank:
+    """int16 PCM for every tone ID, synthesised once and kept ready
+
+    Tones are rendered on first use (or all at once by ``preload``) and held
+    in memory. With a ``cache_dir`` the PCM is also written there as raw
+    int16, named after the tone's definition, and later starts map those
+    files read-only instead of synthesising, so the pages are shared and
+    loaded by the OS on demand.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, sample_rate: int = SAMPLE_RATE,
+                 tones: Optional[Dict[int, Tuple[str, Sequence[float], Sequence[float]]]] = None):
+        self.cache_dir = cache_dir
+        self.sample_rate = sample_rate
+        self.tones = TONES if tones is None else tones
+        self._pcm: Dict[int, 'np.ndarray'] = {}
+        self._maps: List[mmap.mmap] = []
+        self._lock = threading.Lock()
+        self.synthesized = 0
+        self.mapped = 0
+
+    def __contains__(self, tone_id: int) -> bool:
+        return tone_id in self.tones
+
+    def get(self, tone_id: int) -> 'np.ndarray':
+        """PCM for ``tone_id`` (read-only); raises KeyError for unknown IDs"""
+        pcm = self._pcm.get(tone_id)
+        if pcm is None:
+            with self._lock:
+                pcm = self._pcm.get(tone_id)
+                if pcm is None:
+                    pcm = self._pcm[tone_id] = self._load(tone_id)
+        return pcm
+
+    def preload(self):
+        """Make every tone ready (call at node start)"""
+        for tone_id in self.tones:
+            self.get(tone_id)
+
+    async def warm(self):
+        """``preload`` in a worker thread so node start-up is not blocked"""
+        await asyncio.get_running_loop().run_in_executor(None, self.preload)
+
+    def cache_path(self, tone_id: int) -> Optional[str]:
+        if self.cache_dir is None:
+            return None
+        name, frequencies, durations = self.tones[tone_id]
+        key = crc.crc16(repr((tuple(frequencies), tuple(durations))).encode())
+        return os.path.join(self.cache_dir, f"{name}-{self.sample_rate}-{key:04x}.pcm")
+
+    def write_wav(self, tone_id: int, path: str):
+        write_wav(path, self.get(tone_id), self.sample_rate)
+
+    def close(self):
+        self._pcm.clear()
+        for mapped in self._maps:
+            mapped.close()
+        self._maps.clear()
+
+    def _load(self, tone_id: int) -> 'np.ndarray':
+        _, frequencies, durations = self.tones[tone_id]
+        path = self.cache_path(tone_id)
+        if path is not None and os.path.exists(path) and os.path.getsize(path):
+            with open(path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps.append(mapped)
+            self.mapped += 1
+            return np.frombuffer(mapped, dtype=np.int16)
+
+        pcm = synthesize(frequencies, durations, self.sample_rate)
+        pcm.setflags(write=False)
+        self.synthesized += 1
+        if path is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            partial = f"{path}.{os.getpid()}.tmp"
+            with open(partial, 'wb') as f:
+                f.write(pcm.tobytes())
+            os.replace(partial, path)
+        return pcm
+
+
+class _Voice:
+    __slots__ = ('tone_id', 'priority', 'pcm', 'position', 'repeats')
+
+    def __init__(self, tone_id: int, priority: int, pcm: 'np.ndarray', repeats: int):
+        self.tone_id = tone_id
+        self.priority = priority
+        self.pcm = pcm
+        self.position = 0
+        self.repeats = repeats
+
+
+class AlertPlayer:
+    """Mixes alert tones for the audio output, higher priority first
+
+    ``read`` is meant to be called from the audio callback and fills one
+    block from preallocated buffers. A new tone with a higher priority than
+    what is playing cuts those tones off at the next block; tones of equal
+    priority are mixed (with saturation); a lower-priority tone is not
+    started while a higher one is sounding.
+    """
+
+    def __init__(self, bank: ToneBank, block: int = BLOCK):
+        self.bank = bank
+        self.block = block
+        self._voices: List[_Voice] = []
+        self._lock = threading.Lock()
+        self._mix = np.zeros(block, dtype=np.int32)
+        self._out = np.zeros(block, dtype=np.int16)
+        self.preempted = 0
+        self.suppressed = 0
+
+    @property
+    def playing(self) -> List[int]:
+        """Tone IDs currently sounding"""
+        return [voice.tone_id for voice in self._voices]
+
+    def play(self, tone_id: int, priority: Optional[int] = None, repeats: int = 1) -> bool:
+        """Start a tone; returns False if a higher-priority tone is sounding"""
+        if priority is None:
+            priority = TONE_PRIORITY.get(tone_id, Priority.NORMAL)
+        priority = int(priority)
+        pcm = self.bank.get(tone_id)
+        with self._lock:
+            top = max((voice.priority for voice in self._voices), default=-1)
+            if priority < top:
+                self.suppressed += 1
+                return False
+            if priority > top and self._voices:
+                self.preempted += len(self._voices)
+                self._voices.clear()
+            self._voices.append(_Voice(tone_id, priority, pcm, repeats))
+        return True
+
+    def play_alert(self, packet) -> bool:
+        """Sound the tone an ALERT or EMERGENCY_BROADCAST packet asks for"""
+        if packet.packet_type == PacketType.EMERGENCY_BROADCAST:
+            return self.play(EMERGENCY, Priority.EMERGENCY)
+        if packet.packet_type != PacketType.ALERT or len(packet.payload) < 2:
+            return False
+        tone_id = packet.payload[1]
+        if tone_id not in self.bank:
+            tone_id = tone_for_alert(packet.payload[0] & AlertPacket.TYPE_MASK)
+        return self.play(tone_id, packet.priority)
+
+    def stop(self, tone_id: Optional[int] = None):
+        """Silence one tone, or everything (e.g. when the alert is acknowledged)"""
+        with self._lock:
+            self._voices = [voice for voice in self._voices
+                            if tone_id is not None and voice.tone_id != tone_id]
+
+    def read(self, frames: Optional[int] = None) -> 'np.ndarray':
+        """Next block of mixed int16 PCM (silence when idle).
+
+        The returned array is reused by the next call; copy it (or call
+        ``tobytes``) if it has to outlive the audio callback.
+        """
+        if frames is None:
+            frames = self.block
+        if frames > len(self._mix):
+            self._mix = np.zeros(frames, dtype=np.int32)
+            self._out = np.zeros(frames, dtype=np.int16)
+        mix = self._mix[:frames]
+        mix[:] = 0
+        with self._lock:
+            finished = False
+            for voice in self._voices:
+                filled = 0
+                while filled < frames and voice.repeats:
+                    chunk = voice.pcm[voice.position:voice.position + frames - filled]
+                    mix[filled:filled + len(chunk)] += chunk
+                    filled += len(chunk)
+                    voice.position += len(chunk)
+                    if voice.position >= len(voice.pcm):
+                        voice.position = 0
+                        voice.repeats -= 1
+                finished |= not voice.repeats
+            if finished:
+                self._voices = [voice for voice in self._voices if voice.repeats]
+        np.clip(mix, -32768, 32767, out=mix)
+        out = self._out[:frames]
+        out[:] = mix
+        return out
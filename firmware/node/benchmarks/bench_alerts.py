@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Benchmark ALERT encodings: bytes on air and encode/decode cost"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from protocol.packet import AlertPacket, RoamENPacket
+from radio.scheduler import FREEDV_BITRATES, airtime
+
+# (alert_type, message) as a ward would actually send them
+CORPUS = [
+    (9, "Code Blue - cardiac arrest Ward 7 Bed 12"),
+    (9, "Code Blue Resus 2 A&E"),
+    (9, "Code Red - fire East Wing Second Floor"),
+    (9, "EVACUATE BUILDING - FIRE IN EAST WING"),
+    (9, "Fire TQ123456"),
+    (9, "Smoke reported Basement Corridor near Pharmacy"),
+    (9, "Crash team to ICU Bed 4 immediately"),
+    (9, "Trauma team to A&E Resus ambulance arriving ETA 5 minutes"),
+    (9, "Code Pink - infant abduction Maternity lockdown all exits"),
+    (9, "Code Black - bomb threat Main Entrance evacuate Block A"),
+    (9, "Code Orange - major incident expect 12 casualties"),
+    (9, "Oxygen supply failure Theatre 3"),
+    (9, "MAYDAY MAYDAY - Fire at TQ123456"),
+    (9, "Cardiac arrest Car Park level 2 near Lift B"),
+    (2, "Stroke team to Emergency Department Bay 6"),
+    (2, "Sepsis alert Ward 12 Bed 3"),
+    (2, "Rapid response to Ward 9 Side Room 2"),
+    (2, "Patient fall Ward 4 Bed 16 head injury"),
+    (2, "Patient missing from Ward 22 - elderly male, blue dressing gown"),
+    (2, "Staff assault A&E triage security to A&E"),
+    (2, "Code Grey - violent person Outpatients reception"),
+    (2, "Security to Ward 3 immediately"),
+    (2, "Power failure North Wing generators starting"),
+    (2, "Hazardous spill Radiology corridor - keep clear"),
+    (2, "Doctor to Ward 11 Bed 2 urgently"),
+    (2, "Consultant on call to Theatre 1"),
+    (1, "Porter to Ward 5 Bed 8"),
+    (1, "Porter to Radiology for transfer to Ward 14"),
+    (1, "Bed 7 call bell"),
+    (1, "Nurse to Room 12"),
+    (1, "Water leak Ground Floor Stairwell C"),
+    (1, "Lift 3 out of service, use Lift 4"),
+    (1, "Pharmacy: insulin ready for Ward 6"),
+    (1, "Handover sheet for Ward 10 sent to your device"),
+    (1, "Bloods for Bed 9 back, please review"),
+    (1, "Family of patient in Bed 21 waiting at Main Entrance"),
+    (1, "Helipad clear, aircraft inbound ETA 8 minutes"),
+    (1, "Day Surgery list running 40 minutes late"),
+    (0, "Test alert - please ignore"),
+    (0, "Radio check from ROAM-07"),
+]
+
+
+def measure(label: str, **options):
+    packets = [AlertPacket.create(1, 0xFFFF, t, m, **options) for t, m in CORPUS]
+    frames = [p.pack() for p in packets]
+
+    rounds = 200
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for alert_type, message in CORPUS:
+            AlertPacket.create(1, 0xFFFF, alert_type, message, **options)
+    encode = (time.perf_counter() - start) / (rounds * len(CORPUS))
+
+    received = [RoamENPacket.unpack(f) for f in frames]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for packet in received:
+            AlertPacket.parse(packet)
+    decode = (time.perf_counter() - start) / (rounds * len(CORPUS))
+
+    for (_, message), packet in zip(CORPUS, received):
+        assert AlertPacket.parse(packet)['message'] == message
+
+    payload = sum(len(p.payload) for p in packets) / len(packets)
+    on_air = sum(len(f) for f in frames) / len(frames)
+    seconds = sum(airtime(len(f), FREEDV_BITRATES['freedv_700d']) for f in frames) / len(frames)
+    print(f"   {label:24s} payload {payload:6.1f} B  frame {on_air:6.1f} B  "
+          f"{seconds:5.2f} s @700D  encode {encode * 1e6:5.1f} µs  decode {decode * 1e6:5.1f} µs")
+    return on_air
+
+
+def main():
+    print(f"🚨 {len(CORPUS)} hospital alerts, mean text "
+          f"{sum(len(m) for _, m in CORPUS) / len(CORPUS):.1f} chars")
+    fixed = measure("fixed 258-byte", compact=False)
+    measure("length-prefixed", compact=True, compress=False)
+    compact = measure("length-prefixed+deflate", compact=True)
+    print(f"✅ {fixed / compact:.1f}x fewer bytes on air")
+
+
+if __name__ == "__main__":
+    main()
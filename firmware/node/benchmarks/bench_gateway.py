@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Load-test the WebSocket gateway: hundreds of local dashboards, a few that never read"""
+
+import asyncio
+import random
+import socket
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import aiohttp
+from aiohttp import web
+
+from gateway.websocket import Gateway, gateway_app
+from protocol.packet import AlertPacket, PacketType, Priority, RoamENPacket
+
+CLIENTS = 300
+STALLED = 3      # Connect, then never read a byte
+EVENTS = 20_000
+BURST = 200      # Events published per receive-loop iteration
+
+HANDSHAKE = ("GET /ws HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\n"
+             "Connection: Upgrade\r\nSec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n"
+             "Sec-WebSocket-Version: 13\r\n\r\n").encode()
+
+
+def packets(seed: int = 21):
+    rng = random.Random(seed)
+    for i in range(EVENTS):
+        if i % 10 == 0:
+            yield AlertPacket.create(rng.randrange(1, 500), 0xFFFF, rng.choice((2, 9)),
+                                     "Code Blue Ward %d Bed %d" % (rng.randrange(20), i % 30))
+        else:
+            yield RoamENPacket(PacketType.TEXT_MESSAGE, rng.randrange(1, 500), 42,
+                               Priority.NORMAL, b"obs %d " % i + b"x" * rng.randrange(100))
+
+
+async def dashboard(session, url, received, done, alerts_only):
+    async with session.ws_connect(url + ('?type=ALERT' if alerts_only else '')) as ws:
+        await ws.receive()  # mesh_snapshot
+        done.set_result(None) if not done.done() else None
+        async for message in ws:
+            received[0] += 1
+            if message.data.endswith('"final"}'):
+                break
+
+
+async def main_async():
+    gateway = Gateway()
+    # No heartbeat: it would close the stalled clients before the run ends
+    runner = web.AppRunner(gateway_app(gateway, heartbeat=None))
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    url = f"http://127.0.0.1:{port}/ws"
+
+    stalled = []
+    for _ in range(STALLED):
+        # A small receive window, so the kernel cannot absorb the whole run for them
+        sock = socket.socket()
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        sock.connect(('127.0.0.1', port))
+        reader, writer = await asyncio.open_connection(sock=sock)
+        writer.write(HANDSHAKE)
+        await reader.readuntil(b"\r\n\r\n")
+        stalled.append(writer)
+
+    # The default connector allows only 100 connections at once
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+        received = [0]
+        ready = [asyncio.get_running_loop().create_future() for _ in range(CLIENTS)]
+        tasks = [asyncio.ensure_future(dashboard(session, url, received, ready[i], i % 3 == 0))
+                 for i in range(CLIENTS)]
+        await asyncio.gather(*ready)
+        print(f"🖥️  {CLIENTS} dashboards (1 in 3 ALERT-only) + {STALLED} stalled connections")
+
+        publish_time = 0.0
+        start = time.perf_counter()
+        for i, packet in enumerate(packets()):
+            begin = time.perf_counter()
+            gateway.publish(packet)
+            publish_time += time.perf_counter() - begin
+            if i % BURST == BURST - 1:
+                await asyncio.sleep(0)  # Let writers run, as between radio frames
+        final = AlertPacket.create(1, 0xFFFF, 9, "final")
+        gateway.publish(final)
+        # Read the stalled clients' state now; disconnecting unsubscribes them
+        stats = gateway.stats
+        queued = max((len(s.queue) for s in gateway.subscribers), default=0)
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    print(f"📡 Published {stats['published']} events: {publish_time / EVENTS * 1e6:.1f} µs each "
+          f"on the receive path ({EVENTS / publish_time:,.0f}/s)")
+    print(f"📬 {received[0]:,} messages delivered in {elapsed:.2f}s "
+          f"({received[0] / elapsed:,.0f} msg/s)")
+    print(f"🐢 Stalled clients: {stats['dropped']:,} events dropped, "
+          f"{queued} queued (limit {gateway.queue_limit})")
+    for writer in stalled:
+        writer.close()
+    await runner.cleanup()
+    print("✅ Receive never waited on a client")
+
+
+def main():
+    asyncio.run(main_async())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Benchmark classic vs compact headers: airtime per packet type and codec speed"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from protocol.framing import FrameSync
+from protocol.packet import (AlertPacket, BeaconPacket, FilePacket, PacketType, Priority,
+                            RoamENPacket, VoicePacket)
+from radio.scheduler import FREEDV_BITRATES, airtime
+
+BITRATE = FREEDV_BITRATES['freedv_700d']
+
+# One typical packet of each type
+PACKETS = [
+    ('BEACON', BeaconPacket.create(7, "ROAM-07", 0x03)),
+    ('TEXT_MESSAGE', RoamENPacket(PacketType.TEXT_MESSAGE, 7, 12, Priority.NORMAL,
+                                  b"Meet at the north gate in 10")),
+    ('VOICE_START', VoicePacket.start(7, 0xFFFF, 1)),
+    ('VOICE_DATA', VoicePacket.data(7, 0xFFFF, 1, 42, bytes(7))),
+    ('VOICE_END', VoicePacket.end(7, 0xFFFF, 1, 250)),
+    ('ALERT', AlertPacket.create(7, 0xFFFF, 9, "Code Blue - cardiac arrest Ward 7 Bed 12",
+                                 compact=True)),
+    ('ACK', RoamENPacket(PacketType.ACK, 12, 7, Priority.INFO, bytes(6))),
+    ('FILE_CHUNK', FilePacket.data(7, 12, 3, 17, bytes(200))),
+    ('EMERGENCY', RoamENPacket(PacketType.EMERGENCY_BROADCAST, 7, 0xFFFF,
+                               Priority.EMERGENCY, b"MAYDAY TQ123456")),
+]
+
+
+def codec_speed(compact: bool, rounds: int = 20000):
+    packets = [packet for _, packet in PACKETS]
+    start = time.perf_counter()
+    for _ in range(rounds // len(packets)):
+        for packet in packets:
+            packet.pack(compact)
+    encode = (time.perf_counter() - start) / rounds
+
+    frames = [packet.pack(compact) for packet in packets]
+    start = time.perf_counter()
+    for _ in range(rounds // len(frames)):
+        for frame in frames:
+            RoamENPacket.unpack(frame)
+    decode = (time.perf_counter() - start) / rounds
+
+    stream = b''.join(frames) * 200
+    sync = FrameSync()
+    start = time.perf_counter()
+    decoded = len(sync.feed(stream))
+    scan = (time.perf_counter() - start) / decoded
+    return encode, decode, scan
+
+
+def main():
+    print(f"📏 Header size: classic {RoamENPacket.HEADER_SIZE} B, "
+          f"compact {RoamENPacket.COMPACT_HEADER_SIZE} B (freedv_700d, {BITRATE} bit/s)")
+    total_classic = total_compact = 0.0
+    for name, packet in PACKETS:
+        classic = airtime(len(packet.pack(compact=False)), BITRATE)
+        compact = airtime(len(packet.pack(compact=True)), BITRATE)
+        total_classic += classic
+        total_compact += compact
+        print(f"   {name:14s} payload {len(packet.payload):4d} B  "
+              f"{classic:5.2f} s -> {compact:5.2f} s  "
+              f"(-{(classic - compact) * 1000:3.0f} ms, -{(1 - compact / classic) * 100:4.1f}%)")
+    print(f"   {'all types':14s} {'':12s}{total_classic:5.2f} s -> {total_compact:5.2f} s  "
+          f"(-{(1 - total_compact / total_classic) * 100:4.1f}%)")
+
+    print("⏱️  Codec speed per packet")
+    for label, compact in (("classic", False), ("compact", True)):
+        encode, decode, scan = codec_speed(compact)
+        print(f"   {label:8s} pack {encode * 1e6:5.2f} µs  unpack {decode * 1e6:5.2f} µs  "
+              f"FrameSync {scan * 1e6:5.2f} µs")
+    print("✅ Done")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""Benchmark the mesh simulator at hospital scale (ARCHITECTURE: 20-50 fixed, 5,000 staff)"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sim.mesh import MeshSimulator
+
+SCENARIOS = [
+    # (label, simulator options, simulated seconds)
+    ("ward pilot: 3 fixed, 40 staff, 2 msg/h", dict(fixed=3, portable=40, floors=2,
+                                                    message_rate=2), 3600),
+    ("floor-wide: 10 fixed, 400 staff, 300 s beacons",
+     dict(fixed=10, portable=400, floors=5, beacon_interval=300, message_rate=0.5), 3600),
+    ("hospital: 50 fixed, 5000 staff, 30 s beacons", dict(fixed=50, portable=5000), 3600),
+]
+
+
+def main():
+    for label, options, duration in SCENARIOS:
+        report = MeshSimulator(**options).run(duration)
+        print(f"🏥 {label}")
+        print(f"   {duration / 3600:.0f} h simulated in {report['wall_s']:.1f} s "
+              f"({report['speedup']:,.0f}x real time, {report['events']:,} events)")
+        print(f"   channel utilization mean {report['utilization_mean']:.0%} "
+              f"max {report['utilization_max']:.0%}, "
+              f"{report['collided'] / max(report['transmissions'], 1):.0%} of "
+              f"{report['transmissions']:,} frames collided")
+        print(f"   beacon delivery {report['beacon_delivery']:.1%}")
+        if report['messages_sent']:
+            latency = (f", latency p50 {report['latency_p50']:.1f} s "
+                       f"p95 {report['latency_p95']:.1f} s p99 {report['latency_p99']:.1f} s"
+                       if report['messages_delivered'] else "")
+            print(f"   messages delivered {report['message_delivery']:.1%} "
+                  f"of {report['messages_sent']}{latency}")
+    print("✅ Done")
+
+
+if __name__ == "__main__":
+    main()
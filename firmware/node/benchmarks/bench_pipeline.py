@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Benchmark multi-channel receive: one FrameSync thread vs the process pool pipeline
+
+The parent's serial pass bounds the pool's speedup (Amdahl), so it is reported
+separately: on a machine with N CPUs the pipeline cannot beat N times the
+worker scan rate, nor the parent pass rate.
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from protocol.framing import FrameSync
+from protocol.metrics import DecodeMetrics
+from protocol.packet import PacketType, Priority, RoamENPacket
+from radio.pipeline import (CHUNK_SIZE, LOOKAHEAD, ReceivePipeline, file_channels,
+                            scan_chunk)
+
+CHANNELS = 4
+FRAMES_PER_CHANNEL = 25_000
+
+
+def channel_stream(channel: int) -> bytes:
+    rng = random.Random(channel)
+    parts = []
+    for i in range(FRAMES_PER_CHANNEL):
+        packet = RoamENPacket(PacketType.TEXT_MESSAGE, 100 * channel + i % 100, 42,
+                              Priority.NORMAL, rng.randbytes(rng.randrange(16, 200)))
+        packet.timestamp += i
+        if i % 8 == 0:
+            parts.append(rng.randbytes(rng.randrange(1, 32)))  # Noise between frames
+        parts.append(packet.pack(compact=i % 2 == 0))
+    return b''.join(parts)
+
+
+def main():
+    cores = os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for channel in range(CHANNELS):
+            paths.append(Path(directory) / f"channel{channel}.bin")
+            paths[-1].write_bytes(channel_stream(channel))
+        total = sum(path.stat().st_size for path in paths)
+        frames = CHANNELS * FRAMES_PER_CHANNEL
+        print(f"📡 {CHANNELS} channels, {frames} frames, {total / 1e6:.1f} MB; {cores} CPU(s)")
+
+        syncs = [FrameSync(metrics=DecodeMetrics()) for _ in paths]
+        start = time.perf_counter()
+        decoded = sum(len(syncs[channel].feed(data))
+                      for channel, data, _ in file_channels(paths, read_size=64 << 10))
+        baseline = time.perf_counter() - start
+        print(f"   one thread, FrameSync   {decoded / baseline:9,.0f} frames/s")
+
+        # Worker-side cost alone: the scan every chunk gets, without the parent's pass
+        start = time.perf_counter()
+        for path in paths:
+            data = path.read_bytes()
+            for offset in range(0, len(data), CHUNK_SIZE):
+                scan_chunk(data[offset:offset + CHUNK_SIZE + LOOKAHEAD],
+                           min(CHUNK_SIZE, len(data) - offset), time.time())
+        scan = time.perf_counter() - start
+        print(f"   worker scan alone       {frames / scan:9,.0f} frames/s")
+
+        for output in ('packets', 'views'):
+            for workers in sorted({0, 1, 2, cores, 2 * cores}):
+                with ReceivePipeline(workers=workers, metrics=DecodeMetrics()) as pipeline:
+                    start = time.perf_counter()
+                    decoded = sum(1 for _ in getattr(pipeline, output)(
+                        file_channels(paths, read_size=64 << 10)))
+                    elapsed = time.perf_counter() - start
+                assert decoded == frames, pipeline.stats
+                print(f"   {output:7s} {workers:2d} worker(s)  {decoded / elapsed:9,.0f} frames/s  "
+                      f"({baseline / elapsed:.2f}x)")
+                if workers == 0:
+                    # Inline, the parent's serial share is what the scan does not explain
+                    parent = max(elapsed - scan, 1e-9)
+                    print(f"   {output:7s} parent pass     {parent / frames * 1e6:9.2f} µs/frame, "
+                          f"so at most {frames / parent:,.0f} frames/s "
+                          f"({baseline / parent:.1f}x) with any number of workers")
+    if cores == 1:
+        print("⚠️  Single CPU: workers share it, so no speedup is possible here")
+    print("✅ Done")
+
+
+if __name__ == "__main__":
+    main()
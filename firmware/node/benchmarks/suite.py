@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""Protocol benchmark suite with a JSON baseline and a regression gate
+
+Micro benchmarks time the per-packet hot paths across every PacketType
+and payload sizes from 0 to 256 bytes; macro benchmarks run whole
+scenarios (decoding a capture, relaying a stream). Each result is the
+best of several timed rounds, in nanoseconds per operation.
+
+    python3 benchmarks/suite.py                    # run, compare to baseline.json
+    python3 benchmarks/suite.py --update-baseline  # run and store a new baseline
+    python3 benchmarks/suite.py --quick --filter pack --json results.json
+
+Single micro benchmarks are too noisy to gate on, so the run is judged per
+group (``pack``, ``alert_parse``, ``relay`` ...): the geometric mean of each
+benchmark's time over its baseline. Each group is run on its own, between two
+timings of a fixed pure-Python loop, and its ratio is divided by how much
+that loop changed, which cancels out the machine being busier or slower
+than when the baseline was taken. A group more than ``--threshold``
+(default 25%) slower is timed again, up to ``--confirm`` times, and only
+counts as a regression if every run is over the threshold; the run then
+exits with status 1. Baselines are only comparable on the machine and
+Python build that produced them.
+
+The yardstick is not perfectly steady either: on a shared single-CPU VM the
+machine factor printed per group has ranged from 0.85x to 1.56x between
+runs, and a group's own load does not always move with it. The default
+threshold and confirm re-runs are sized for that; on a quiet, pinned machine
+both can be tightened.
+
+Scenarios report ns/frame under size-free names (``relay/stream``), so a
+``--quick`` run, with smaller scenarios, is gated against the same baseline.
+Benchmarks missing from the baseline are listed as not gated.
+"""
+
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+from pathlib import Path
+from collections import defaultdict
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from protocol import crc, payloads
+from protocol.dedup import DuplicateCache
+from protocol.framing import FrameSync
+from protocol.packet import (PAYLOAD_CODECS, AlertPacket, PacketType, PacketView, Priority,
+                             RoamENPacket)
+from protocol.relay import Relay
+
+BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+PAYLOAD_SIZES = (0, 16, 64, 128, 256)
+CRC_SIZES = (0, 8, 16, 32, 64, 96, 128, 160, 192, 224, 256)  # Enough cases for a stable mean
+THRESHOLD = 0.25
+CONFIRM = 2  # Re-runs a group over the threshold gets before it counts as a regression
+
+# (callable running ``ops`` operations per call, ops), built only if the case is selected
+Case = Tuple[Callable[[], None], int]
+CaseSetup = Callable[[], Case]
+
+
+def _packet(packet_type: PacketType, size: int, seed: int = 0) -> RoamENPacket:
+    rng = random.Random(seed)
+    emergency = packet_type == PacketType.EMERGENCY_BROADCAST
+    priority = Priority.EMERGENCY if emergency else Priority.NORMAL
+    packet = RoamENPacket(packet_type, 7, 42, priority, rng.randbytes(size))
+    packet.timestamp = 1_700_000_000
+    return packet
+
+
+def micro_cases() -> Iterator[Tuple[str, CaseSetup]]:
+    for packet_type in PacketType:
+        for size in PAYLOAD_SIZES:
+            packet = _packet(packet_type, size)
+            frame = packet.pack()
+            view = PacketView(frame)
+            tag = f"{packet_type.name.lower()}/{size}"
+            yield f"pack/{tag}", lambda p=packet: (p.pack, 1)
+            yield f"unpack/{tag}", lambda f=frame: (lambda: RoamENPacket.unpack(f), 1)
+            yield f"is_for_me/{tag}", lambda p=packet: (lambda: p.is_for_me(42), 1)
+            yield f"view_is_for_me/{tag}", lambda v=view: (lambda: v.is_for_me(42), 1)
+
+    for size in CRC_SIZES:
+        frame = _packet(PacketType.TEXT_MESSAGE, size).pack()
+        yield f"crc16/{len(frame)}", lambda f=frame: (lambda: RoamENPacket._crc16(f), 1)
+        yield (f"crc_update/{len(frame)}",
+               lambda f=frame: (lambda: crc.update(crc.INITIAL, f), 1))
+
+    text = "Code Blue - cardiac arrest Ward 7 Bed 12 - crash team to ICU immediately. " * 4
+    for size in PAYLOAD_SIZES:
+        message = text[:max(size - 3, 0)]
+        for label, options in (("fixed", dict(compact=False)),
+                               ("prefixed", dict(compact=True, compress=False)),
+                               ("deflate", dict(compact=True))):
+            alert = AlertPacket.create(7, 0xFFFF, 9, message, **options)
+            yield (f"alert_create/{label}/{size}", lambda m=message, o=options: (
+                lambda: AlertPacket.create(7, 0xFFFF, 9, m, **o), 1))
+            yield (f"alert_parse/{label}/{size}",
+                   lambda a=alert: (lambda: AlertPacket.parse(a), 1))
+
+    for packet_type, sample in _payload_samples().items():
+        data = sample.encode()
+        decode = PAYLOAD_CODECS[packet_type].decode
+        tag = packet_type.name.lower()
+        yield f"payload_encode/{tag}", lambda p=sample: (p.encode, 1)
+        yield f"payload_decode/{tag}", lambda d=data, f=decode: (lambda: f(d), 1)
+
+
+def _payload_samples() -> Dict[PacketType, payloads.Payload]:
+    """A typical payload of every packet type, for the codec benchmarks"""
+    rng = random.Random(25)
+    text = "Code Blue - cardiac arrest Ward 7 Bed 12 - crash team to ICU"
+    return {
+        PacketType.BEACON: payloads.Beacon("WARD7-RELAY", 0x03,
+                                           {rng.randrange(1, 500): hops for hops in range(8)}),
+        PacketType.TEXT_MESSAGE: payloads.Text(text),
+        PacketType.VOICE_START: payloads.VoiceStart(7),
+        PacketType.VOICE_DATA: payloads.VoiceData(7, 42, rng.randbytes(8)),
+        PacketType.VOICE_END: payloads.VoiceEnd(7, 99),
+        PacketType.ALERT: payloads.Alert(9, 3, text),
+        PacketType.ACK: payloads.Ack([(5, 1000 + i * 3) for i in range(16)]),
+        PacketType.AGGREGATE: payloads.Aggregate(
+            [(2, 1, 3, 9, 5, 1000 + i, rng.randbytes(16)) for i in range(4)]),
+        PacketType.FILE_CHUNK: payloads.FileData(3, 17, rng.randbytes(200)),
+        PacketType.EMERGENCY_BROADCAST: payloads.EmergencyBroadcast("EVACUATE BUILDING"),
+    }
+
+
+def _capture(count: int, seed: int = 433) -> bytes:
+    """A receive capture: frames of every type and size, with a little noise between"""
+    rng = random.Random(seed)
+    types = list(PacketType)
+    parts = []
+    for i in range(count):
+        packet = _packet(types[i % len(types)], rng.choice(PAYLOAD_SIZES), seed=i % 64)
+        packet.timestamp = i
+        if i % 16 == 0:
+            parts.append(rng.randbytes(rng.randrange(1, 24)))
+        parts.append(packet.pack())
+    return b''.join(parts)
+
+
+def _decode_capture(frames: int) -> Case:
+    capture = _capture(frames)
+
+    def run():
+        sync = FrameSync()
+        view = memoryview(capture)
+        for offset in range(0, len(view), 4096):
+            sync.feed(view[offset:offset + 4096])
+        assert sync.frames_decoded == frames, sync.stats
+
+    return run, frames
+
+
+def _relay(count: int) -> Case:
+    rng = random.Random(54)
+    originals = []
+    for i in range(count):
+        packet = RoamENPacket(PacketType.TEXT_MESSAGE, rng.randrange(1, 50), 42,
+                              Priority.NORMAL, rng.randbytes(rng.randrange(0, 257)))
+        packet.timestamp = i  # Unique, so nothing is suppressed as a duplicate
+        originals.append(packet.pack())
+
+    def run():
+        # 100 frames/s of simulated channel time, so the fingerprint window rotates
+        clock = [0.0]
+
+        def tick():
+            clock[0] += 0.01
+            return clock[0]
+
+        forwarder = Relay(node_id=10, cache=DuplicateCache(clock=tick))
+        for frame in originals:
+            forwarder.forward(bytearray(frame))
+        assert forwarder.stats['forwarded'] == count, forwarder.stats
+
+    return run, count
+
+
+def macro_cases(quick: bool) -> Iterator[Tuple[str, CaseSetup]]:
+    """Scenarios in ns/frame under names without their size, so quick runs gate too"""
+    frames = 100_000 if quick else 1_000_000
+    yield "decode_capture/stream", lambda: _decode_capture(frames)
+    relayed = 10_000 if quick else 100_000
+    yield "relay/stream", lambda: _relay(relayed)
+
+
+def measure(run: Callable[[], None], ops: int, budget: float, rounds: int) -> float:
+    """Best-of-``rounds`` nanoseconds per operation, calling ``run`` enough to fill ``budget``"""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= budget / 10 or ops * loops > 1e8:
+            break
+        loops *= 10
+    loops = max(1, int(loops * budget / 10 / max(elapsed, 1e-9)))
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        best = min(best, time.perf_counter() - start)
+    return best / (loops * ops) * 1e9
+
+
+def _reference_loop():
+    table = {}
+    for i in range(1000):
+        table[i & 63] = table.get(i & 63, 0) + i
+    return bytes(range(256)).find(b'\xff')
+
+
+def reference(budget: float, rounds: int) -> float:
+    """ns per call of a fixed workload, the yardstick for machine speed"""
+    return measure(_reference_loop, 1, budget, rounds)
+
+
+def group_of(name: str) -> str:
+    return name.split('/')[0]
+
+
+def group_ratios(results: Dict[str, float], baseline: Dict[str, float],
+                 scales: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """Geometric mean of result/baseline per group, divided by the group's scale"""
+    scales = scales or {}
+    logs = defaultdict(list)
+    for name, ns in results.items():
+        if baseline.get(name):
+            scale = scales.get(group_of(name), 1.0)
+            logs[group_of(name)].append(math.log(ns / baseline[name] / scale))
+    return {group: math.exp(sum(values) / len(values)) for group, values in logs.items()}
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float,
+            scales: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """Groups slower than baseline by more than ``threshold``, with their ratio"""
+    return {group: ratio for group, ratio in group_ratios(results, baseline, scales).items()
+            if ratio > 1 + threshold}
+
+
+def run_groups(cases, budget: float, rounds: int,
+               show: bool = True) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """Time ``cases`` (sorted by group) and each group's yardstick
+
+    Returns:
+        (ns/op per benchmark, yardstick ns per group)
+    """
+    results: Dict[str, float] = {}
+    references: Dict[str, float] = {}
+    group, before = None, 0.0
+    for index, (name, setup) in enumerate(cases):
+        if group_of(name) != group:
+            group, before = group_of(name), reference(budget, rounds)
+        run, ops = setup()
+        # Scenarios are long enough that one timed round (after calibration) is stable
+        results[name] = measure(run, ops, budget, 1 if ops > 1 else rounds)
+        if show:
+            print(f"   {name:40s} {results[name]:10.1f}")
+        if index + 1 == len(cases) or group_of(cases[index + 1][0]) != group:
+            # Geometric mean of the yardstick before and after the group
+            references[group] = math.sqrt(before * reference(budget, rounds))
+    return results, references
+
+
+def scales_for(references: Dict[str, float],
+               baseline_references: Dict[str, float]) -> Dict[str, float]:
+    """How much faster (<1) or slower (>1) the machine is per group than for the baseline"""
+    return {group: ns / baseline_references[group] for group, ns in references.items()
+            if baseline_references.get(group)}
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filter', default='', help="only run benchmarks containing this text")
+    parser.add_argument('--quick', action='store_true', help="shorter timing, smaller scenarios")
+    parser.add_argument('--json', type=Path, help="also write the results to this file")
+    parser.add_argument('--baseline', type=Path, default=BASELINE)
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help="allowed slowdown before failing (0.25 = 25%%)")
+    parser.add_argument('--confirm', type=int, default=CONFIRM,
+                        help="re-runs a slow group gets before it fails the gate")
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--no-macro', action='store_true')
+    args = parser.parse_args(argv)
+
+    budget, rounds = (0.02, 3) if args.quick else (0.1, 5)
+    cases = list(micro_cases())
+    if not args.no_macro:
+        cases += list(macro_cases(args.quick))
+    # One group at a time, so each group's yardstick is timed next to it
+    cases = sorted((case for case in cases if args.filter in case[0]),
+                   key=lambda case: group_of(case[0]))
+
+    stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    baseline: Dict[str, float] = {} if args.update_baseline else stored.get('results', {})
+    baseline_references = stored.get('references', {})
+
+    print(f"⏱️  {len(cases)} benchmarks, ns/op (best of {rounds})")
+    results, references = run_groups(cases, budget, rounds)
+    scales = scales_for(references, baseline_references)
+
+    report = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'quick': args.quick,
+        'references': references,
+        'results': results,
+    }
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2, sort_keys=True) + '\n')
+    if args.update_baseline:
+        # Merge, so a filtered run only refreshes the benchmarks it ran. Entries
+        # kept from the old baseline are rescaled to this run's yardsticks.
+        merged = dict(stored.get('results', {}))
+        for name in merged:
+            old = baseline_references.get(group_of(name))
+            if group_of(name) in references and old:
+                merged[name] *= references[group_of(name)] / old
+        merged.update(results)
+        report['results'] = dict(sorted(merged.items()))
+        report['references'] = dict(sorted({**baseline_references, **references}.items()))
+        args.baseline.write_text(json.dumps(report, indent=2) + '\n')
+        print(f"💾 Baseline written to {args.baseline}")
+        return 0
+
+    groups = group_ratios(results, baseline, scales)
+    regressions = compare(results, baseline, args.threshold, scales)
+    for attempt in range(1, args.confirm + 1):
+        if not regressions:
+            break
+        # A slow group on a noisy machine is often a blip: it must reproduce to count
+        print(f"🔁 Re-running {', '.join(sorted(regressions))} ({attempt}/{args.confirm})")
+        again, again_references = run_groups(
+            [case for case in cases if group_of(case[0]) in regressions], budget, rounds,
+            show=False)
+        again_scales = scales_for(again_references, baseline_references)
+        for group, ratio in group_ratios(again, baseline, again_scales).items():
+            if ratio < groups[group]:
+                groups[group], scales[group] = ratio, again_scales.get(group, 1.0)
+        regressions = {group: groups[group] for group in regressions
+                       if groups[group] > 1 + args.threshold}
+
+    for group, ratio in sorted(groups.items()):
+        print(f"   {group:20s} {ratio:5.2f}x baseline  (machine {scales.get(group, 1.0):.2f}x)")
+    ungated = sorted(name for name in results if not baseline.get(name))
+    if baseline and ungated:
+        print(f"⚠️  {len(ungated)} benchmark(s) not in the baseline, not gated: "
+              + ", ".join(ungated))
+    if regressions:
+        print(f"❌ {len(regressions)} group(s) slower by more than {args.threshold:.0%}: "
+              + ", ".join(sorted(regressions)))
+        return 1
+    print(f"✅ No regressions over {args.threshold:.0%}" if baseline else
+          "✅ Done (no baseline to compare against)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
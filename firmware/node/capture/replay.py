@@ -0,0 +1,126 @@
+"""Replays a capture into a decoder, at N x real time or as fast as possible
+
+    python -m capture.replay CAPTURE_DIR [--speed N] [--source ID] [--type T]
+
+decodes the selected frames with a fresh FrameSync and prints its counters,
+so decoder changes can be checked against recorded traffic.
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, Callable, Iterable, Optional, Sequence
+
+from .store import CapturedFrame, CaptureReader
+
+Sink = Callable[[memoryview], Any]
+
+
+class Replay:
+    """Feeds captured frames to ``sink`` (e.g. ``FrameSync.feed``) in capture order
+
+    With ``speed`` set, frame i is fed ``(rx_time[i] - rx_time[0]) / speed``
+    seconds after the first; with ``speed=None`` frames are fed back to back.
+    If the sink cannot keep up, frames are fed late rather than skipped and
+    counted in ``late``.
+    """
+
+    def __init__(self, frames: Iterable[CapturedFrame], speed: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be positive (or None for as fast as possible)")
+        self.frames = frames
+        self.speed = speed
+        self.clock = clock
+
+        self.fed = 0
+        self.bytes = 0
+        self.late = 0
+        self.elapsed = 0.0
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'fed': self.fed,
+            'bytes': self.bytes,
+            'late': self.late,
+            'elapsed': self.elapsed,
+            'frames_per_s': self.fed / self.elapsed if self.elapsed else None,
+        }
+
+    def feed(self, sink: Sink, sleep: Callable[[float], None] = time.sleep) -> int:
+        """Replay every frame, blocking between them if paced
+
+        Returns:
+            Number of frames fed
+        """
+        started = self.clock()
+        first = None
+        for captured in self.frames:
+            if first is None:
+                first = captured.rx_time
+            elif self.speed is not None:
+                delay = started + (captured.rx_time - first) / self.speed - self.clock()
+                if delay > 0:
+                    sleep(delay)
+                else:
+                    self.late += 1
+            self._feed(sink, captured)
+        self.elapsed = self.clock() - started
+        return self.fed
+
+    async def run(self, sink: Sink) -> int:
+        """Asyncio version of ``feed``: other tasks run while it waits"""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        first = None
+        for captured in self.frames:
+            if first is None:
+                first = captured.rx_time
+            elif self.speed is not None:
+                delay = started + (captured.rx_time - first) / self.speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    self.late += 1
+            self._feed(sink, captured)
+        self.elapsed = loop.time() - started
+        return self.fed
+
+    def _feed(self, sink: Sink, captured: CapturedFrame):
+        sink(captured.frame)
+        self.fed += 1
+        self.bytes += len(captured.frame)
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    from protocol.framing import FrameSync
+    from protocol.metrics import DecodeMetrics
+
+    parser = argparse.ArgumentParser(description="Replay a capture through FrameSync")
+    parser.add_argument('capture', help="capture directory")
+    parser.add_argument('--speed', type=float, help="times real time (default: flat out)")
+    parser.add_argument('--source', type=int, help="only frames from this source ID")
+    parser.add_argument('--type', type=lambda value: int(value, 0),
+                        help="only frames of this packet type (e.g. 0x06)")
+    parser.add_argument('--start', type=float, help="first receive time (Unix seconds)")
+    parser.add_argument('--end', type=float, help="last receive time (Unix seconds)")
+    parser.add_argument('--sent-start', type=int,
+                        help="first packet timestamp, on the sender's clock (Unix seconds)")
+    parser.add_argument('--sent-end', type=int, help="last packet timestamp (Unix seconds)")
+    args = parser.parse_args(argv)
+
+    metrics = DecodeMetrics()
+    sync = FrameSync(metrics=metrics)
+    with CaptureReader(args.capture) as reader:
+        frames = reader.query(args.start, args.end, args.source, args.type,
+                              args.sent_start, args.sent_end)
+        replay = Replay(frames, args.speed)
+        replay.feed(sync.feed)
+    for name, value in {**replay.stats, **sync.stats}.items():
+        print(f"{name:20s} {value:.4g}" if isinstance(value, float) else f"{name:20s} {value}")
+    print(f"{'by_type':20s} {metrics.snapshot()['decoded']['by_type']}")
+
+
+if __name__ == "__main__":
+    main()
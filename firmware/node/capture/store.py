@@ -0,0 +1,311 @@
+"""Append-only capture of received frames, in segments with a sidecar index
+
+A capture is a directory of segments. ``NNNNNN.rcap`` holds the frames:
+a 16-byte header, then for each frame a record header (receive time,
+RSSI, SNR, length) followed by the frame bytes exactly as received.
+``NNNNNN.ridx`` holds one fixed-size entry per frame: its offset in the
+segment, receive time, and the timestamp, source ID and packet type read
+from its header. Queries filter the index, so finding frames never means
+decoding the capture, and frames are read from memory-mapped segments
+without copying.
+
+Both files are only ever appended to. A writer that stops mid-record
+leaves at most one torn entry at the end, which readers ignore.
+"""
+
+import mmap
+import struct
+import time
+from pathlib import Path
+from typing import Iterator, List, Optional, Union
+
+from protocol.packet import COMPACT_HEADER_STRUCT, RoamENPacket
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - queries fall back to struct
+    np = None
+
+SEGMENT_MAGIC = b'RCAP'
+INDEX_MAGIC = b'RIDX'
+FORMAT_VERSION = 1
+SEGMENT_BYTES = 64 << 20
+
+# Magic, version, segment creation time
+FILE_HEADER = struct.Struct('<4s B 3x d')
+# Receive time, RSSI (dBm), SNR (dB), frame length; NaN if the radio gave no reading
+RECORD = struct.Struct('<d f f H')
+# Record offset in the segment, receive time, packet timestamp, source ID, packet type
+INDEX_ENTRY = struct.Struct('<Q d I H B x')
+# Source and type of frames whose header could not be read
+UNKNOWN_SOURCE = 0xFFFF
+UNKNOWN_TYPE = 0
+
+_CLASSIC_FIELDS = struct.Struct('=B H H B B I')  # At offset 5; native order, like the header
+_NAN = float('nan')
+
+if np is not None:
+    INDEX_DTYPE = np.dtype([('offset', '<u8'), ('rx_time', '<f8'), ('timestamp', '<u4'),
+                            ('source_id', '<u2'), ('packet_type', 'u1'), ('pad', 'u1')])
+
+PathLike = Union[str, Path]
+
+
+def header_fields(frame, rx_time: float):
+    """(timestamp, source_id, packet_type) from a frame header, without checking it"""
+    if frame[:3] == RoamENPacket.COMPACT_SIGNATURE and len(frame) >= COMPACT_HEADER_STRUCT.size:
+        fields = COMPACT_HEADER_STRUCT.unpack_from(frame)
+        code = fields[2] & 0x0F
+        # Nearest time to the receive time with these low 16 bits, as unpack does
+        reference = int(rx_time)
+        timestamp = reference + ((fields[6] - reference + 0x8000) & 0xFFFF) - 0x8000
+        return timestamp & 0xFFFFFFFF, fields[3], RoamENPacket.COMPACT_TYPES.get(code, code)
+    if frame[:4] == RoamENPacket.SYNC and len(frame) >= RoamENPacket.HEADER_SIZE:
+        packet_type, source_id, _, _, _, timestamp = _CLASSIC_FIELDS.unpack_from(frame, 5)
+        return timestamp, source_id, packet_type
+    return 0, UNKNOWN_SOURCE, UNKNOWN_TYPE
+
+
+class CapturedFrame:
+    """One received frame; ``frame`` is a view into the mapped segment"""
+
+    __slots__ = ('frame', 'rx_time', 'rssi', 'snr', 'timestamp', 'source_id', 'packet_type')
+
+    def __init__(self, frame: memoryview, rx_time: float, rssi: float, snr: float,
+                 timestamp: int, source_id: int, packet_type: int):
+        self.frame = frame
+        self.rx_time = rx_time
+        self.rssi = rssi
+        self.snr = snr
+        self.timestamp = timestamp
+        self.source_id = source_id
+        self.packet_type = packet_type
+
+    def __repr__(self):
+        return (f"CapturedFrame(rx_time={self.rx_time:.3f}, src={self.source_id}, "
+                f"type=0x{self.packet_type:02x}, {len(self.frame)}B)")
+
+
+class CaptureWriter:
+    """Appends frames to a capture directory, starting a new segment when one is full
+
+    Appending to an existing capture continues after its last segment.
+    Writes are buffered; ``flush`` (or ``close``) makes them visible to
+    readers.
+    """
+
+    def __init__(self, directory: PathLike, segment_bytes: int = SEGMENT_BYTES,
+                 clock=time.time):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.clock = clock
+        existing = _segments(self.directory)
+        self._number = int(existing[-1].stem) if existing else 0
+        self._data = self._index = None
+        self._offset = 0
+
+        self.frames = 0
+        self.bytes = 0
+        self.segments = 0
+
+    def __enter__(self) -> 'CaptureWriter':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append(self, frame, rx_time: Optional[float] = None, rssi: Optional[float] = None,
+               snr: Optional[float] = None):
+        """Record one received frame (any bytes-like object, up to 65535 bytes)
+
+        Args:
+            frame: The frame as received, valid or not
+            rx_time: Unix receive time (defaults to the writer's clock)
+            rssi: Received signal strength in dBm, if known
+            snr: Signal-to-noise ratio in dB, if known
+        """
+        if rx_time is None:
+            rx_time = self.clock()
+        size = RECORD.size + len(frame)
+        if self._data is None or (self._offset + size > self.segment_bytes
+                                  and self._offset > FILE_HEADER.size):
+            self._start_segment(rx_time)
+        timestamp, source_id, packet_type = header_fields(frame, rx_time)
+        self._index.write(INDEX_ENTRY.pack(self._offset, rx_time, timestamp, source_id,
+                                           packet_type))
+        self._data.write(RECORD.pack(rx_time, _NAN if rssi is None else rssi,
+                                     _NAN if snr is None else snr, len(frame)))
+        self._data.write(frame)
+        self._offset += size
+        self.frames += 1
+        self.bytes += len(frame)
+
+    def flush(self):
+        if self._data is not None:
+            # Data first, so every indexed record is complete on disk
+            self._data.flush()
+            self._index.flush()
+
+    def close(self):
+        if self._data is not None:
+            self.flush()
+            self._data.close()
+            self._index.close()
+            self._data = self._index = None
+
+    def _start_segment(self, now: float):
+        self.close()
+        self._number += 1
+        path = self.directory / f"{self._number:06d}"
+        self._data = open(path.with_suffix('.rcap'), 'xb')
+        self._index = open(path.with_suffix('.ridx'), 'xb')
+        self._data.write(FILE_HEADER.pack(SEGMENT_MAGIC, FORMAT_VERSION, now))
+        self._index.write(FILE_HEADER.pack(INDEX_MAGIC, FORMAT_VERSION, now))
+        self._offset = FILE_HEADER.size
+        self.segments += 1
+
+
+class _Segment:
+    __slots__ = ('path', 'data', 'index', 'count')
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.data = _map(path)
+        self.index = _map(path.with_suffix('.ridx'))
+        for mapped, magic in ((self.data, SEGMENT_MAGIC), (self.index, INDEX_MAGIC)):
+            if mapped[:4] != magic or mapped[4] != FORMAT_VERSION:
+                raise ValueError(f"{path} is not a version {FORMAT_VERSION} capture segment")
+        count = (len(self.index) - FILE_HEADER.size) // INDEX_ENTRY.size
+        # Drop trailing entries whose record was not completely written
+        while count:
+            offset = INDEX_ENTRY.unpack_from(self.index, _entry_at(count - 1))[0]
+            if offset + RECORD.size <= len(self.data):
+                length = RECORD.unpack_from(self.data, offset)[3]
+                if offset + RECORD.size + length <= len(self.data):
+                    break
+            count -= 1
+        self.count = count
+
+    def entries(self):
+        """The index as a numpy record array, or a list of tuples without numpy"""
+        if np is not None:
+            return np.frombuffer(self.index, INDEX_DTYPE, self.count, FILE_HEADER.size)
+        view = memoryview(self.index)[FILE_HEADER.size:_entry_at(self.count)]
+        return list(INDEX_ENTRY.iter_unpack(view))
+
+    def frame(self, offset: int, timestamp: int, source_id: int,
+              packet_type: int) -> CapturedFrame:
+        rx_time, rssi, snr, length = RECORD.unpack_from(self.data, offset)
+        start = offset + RECORD.size
+        return CapturedFrame(memoryview(self.data)[start:start + length], rx_time, rssi, snr,
+                             timestamp, source_id, packet_type)
+
+    def close(self):
+        for mapped in (self.data, self.index):
+            try:
+                mapped.close()
+            except BufferError:
+                pass  # A caller still holds a frame view; unmapped when it is released
+
+
+class CaptureReader:
+    """Reads a capture directory through memory maps
+
+    Frames come back as ``CapturedFrame`` objects whose ``frame`` is a
+    view into the mapping, valid until the reader is closed; copy it
+    (``bytes(captured.frame)``) to keep it longer.
+    """
+
+    def __init__(self, directory: PathLike):
+        self.directory = Path(directory)
+        # A segment whose headers never reached the disk holds no frames
+        self._segments = [_Segment(path) for path in _segments(self.directory)
+                          if min(path.stat().st_size,
+                                 path.with_suffix('.ridx').stat().st_size) >= FILE_HEADER.size]
+
+    def __enter__(self) -> 'CaptureReader':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return sum(segment.count for segment in self._segments)
+
+    def __iter__(self) -> Iterator[CapturedFrame]:
+        return self.query()
+
+    def close(self):
+        for segment in self._segments:
+            segment.close()
+        self._segments = []
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None,
+              source_id: Optional[int] = None, packet_type: Optional[int] = None,
+              sent_start: Optional[int] = None,
+              sent_end: Optional[int] = None) -> Iterator[CapturedFrame]:
+        """Frames matching every given filter, in capture order
+
+        Args:
+            start: Earliest receive time (inclusive)
+            end: Latest receive time (exclusive)
+            source_id: Only frames whose header names this source
+            packet_type: Only frames of this type (a PacketType or int)
+            sent_start: Earliest packet timestamp, on the sender's clock (inclusive)
+            sent_end: Latest packet timestamp (exclusive)
+        """
+        for segment in self._segments:
+            if not segment.count:
+                continue
+            entries = segment.entries()
+            if np is not None:
+                mask = np.ones(len(entries), dtype=bool)
+                if start is not None:
+                    mask &= entries['rx_time'] >= start
+                if end is not None:
+                    mask &= entries['rx_time'] < end
+                if source_id is not None:
+                    mask &= entries['source_id'] == source_id
+                if packet_type is not None:
+                    mask &= entries['packet_type'] == packet_type
+                if sent_start is not None:
+                    mask &= entries['timestamp'] >= sent_start
+                if sent_end is not None:
+                    mask &= entries['timestamp'] < sent_end
+                selected = entries[mask]
+                rows = zip(selected['offset'].tolist(), selected['timestamp'].tolist(),
+                           selected['source_id'].tolist(), selected['packet_type'].tolist())
+            else:
+                rows = ((offset, timestamp, source, kind)
+                        for offset, rx_time, timestamp, source, kind in entries
+                        if (start is None or rx_time >= start)
+                        and (end is None or rx_time < end)
+                        and (source_id is None or source == source_id)
+                        and (packet_type is None or kind == packet_type)
+                        and (sent_start is None or timestamp >= sent_start)
+                        and (sent_end is None or timestamp < sent_end))
+            for row in rows:
+                yield segment.frame(*row)
+
+    def time_range(self) -> Optional[tuple]:
+        """(first, last) receive time in the capture, or None if it is empty"""
+        times: List[float] = []
+        for segment in self._segments:
+            if segment.count:
+                for position in (0, segment.count - 1):
+                    times.append(INDEX_ENTRY.unpack_from(segment.index, _entry_at(position))[1])
+        return (min(times), max(times)) if times else None
+
+
+def _entry_at(position: int) -> int:
+    return FILE_HEADER.size + position * INDEX_ENTRY.size
+
+
+def _segments(directory: Path) -> List[Path]:
+    return sorted(directory.glob('[0-9][0-9][0-9][0-9][0-9][0-9].rcap'))
+
+
+def _map(path: Path) -> mmap.mmap:
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
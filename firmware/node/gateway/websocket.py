@@ -0,0 +1,306 @@
+"""Fans decoded packets and mesh changes out to browser dashboards over WebSockets
+
+The radio side calls ``Gateway.publish(packet)`` for every decoded packet.
+It never waits: the event is encoded to JSON once, and the text is queued
+for every client whose subscription matches. Each client has its own
+writer task and a bounded queue, so a slow or stalled browser only loses
+its own oldest events and never holds up receive.
+
+Clients connect to ``/ws``, optionally filtering with
+``?priority=URGENT,EMERGENCY&type=ALERT``, and may change the filter
+later by sending ``{"subscribe": {"priority": [...], "type": [...]}}``.
+Messages are JSON objects with a ``type`` of:
+
+- ``packet``: one decoded packet
+- ``mesh_snapshot``: every known node, sent once on connect
+- ``mesh``: nodes that changed since the client's last mesh message
+  (``null`` for a node that was removed)
+- ``dropped``: how many packet events this client lost to a full queue
+"""
+
+import asyncio
+import json
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from protocol.packet import PacketType, Priority
+
+try:
+    from aiohttp import WSMsgType, web
+except ImportError:  # pragma: no cover - the server needs aiohttp
+    web = None
+
+QUEUE_LIMIT = 256  # Packet events a client may fall behind by before losing the oldest
+
+
+# Payload fields (see ``protocol.payloads``) added to ``packet`` events, by packet type
+EVENT_FIELDS = {
+    PacketType.ALERT: ('alert_type', 'tone_id', 'message'),
+    PacketType.BEACON: ('callsign', 'capabilities'),
+    PacketType.ACK: ('acked', 'status'),
+    PacketType.TEXT_MESSAGE: ('text',),
+    PacketType.EMERGENCY_BROADCAST: ('text',),
+}
+
+
+def encode_packet(packet) -> str:
+    """JSON text of a ``packet`` event for dashboards"""
+    event = {
+        'type': 'packet',
+        'packet_type': packet.packet_type.name,
+        'priority': packet.priority.name,
+        'source': packet.source_id,
+        'dest': packet.dest_id,
+        'ttl': packet.ttl,
+        'timestamp': packet.timestamp,
+        'size': len(packet.payload),
+    }
+    names = EVENT_FIELDS.get(packet.packet_type)
+    if names:
+        fields = packet.fields
+        if fields is not None:
+            for name in names:
+                event[name] = getattr(fields, name)
+    return json.dumps(event, separators=(',', ':'))
+
+
+def _parse_filter(values: Optional[Iterable], enum) -> Optional[Set[int]]:
+    """Names or numbers of enum members, or None for "everything" """
+    if values is None:
+        return None
+    if isinstance(values, str):
+        values = [value for value in values.split(',') if value]
+    members = set()
+    for value in values:
+        if isinstance(value, str) and not value.isdigit():
+            members.add(int(enum[value.upper()]))
+        else:
+            members.add(int(enum(int(value))))
+    return members
+
+
+class Subscriber:
+    """One dashboard: its filter, bounded event queue and pending mesh delta
+
+    Packet events beyond ``limit`` push out the oldest queued event that
+    is not EMERGENCY, and the client is told how many it lost. Mesh
+    changes are not queued per event but merged by node, so however far
+    behind a client is, it has at most one pending delta per node.
+    """
+
+    def __init__(self, limit: int = QUEUE_LIMIT, priorities: Optional[Set[int]] = None,
+                 types: Optional[Set[int]] = None):
+        self.limit = limit
+        self.priorities = priorities
+        self.types = types
+        self.queue: Deque[Tuple[bool, str]] = deque()  # (emergency, text)
+        self.mesh: Dict[int, Optional[dict]] = {}
+        self.ready = asyncio.Event()
+        self.closed = False
+
+        self.sent = 0
+        self.dropped = 0
+        self.unreported = 0  # Drops not yet announced to the client
+        self.coalesced = 0
+
+    def wants(self, packet_type: int, priority: int) -> bool:
+        return ((self.types is None or packet_type in self.types)
+                and (self.priorities is None or priority in self.priorities))
+
+    def push(self, text: str, emergency: bool = False):
+        queue = self.queue
+        if len(queue) >= self.limit:
+            for index, (queued_emergency, _) in enumerate(queue):
+                if not queued_emergency:
+                    del queue[index]
+                    break
+            else:
+                queue.popleft()
+            self.dropped += 1
+            self.unreported += 1
+        queue.append((emergency, text))
+        self.ready.set()
+
+    def push_mesh(self, changes: Dict[int, Optional[dict]], nodes: Dict[int, dict]):
+        """Merge ``changes`` into the pending delta; ``nodes`` is the full mesh state
+
+        A removal (``None``) replaces whatever was pending for the node. A
+        change to a node whose removal is still pending sends its full state,
+        since the client will have forgotten every earlier field.
+        """
+        mesh = self.mesh
+        for node_id, state in changes.items():
+            if node_id not in mesh:
+                mesh[node_id] = None if state is None else dict(state)
+                continue
+            self.coalesced += 1
+            pending = mesh[node_id]
+            if state is None:
+                mesh[node_id] = None
+            elif pending is None:
+                mesh[node_id] = dict(nodes.get(node_id, state))
+            else:
+                pending.update(state)
+        self.ready.set()
+
+    def take(self) -> List[str]:
+        """Everything due to be sent, oldest first, leaving the queue empty"""
+        messages = []
+        if self.unreported:
+            messages.append(json.dumps({'type': 'dropped', 'count': self.unreported}))
+            self.unreported = 0
+        messages.extend(text for _, text in self.queue)
+        self.queue.clear()
+        if self.mesh:
+            messages.append(json.dumps({'type': 'mesh', 'nodes': self.mesh},
+                                       separators=(',', ':')))
+            self.mesh = {}
+        self.ready.clear()
+        return messages
+
+
+class Gateway:
+    """Event fan-out from one node to many dashboard subscribers
+
+    Matching subscribers are cached per (packet type, priority), so
+    publishing costs one encode plus one deque append per interested
+    client, whatever the filters look like.
+    """
+
+    def __init__(self, queue_limit: int = QUEUE_LIMIT):
+        self.queue_limit = queue_limit
+        self.subscribers: List[Subscriber] = []
+        self.nodes: Dict[int, dict] = {}
+        self._routes: Dict[int, List[Subscriber]] = {}
+
+        self.published = 0
+        self.unheard = 0  # Packets no subscriber wanted
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'subscribers': len(self.subscribers),
+            'published': self.published,
+            'unheard': self.unheard,
+            'sent': sum(s.sent for s in self.subscribers),
+            'dropped': sum(s.dropped for s in self.subscribers),
+            'coalesced': sum(s.coalesced for s in self.subscribers),
+            'nodes': len(self.nodes),
+        }
+
+    def subscribe(self, priorities: Optional[Iterable] = None,
+                  types: Optional[Iterable] = None) -> Subscriber:
+        """Add a subscriber; ``None`` filters accept everything"""
+        subscriber = Subscriber(self.queue_limit, _parse_filter(priorities, Priority),
+                                _parse_filter(types, PacketType))
+        self.subscribers.append(subscriber)
+        self._routes.clear()
+        return subscriber
+
+    def resubscribe(self, subscriber: Subscriber, priorities: Optional[Iterable] = None,
+                    types: Optional[Iterable] = None):
+        subscriber.priorities = _parse_filter(priorities, Priority)
+        subscriber.types = _parse_filter(types, PacketType)
+        self._routes.clear()
+
+    def unsubscribe(self, subscriber: Subscriber):
+        subscriber.closed = True
+        subscriber.ready.set()
+        if subscriber in self.subscribers:
+            self.subscribers.remove(subscriber)
+            self._routes.clear()
+
+    def publish(self, packet):
+        """Queue ``packet`` for every interested subscriber; never blocks"""
+        packet_type, priority = int(packet.packet_type), int(packet.priority)
+        key = packet_type << 8 | priority
+        targets = self._routes.get(key)
+        if targets is None:
+            targets = self._routes[key] = [s for s in self.subscribers
+                                           if s.wants(packet_type, priority)]
+        self.published += 1
+        if not targets:
+            self.unheard += 1
+            return
+        text = encode_packet(packet)
+        emergency = priority == Priority.EMERGENCY
+        for subscriber in targets:
+            subscriber.push(text, emergency)
+
+    def update_node(self, node_id: int, **fields):
+        """Merge ``fields`` into a node's mesh state and send the change"""
+        state = self.nodes.setdefault(node_id, {})
+        changed = {key: value for key, value in fields.items() if state.get(key) != value}
+        if changed:
+            state.update(changed)
+            self._mesh_delta({node_id: changed})
+
+    def remove_node(self, node_id: int):
+        if self.nodes.pop(node_id, None) is not None:
+            self._mesh_delta({node_id: None})
+
+    def attach_presence(self, tracker):
+        """Mirror a PresenceTracker's online/offline changes into the mesh view"""
+        tracker.subscribe(lambda node_id, online, callsign: self.update_node(
+            node_id, online=online, callsign=callsign))
+
+    def snapshot(self) -> str:
+        return json.dumps({'type': 'mesh_snapshot', 'nodes': self.nodes},
+                          separators=(',', ':'))
+
+    async def serve(self, send, subscriber: Subscriber):
+        """Write ``subscriber``'s events with ``await send(text)`` until it closes"""
+        try:
+            await send(self.snapshot())
+            while not subscriber.closed:
+                await subscriber.ready.wait()
+                for text in subscriber.take():
+                    await send(text)
+                    subscriber.sent += 1
+        except ConnectionError:
+            self.unsubscribe(subscriber)
+
+    def _mesh_delta(self, changes: Dict[int, Optional[dict]]):
+        for subscriber in self.subscribers:
+            subscriber.push_mesh(changes, self.nodes)
+
+
+def gateway_app(gateway: Gateway, app: Optional['web.Application'] = None,
+                heartbeat: Optional[float] = 30.0) -> 'web.Application':
+    """Add the ``/ws`` endpoint to ``app`` (e.g. the metrics app), or to a new one
+
+    Clients that miss a ping for ``heartbeat`` seconds are closed; None
+    keeps them until their connection drops.
+    """
+    if web is None:
+        raise RuntimeError("The WebSocket gateway needs aiohttp")
+    app = web.Application() if app is None else app
+
+    async def websocket(request):
+        ws = web.WebSocketResponse(heartbeat=heartbeat)
+        await ws.prepare(request)
+        try:
+            subscriber = gateway.subscribe(request.query.get('priority'),
+                                           request.query.get('type'))
+        except (KeyError, ValueError):
+            await ws.close(message=b"unknown priority or packet type")
+            return ws
+        writer = asyncio.ensure_future(gateway.serve(ws.send_str, subscriber))
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                try:
+                    request_filter = json.loads(message.data)['subscribe']
+                    gateway.resubscribe(subscriber, request_filter.get('priority'),
+                                        request_filter.get('type'))
+                except (KeyError, ValueError, TypeError, AttributeError):
+                    await ws.send_str(json.dumps({'type': 'error',
+                                                  'error': "bad subscribe request"}))
+        finally:
+            gateway.unsubscribe(subscriber)
+            writer.cancel()
+        return ws
+
+    app.router.add_get('/ws', websocket)
+    return app
@@ -0,0 +1,31 @@
+"""Shared deflate dictionary for compressed ALERT messages (PROTOCOL_SPEC §3.7)
+
+Sender and receiver must hold byte-identical dictionaries, so this is
+protocol data: never edit it in place. A new phrase list needs its own
+flag bit or version.
+
+Deflate finds matches by distance back from the end of the dictionary,
+so the most frequent phrases come last.
+"""
+
+ALERT_PHRASES = (
+    "Helipad", "Pharmacy", "Radiology", "Theatre", "Maternity", "Paediatrics",
+    "Oncology", "Cardiology", "Outpatients", "Day Surgery", "Main Entrance",
+    "Car Park", "Lift", "Stairwell", "Corridor", "Basement", "Ground Floor",
+    "First Floor", "Second Floor", "Third Floor", "North Wing", "South Wing",
+    "East Wing", "West Wing", "Block A", "Block B", "Block C",
+    "Code Pink - infant abduction", "Code Grey - violent person",
+    "Code Black - bomb threat", "Code Orange - major incident",
+    "Hazardous spill", "Power failure", "Water leak", "Lockdown",
+    "Oxygen supply failure", "Security to", "Porter to", "Crash team to",
+    "Trauma team to", "Stroke team to", "Sepsis alert", "Rapid response to",
+    "Patient fall", "Patient missing", "Staff assault", "Doctor to",
+    "Nurse to", "Consultant to", "on call", "immediately", "ETA",
+    "minutes", "ambulance arriving", "Resus", "Bay", "Side Room",
+    "Room", "Ward", "Bed", "ICU", "A&E", "Emergency Department",
+    "Smoke reported", "Fire alarm", "Fire in", "EVACUATE BUILDING",
+    "Evacuate", "Code Red - fire", "Code Blue - cardiac arrest",
+    "Code Blue", "Cardiac arrest", "MAYDAY", "TQ",
+)
+
+ALERT_DICTIONARY = ' '.join(ALERT_PHRASES).encode('utf-8')
@@ -0,0 +1,141 @@
+"""CRC16-CCITT checksum engine for RoamEN packets (PROTOCOL_SPEC §4.1)"""
+
+import binascii
+from typing import Iterable, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional on Pi Zero builds
+    np = None
+
+POLYNOMIAL = 0x1021
+INITIAL = 0xFFFF
+
+
+def _build_table() -> List[int]:
+    """Precompute the CRC of every possible top byte"""
+    table = []
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = ((crc << 1) ^ POLYNOMIAL) & 0xFFFF
+            else:
+                crc = (crc << 1) & 0xFFFF
+        table.append(crc)
+    return table
+
+
+TABLE = tuple(_build_table())
+
+
+def update(crc: int, chunk) -> int:
+    """Feed another chunk of bytes into a running CRC.
+
+    Uses the C implementation in ``binascii.crc_hqx``, which is the same
+    MSB-first 0x1021 polynomial as the spec with a caller-supplied register.
+
+    Args:
+        crc: Running CRC value (start with ``INITIAL``)
+        chunk: Any bytes-like object (bytes, bytearray, memoryview)
+
+    Returns:
+        Updated 16-bit CRC value
+    """
+    return binascii.crc_hqx(chunk, crc)
+
+
+def update_table(crc: int, chunk) -> int:
+    """Table-driven equivalent of ``update`` in pure Python"""
+    table = TABLE
+    for byte in chunk:
+        crc = ((crc << 8) & 0xFFFF) ^ table[(crc >> 8) ^ byte]
+    return crc
+
+
+def crc16(data, crc: int = INITIAL) -> int:
+    """Calculate CRC16-CCITT over a single buffer"""
+    return binascii.crc_hqx(data, crc)
+
+
+def crc16_many(buffers: Iterable, crc: int = INITIAL) -> List[int]:
+    """Calculate CRC16-CCITT for many buffers at once.
+
+    Args:
+        buffers: Iterable of bytes-like objects
+        crc: Initial register value for every buffer
+
+    Returns:
+        List of CRC values in the same order as ``buffers``
+    """
+    crc_hqx = binascii.crc_hqx
+    return [crc_hqx(buf, crc) for buf in buffers]
+
+
+def crc16_array(buffers: List[bytes], crc: int = INITIAL,
+                lengths: Optional['np.ndarray'] = None) -> 'np.ndarray':
+    """Vectorised CRC16 over a list of buffers, returning a uint16 array.
+
+    Buffers are sorted by length and processed one byte column at a time
+    across all of them, so the Python-level loop runs once per byte position
+    rather than once per byte. Use this when frames already live in a NumPy
+    matrix; for a list of bytes objects ``crc16_many`` is faster.
+
+    Args:
+        buffers: List of bytes objects, or a 2-D uint8 array of rows
+        crc: Initial register value for every buffer
+        lengths: Row lengths when ``buffers`` is a padded 2-D array
+
+    Returns:
+        ``np.ndarray`` of dtype uint16, one CRC per buffer
+    """
+    if np is None:
+        raise RuntimeError("crc16_array requires numpy")
+
+    if isinstance(buffers, np.ndarray):
+        matrix = buffers
+        if lengths is None:
+            lengths = np.full(len(matrix), matrix.shape[1], dtype=np.int64)
+    else:
+        lengths = np.fromiter((len(b) for b in buffers), dtype=np.int64,
+                              count=len(buffers))
+        width = int(lengths.max()) if len(buffers) else 0
+        matrix = np.zeros((len(buffers), width), dtype=np.uint8)
+        for row, buf in enumerate(buffers):
+            matrix[row, :len(buf)] = np.frombuffer(buf, dtype=np.uint8)
+
+    table = _numpy_table()
+    count = len(matrix)
+    result = np.full(count, crc, dtype=np.uint16)
+    if count == 0:
+        return result
+
+    # Longest rows first: at column j only a prefix of rows is still active
+    order = np.argsort(-lengths, kind='stable')
+    sorted_rows = matrix[order]
+    sorted_lengths = lengths[order]
+    active_counts = np.searchsorted(-sorted_lengths, -np.arange(matrix.shape[1]),
+                                    side='left')
+
+    regs = result.copy()
+    for column in range(matrix.shape[1]):
+        active = int(active_counts[column])
+        if active == 0:
+            break
+        reg = regs[:active]
+        index = (reg >> 8) ^ sorted_rows[:active, column]
+        regs[:active] = (reg << 8) ^ table[index]
+
+    result[order] = regs
+    return result
+
+
+_NUMPY_TABLE = None
+
+
+def _numpy_table() -> 'np.ndarray':
+    """Lazily materialise the lookup table as a uint16 array"""
+    global _NUMPY_TABLE
+    if _NUMPY_TABLE is None:
+        _NUMPY_TABLE = np.array(TABLE, dtype=np.uint16)
+    return _NUMPY_TABLE
@@ -0,0 +1,238 @@
+"""Duplicate suppression for relayed and flooded packets (PROTOCOL_SPEC §6.3)"""
+
+import struct
+import time
+from array import array
+from collections import OrderedDict
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from . import crc
+from .packet import ATTEMPT_OFFSET, RoamENPacket, widen_timestamp
+
+# (source_id, timestamp, type, payload CRC, attempt); key[:-1] names the original packet
+DuplicateKey = Tuple[int, int, int, int, int]
+
+# source_id (6), dest_id (8), priority (10), ttl (11), timestamp (12), payload_len (16)
+_KEY_FIELDS = struct.Struct('=H H B B I H')
+# Compact (§2.5): type|priority (3), source_id (4), dest_id (6), ttl (8), timestamp (9),
+# payload_len (11)
+_COMPACT_KEY_FIELDS = struct.Struct('!B H H B H H')
+
+
+def frame_key(buffer, offset: int = 0, now: Optional[float] = None) -> DuplicateKey:
+    """Build the duplicate key straight from a raw frame, without decoding it.
+
+    The key is (source_id, timestamp, type, payload CRC, attempt). The
+    header CHECKSUM is not used because every relay rewrites TTL and with it
+    the checksum (§5.4), so copies of one packet heard over different paths
+    would differ. ATTEMPT is included so a retransmission is relayed again
+    rather than suppressed as a copy of the transmission that went missing.
+    Compact frames have no ATTEMPT (it is 0) and their 16-bit timestamp is
+    widened as ``RoamENPacket.unpack`` does, so the key still matches
+    ``packet_key`` of the decoded packet.
+
+    Args:
+        buffer: Receive buffer holding a validated frame
+        offset: Start of the frame within ``buffer``
+        now: Receiver's Unix time for compact frames (defaults to ``time.time()``)
+
+    Returns:
+        Hashable key identifying the original transmission
+    """
+    view = buffer if isinstance(buffer, memoryview) else memoryview(buffer)
+    if view[offset:offset + 3] == RoamENPacket.COMPACT_SIGNATURE:
+        (type_priority, source_id, _, _, timestamp,
+         payload_len) = _COMPACT_KEY_FIELDS.unpack_from(view, offset + 3)
+        code = type_priority & 0x0F
+        start = offset + RoamENPacket.COMPACT_HEADER_SIZE
+        return (source_id, widen_timestamp(timestamp, now),
+                RoamENPacket.COMPACT_TYPES.get(code, code),
+                crc.crc16(view[start:start + payload_len]), 0)
+    source_id, _, _, _, timestamp, payload_len = _KEY_FIELDS.unpack_from(view, offset + 6)
+    start = offset + RoamENPacket.HEADER_SIZE
+    return (source_id, timestamp, view[offset + 5],
+            crc.crc16(view[start:start + payload_len]), view[offset + ATTEMPT_OFFSET])
+
+
+def packet_key(packet) -> DuplicateKey:
+    """Duplicate key for a decoded RoamENPacket or PacketView"""
+    return (packet.source_id, packet.timestamp, int(packet.packet_type),
+            crc.crc16(packet.payload), packet.attempt)
+
+
+class _FingerprintWindow:
+    """Two rotating generations of direct-mapped 32-bit key fingerprints
+
+    Each key hashes to one slot and stores a fingerprint there, overwriting
+    whatever was in it. A collision can therefore forget a key (one extra
+    relay) but practically never reports an unseen key as a duplicate, which
+    is the failure we cannot afford with EMERGENCY traffic. A lookup is one
+    hash and two array reads.
+    """
+
+    def __init__(self, slots: int, window: float, now: float):
+        if slots & (slots - 1) or slots < 1:
+            raise ValueError("fingerprint_slots must be a power of two")
+        self.mask = slots - 1
+        self.window = window
+        self.current = array('I', bytes(4 * slots))
+        self.previous = array('I', bytes(4 * slots))
+        self.rotated_at = now
+
+    def rotate(self, now: float):
+        if now - self.rotated_at >= 2 * self.window:
+            self.previous = array('I', bytes(4 * len(self.current)))
+        else:
+            self.previous = self.current
+        self.current = array('I', bytes(4 * len(self.previous)))
+        self.rotated_at = now
+
+    def check_and_add(self, key) -> bool:
+        """Store ``key`` in the current generation; report if either had it"""
+        value = hash(key)
+        slot = value & self.mask
+        fingerprint = ((value >> 32) & 0xFFFFFFFF) | 1  # 0 marks an empty slot
+        current = self.current
+        seen = current[slot] == fingerprint or self.previous[slot] == fingerprint
+        current[slot] = fingerprint
+        return seen
+
+
+class DuplicateCache:
+    """Two-tier duplicate detector with bounded memory
+
+    The exact tier is an LRU (OrderedDict) of recently seen keys, each
+    expiring ``ttl`` seconds after it was last heard. Keys evicted from it
+    for capacity still hit the probabilistic tier, two rotating generations
+    of fingerprints covering the last half to full TTL, so a long flood
+    cannot push an early copy out of memory. All lookups are O(1).
+    """
+
+    def __init__(self, capacity: int = 1024, ttl: float = 60.0,
+                 fingerprint_slots: int = 1 << 13,
+                 clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: 'OrderedDict[DuplicateKey, float]' = OrderedDict()
+        self._recent = _FingerprintWindow(fingerprint_slots, ttl / 2, clock())
+
+        self.exact_hits = 0
+        self.probable_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def stats(self) -> dict:
+        """Hit/miss counters and current occupancy"""
+        lookups = self.exact_hits + self.probable_hits + self.misses
+        return {
+            'exact_hits': self.exact_hits,
+            'probable_hits': self.probable_hits,
+            'misses': self.misses,
+            'hit_ratio': (self.exact_hits + self.probable_hits) / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'entries': len(self._entries),
+            'memory_bytes': self.memory_bytes,
+        }
+
+    @property
+    def memory_bytes(self) -> int:
+        """Approximate footprint: fingerprint arrays plus the LRU dictionary"""
+        recent = self._recent
+        fingerprints = (len(recent.current) + len(recent.previous)) * recent.current.itemsize
+        # Key tuple (5 small ints) + float + OrderedDict node/slot
+        return fingerprints + self.capacity * 200
+
+    def seen(self, key: DuplicateKey, now: Optional[float] = None) -> bool:
+        """Record ``key`` and report whether it was already seen.
+
+        Args:
+            key: Result of ``frame_key`` or ``packet_key``
+            now: Current time (defaults to the cache clock)
+
+        Returns:
+            True if the packet is a duplicate and should be dropped
+        """
+        if now is None:
+            now = self.clock()
+        entries = self._entries
+        if entries and entries[next(iter(entries))] <= now:
+            self._expire(now)
+        recent = self._recent
+        if now - recent.rotated_at >= recent.window:
+            recent.rotate(now)
+
+        if key in entries:
+            entries[key] = now + self.ttl
+            entries.move_to_end(key)
+            self.exact_hits += 1
+            return True
+
+        duplicate = recent.check_and_add(key)
+        if duplicate:
+            self.probable_hits += 1
+        else:
+            self.misses += 1
+
+        entries[key] = now + self.ttl
+        if len(entries) > self.capacity:
+            entries.popitem(last=False)
+            self.evictions += 1
+        return duplicate
+
+    def seen_many(self, keys: Sequence[DuplicateKey], now: Optional[float] = None) -> List[bool]:
+        """``seen`` for keys heard together, in order; expiry and rotation run once"""
+        if now is None:
+            now = self.clock()
+        entries = self._entries
+        if entries and entries[next(iter(entries))] <= now:
+            self._expire(now)
+        recent = self._recent
+        if now - recent.rotated_at >= recent.window:
+            recent.rotate(now)
+
+        expires = now + self.ttl
+        check_and_add = recent.check_and_add
+        capacity = self.capacity
+        exact = probable = evictions = 0
+        results = []
+        for key in keys:
+            if key in entries:
+                entries[key] = expires
+                entries.move_to_end(key)
+                exact += 1
+                results.append(True)
+                continue
+            duplicate = check_and_add(key)
+            probable += duplicate
+            entries[key] = expires
+            if len(entries) > capacity:
+                entries.popitem(last=False)
+                evictions += 1
+            results.append(duplicate)
+        self.exact_hits += exact
+        self.probable_hits += probable
+        self.misses += len(results) - exact - probable
+        self.evictions += evictions
+        return results
+
+    def seen_frame(self, buffer, offset: int = 0, now: Optional[float] = None) -> bool:
+        """``seen`` for a raw frame, for use before the payload is decoded"""
+        return self.seen(frame_key(buffer, offset), now)
+
+    def _expire(self, now: float):
+        """Drop exact entries past their TTL"""
+        entries = self._entries
+        # Entries are ordered by last refresh, which is also expiry order
+        while entries:
+            key = next(iter(entries))
+            if entries[key] > now:
+                break
+            del entries[key]
+            self.expirations += 1
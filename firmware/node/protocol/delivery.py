@@ -0,0 +1,299 @@
+"""Acknowledged delivery with adaptive retransmission timers (PROTOCOL_SPEC §3.8, §7.4)"""
+
+import asyncio
+import bisect
+import heapq
+import random
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .dedup import DuplicateCache, packet_key
+from .packet import AckPacket, PacketType, Priority, RoamENPacket
+
+BROADCAST = 0xFFFF
+
+INITIAL_RTO = 5.0     # Until a destination has an RTT sample (§7.4)
+MIN_RTO = 0.5
+MAX_RTO = 120.0
+RTT_ALPHA = 1 / 8     # SRTT gain (RFC 6298)
+RTT_BETA = 1 / 4      # RTTVAR gain
+RTO_K = 4             # RTTVAR multiplier in the RTO
+BACKOFF_JITTER = 0.2  # Each backed-off timeout is scaled by 1 ± this
+
+# Retransmissions allowed before a packet is reported undelivered
+MAX_RETRIES = {
+    Priority.INFO: 1,
+    Priority.NORMAL: 3,
+    Priority.URGENT: 5,
+    Priority.EMERGENCY: 8,
+}
+
+# Upper bounds (s) of the delivery latency histogram buckets; the last is open
+LATENCY_BUCKETS = (0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0, float('inf'))
+_BUCKET_LABELS = tuple(f"<={bound:g}s" for bound in LATENCY_BUCKETS[:-1]) + (
+    f">{LATENCY_BUCKETS[-2]:g}s",)
+
+DeliveryKey = Tuple[int, int, int]  # (source_id, timestamp, local sequence number)
+
+# (key, delivered, latency in s, or None if not delivered)
+DeliveryCallback = Callable[[DeliveryKey, bool, Optional[float]], None]
+
+
+class RttEstimator:
+    """SRTT/RTTVAR retransmission timeout for one destination (RFC 6298)"""
+
+    __slots__ = ('srtt', 'rttvar', 'rto', 'samples')
+
+    def __init__(self, initial_rto: float = INITIAL_RTO):
+        self.srtt: Optional[float] = None
+        self.rttvar = 0.0
+        self.rto = initial_rto
+        self.samples = 0
+
+    def update(self, sample: float):
+        if self.srtt is None:
+            self.srtt = sample
+            self.rttvar = sample / 2
+        else:
+            self.rttvar += RTT_BETA * (abs(self.srtt - sample) - self.rttvar)
+            self.srtt += RTT_ALPHA * (sample - self.srtt)
+        self.rto = min(max(self.srtt + RTO_K * self.rttvar, MIN_RTO), MAX_RTO)
+        self.samples += 1
+
+
+class _Outstanding:
+    __slots__ = ('packet', 'dest_id', 'retries', 'first_sent', 'last_sent', 'deadline')
+
+    def __init__(self, packet: RoamENPacket, now: float, deadline: float):
+        self.packet = packet
+        self.dest_id = packet.dest_id
+        self.retries = 0
+        self.first_sent = now
+        self.last_sent = now
+        self.deadline = deadline
+
+
+class DeliveryManager:
+    """Retransmits unicast packets until they are acknowledged
+
+    An ACK names a packet by (source_id, timestamp), which several packets
+    sent in the same second share, so each tracked packet is keyed by that
+    pair plus a local sequence number and timestamps are left as sent. An
+    ACK settles the oldest outstanding packet with its pair to the node
+    that sent it, never more packets than it acknowledges. Deadlines live
+    in a heap. An ACK only removes the entry, and its heap slot is
+    discarded when it surfaces (lazy deletion), so both ``send`` and an ACK
+    cost O(log n).
+
+    Each destination has its own SRTT/RTTVAR estimate, because a one-hop
+    neighbour and a node five hops away need very different timeouts.
+    Following Karn's rule, only packets acknowledged without a
+    retransmission give RTT samples. Each timeout doubles that packet's
+    RTO, with random jitter so nodes that lost the same ACK do not retry in
+    step. After ``max_retries[priority]`` retransmissions the packet is
+    reported undelivered. Each retransmission carries its number in the
+    ATTEMPT header field, so relays forward it instead of suppressing it as
+    a copy of the transmission that went missing.
+
+    ``receive`` is the destination's side: it ACKs every copy of a packet,
+    including retransmissions of one already delivered, whose ACK was lost.
+    """
+
+    def __init__(self, node_id: int, max_retries: Optional[Dict[Priority, int]] = None,
+                 initial_rto: float = INITIAL_RTO,
+                 clock: Callable[[], float] = time.monotonic,
+                 rng: Optional[random.Random] = None):
+        self.node_id = node_id
+        self.max_retries = MAX_RETRIES if max_retries is None else max_retries
+        self.initial_rto = initial_rto
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self._outstanding: Dict[DeliveryKey, _Outstanding] = {}
+        self._heap: List[Tuple[float, DeliveryKey]] = []
+        self._estimators: Dict[int, RttEstimator] = {}
+        self._subscribers: List[DeliveryCallback] = []
+        self._waiting: Dict[Tuple[int, int], List[DeliveryKey]] = {}  # By (source, timestamp)
+        self._sequence = 0
+        self._received = DuplicateCache(clock=clock)
+        self._changed: Optional[asyncio.Event] = None
+
+        self.histogram = [0] * len(LATENCY_BUCKETS)
+        self.sent = 0
+        self.retransmitted = 0
+        self.delivered = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return len(self._outstanding)
+
+    def subscribe(self, callback: DeliveryCallback):
+        """Call ``callback(key, delivered, latency)`` once per packet sent"""
+        self._subscribers.append(callback)
+
+    def estimator(self, dest_id: int) -> RttEstimator:
+        estimator = self._estimators.get(dest_id)
+        if estimator is None:
+            estimator = self._estimators[dest_id] = RttEstimator(self.initial_rto)
+        return estimator
+
+    def send(self, packet: RoamENPacket, now: Optional[float] = None) -> DeliveryKey:
+        """Start tracking ``packet``; the caller transmits it.
+
+        Returns:
+            Its (source_id, timestamp, sequence) key; an ACK carries the first two
+        """
+        if packet.dest_id == BROADCAST:
+            raise ValueError("Broadcast packets are not acknowledged")
+        if now is None:
+            now = self.clock()
+        key = (packet.source_id, packet.timestamp, self._sequence)
+        self._sequence += 1
+
+        entry = _Outstanding(packet, now, now + self.estimator(packet.dest_id).rto)
+        self._outstanding[key] = entry
+        self._waiting.setdefault(key[:2], []).append(key)
+        heapq.heappush(self._heap, (entry.deadline, key))
+        self.sent += 1
+        if self._changed is not None:
+            self._changed.set()
+        return key
+
+    def on_packet(self, packet, now: Optional[float] = None) -> int:
+        """Handle a received ACK (single or block form).
+
+        Returns:
+            Number of tracked packets it settled
+        """
+        info = AckPacket.parse(packet)
+        if info is None:
+            return 0
+        if now is None:
+            now = self.clock()
+        settled = 0
+        for pair in info['acked']:
+            for key in self._waiting.get(pair, ()):
+                entry = self._outstanding[key]
+                if entry.dest_id == packet.source_id:
+                    break
+            else:
+                continue
+            self._forget(key)
+            settled += 1
+            if info['status']:
+                # The destination refused it: resending will not help
+                self.rejected += 1
+                self._publish(key, False, None)
+                continue
+            if not entry.retries:
+                self.estimator(entry.dest_id).update(now - entry.last_sent)
+            latency = now - entry.first_sent
+            self.histogram[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+            self.delivered += 1
+            self._publish(key, True, latency)
+        return settled
+
+    @property
+    def next_deadline(self) -> Optional[float]:
+        """When ``poll`` next has work, or None if nothing is outstanding"""
+        heap = self._heap
+        while heap and self._is_stale(heap[0]):
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def poll(self, now: Optional[float] = None) -> List[RoamENPacket]:
+        """Packets whose timeout has expired and should be transmitted again"""
+        if now is None:
+            now = self.clock()
+        heap = self._heap
+        due = []
+        while heap and heap[0][0] <= now:
+            item = heapq.heappop(heap)
+            if self._is_stale(item):
+                continue
+            key = item[1]
+            entry = self._outstanding[key]
+            limit = self.max_retries.get(entry.packet.priority, 0)
+            if entry.retries >= limit:
+                self._forget(key)
+                self.failed += 1
+                self._publish(key, False, None)
+                continue
+            entry.retries += 1
+            entry.last_sent = now
+            entry.packet.attempt = min(entry.retries, 0xFF)
+            rto = self.estimator(entry.dest_id).rto * 2 ** entry.retries
+            rto *= 1 + self.rng.uniform(-BACKOFF_JITTER, BACKOFF_JITTER)
+            entry.deadline = now + min(rto, MAX_RTO)
+            heapq.heappush(heap, (entry.deadline, key))
+            self.retransmitted += 1
+            due.append(entry.packet)
+        return due
+
+    def receive(self, packet,
+                now: Optional[float] = None) -> Tuple[bool, Optional[RoamENPacket]]:
+        """Destination side: decide whether to deliver ``packet`` and ACK it
+
+        Returns:
+            (new, ack): ``new`` is False for a copy of a packet already
+            delivered, whatever its ATTEMPT; ``ack`` is the ACK to send for
+            every unicast packet addressed to this node, copies included.
+            Packets that take no ACK (broadcasts, ACKs, traffic for other
+            nodes) come back as (True, None).
+        """
+        if (packet.dest_id != self.node_id or packet.source_id == self.node_id
+                or packet.packet_type == PacketType.ACK):
+            return True, None
+        new = not self._received.seen(packet_key(packet)[:-1], now)
+        return new, AckPacket.create(self.node_id, packet.source_id, packet.source_id,
+                                     packet.timestamp)
+
+    async def run(self, submit: Callable[[RoamENPacket], Awaitable[None]]):
+        """Hand due retransmissions to ``submit`` (e.g. TxScheduler.submit) as they fall due"""
+        self._changed = asyncio.Event()
+        while True:
+            for packet in self.poll():
+                await submit(packet)
+            deadline = self.next_deadline
+            self._changed.clear()
+            timeout = None if deadline is None else max(deadline - self.clock(), 0.0)
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def latency_histogram(self) -> Dict[str, int]:
+        """Delivered packets per latency bucket, labelled by upper bound"""
+        return dict(zip(_BUCKET_LABELS, self.histogram))
+
+    def metrics(self) -> dict:
+        """Counters, latency histogram and the RTT estimate for each destination"""
+        return {
+            'outstanding': len(self._outstanding),
+            'sent': self.sent,
+            'retransmitted': self.retransmitted,
+            'delivered': self.delivered,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'latency': self.latency_histogram(),
+            'destinations': {
+                dest_id: {'srtt': estimator.srtt, 'rttvar': estimator.rttvar,
+                          'rto': estimator.rto, 'samples': estimator.samples}
+                for dest_id, estimator in self._estimators.items()
+            },
+        }
+
+    def _is_stale(self, item: Tuple[float, DeliveryKey]) -> bool:
+        entry = self._outstanding.get(item[1])
+        return entry is None or entry.deadline != item[0]
+
+    def _forget(self, key: DeliveryKey):
+        del self._outstanding[key]
+        keys = self._waiting[key[:2]]
+        keys.remove(key)
+        if not keys:
+            del self._waiting[key[:2]]
+
+    def _publish(self, key: DeliveryKey, delivered: bool, latency: Optional[float]):
+        for callback in self._subscribers:
+            callback(key, delivered, latency)
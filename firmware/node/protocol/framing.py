@@ -0,0 +1,200 @@
+"""Frame synchronisation for continuous RoamEN byte streams (PROTOCOL_SPEC §2.4.1)"""
+
+import asyncio
+import struct
+from collections import deque
+from typing import Deque, Iterable, Iterator, List, Optional
+
+from .metrics import METRICS, DecodeMetrics
+from .packet import (COMPACT_CHECKSUM_OFFSET, COMPACT_LENGTH_OFFSET, RoamENPacket,
+                     frame_checksum)
+
+MAX_PAYLOAD = 512  # Bounds how long we wait on a (possibly corrupt) length field
+_U16 = struct.Struct('H')
+_COMPACT_U16 = struct.Struct('!H')
+
+
+class FrameSync:
+    """Recover frames from a byte stream with noise, partial and lost bytes
+
+    Incoming bytes are appended to a single buffer. The scanner keeps a read
+    position, jumps between sync words with ``bytearray.find`` and, after a
+    checksum failure, resumes one byte past the bad sync word, so every byte
+    is examined a bounded number of times no matter how noisy the link is.
+    Classic and compact (§2.5) frames may be interleaved on the same stream.
+    Frames are also counted, per type and priority, in ``metrics``.
+    """
+
+    def __init__(self, max_payload: int = MAX_PAYLOAD,
+                 metrics: Optional[DecodeMetrics] = None):
+        self.max_payload = max_payload
+        self.metrics = METRICS if metrics is None else metrics
+        self._buffer = bytearray()
+        self._resyncing = False
+
+        self.bytes_received = 0
+        self.bytes_skipped = 0
+        self.frames_decoded = 0
+        self.frames_recovered = 0
+        self.checksum_failures = 0
+        self.frames_dropped = 0
+
+    @property
+    def stats(self) -> dict:
+        """Counters since the synchroniser was created"""
+        return {
+            'bytes_received': self.bytes_received,
+            'bytes_skipped': self.bytes_skipped,
+            'bytes_buffered': len(self._buffer),
+            'frames_decoded': self.frames_decoded,
+            'frames_recovered': self.frames_recovered,
+            'checksum_failures': self.checksum_failures,
+            'frames_dropped': self.frames_dropped,
+        }
+
+    def feed(self, data) -> List[RoamENPacket]:
+        """Append received bytes and return every complete frame now available.
+
+        Args:
+            data: Next chunk of the byte stream (any bytes-like object)
+
+        Returns:
+            Decoded packets in stream order (possibly empty)
+        """
+        self.bytes_received += len(data)
+        self._buffer += data
+        packets = []
+        with memoryview(self._buffer) as view:
+            consumed = self._scan(view, packets)
+        # bytearray drops a prefix by moving its start pointer, not by copying
+        del self._buffer[:consumed]
+        return packets
+
+    def frames(self, chunks: Iterable) -> Iterator[RoamENPacket]:
+        """Generator API: yield packets as they are recovered from ``chunks``"""
+        for chunk in chunks:
+            yield from self.feed(chunk)
+
+    def _scan(self, view: memoryview, packets: List[RoamENPacket]) -> int:
+        """Decode frames from the buffer, returning how many bytes were consumed"""
+        buffer = self._buffer
+        metrics = self.metrics
+        sync = RoamENPacket.SYNC
+        compact_sync = RoamENPacket.COMPACT_SIGNATURE
+        available = len(buffer)
+        pos = 0
+        classic_at = compact_at = -1
+
+        while True:
+            # Each search result (``available`` = none left) holds until the scan passes it
+            if classic_at < pos:
+                classic_at = buffer.find(sync, pos) % (available + 1)
+            if compact_at < pos:
+                compact_at = buffer.find(compact_sync, pos) % (available + 1)
+            sync_at = min(classic_at, compact_at)
+            if sync_at == available:
+                # Keep a tail that could be the start of a split sync word
+                keep_from = max(pos, available - (len(sync) - 1))
+                self._skip(keep_from - pos)
+                return keep_from
+
+            compact = compact_at < classic_at
+            self._skip(sync_at - pos)
+            pos = sync_at
+            if compact:
+                header_size = RoamENPacket.COMPACT_HEADER_SIZE
+                if available - pos < header_size:
+                    return pos
+                payload_len = _COMPACT_U16.unpack_from(view, pos + COMPACT_LENGTH_OFFSET)[0]
+            else:
+                header_size = RoamENPacket.HEADER_SIZE
+                if available - pos < header_size:
+                    return pos
+                payload_len = _U16.unpack_from(view, pos + 16)[0]
+            if payload_len > self.max_payload:
+                # Sync word inside noise or payload: step past it
+                self._resync()
+                pos += 1
+                continue
+
+            end = pos + header_size + payload_len
+            if end > available:
+                return pos
+
+            metrics.countdown -= 1
+            if metrics.countdown <= 0:
+                # Reset now: a sample that fails its checksum is never observed
+                metrics.countdown = metrics.time_every
+                start = metrics.clock()
+            else:
+                start = 0
+            if compact:
+                expected = _COMPACT_U16.unpack_from(view, pos + COMPACT_CHECKSUM_OFFSET)[0]
+                valid = expected == frame_checksum(view, pos, end, COMPACT_CHECKSUM_OFFSET)
+                frame = None
+            else:
+                frame = RoamENPacket.unpack_view(view, pos)
+                valid = frame is not None
+            if not valid:
+                self.checksum_failures += 1
+                if compact:
+                    code = view[pos + 3]
+                    metrics.record_checksum_failure(
+                        RoamENPacket.COMPACT_TYPES.get(code & 0x0F, code & 0x0F), code >> 4)
+                else:
+                    metrics.record_checksum_failure(view[pos + 5], view[pos + 10])
+                self._resync()
+                pos += 1
+                continue
+
+            try:
+                if compact:
+                    # Built from the view just verified, as the classic path does
+                    packet = RoamENPacket._from_compact(view, pos, None)
+                    packets.append(packet)
+                    metrics.record_decoded(packet.packet_type, packet.priority)
+                else:
+                    packets.append(frame.to_packet())
+                    metrics.record_decoded(view[pos + 5], view[pos + 10])
+            except ValueError:
+                # Unknown packet type or priority: drop silently (§4.3)
+                self.frames_dropped += 1
+                metrics.record_dropped('unknown_type')
+            else:
+                self.frames_decoded += 1
+                if start:
+                    metrics.observe(metrics.clock() - start)
+                if self._resyncing:
+                    self.frames_recovered += 1
+            self._resyncing = False
+            pos = end
+
+    def _skip(self, count: int):
+        self.bytes_skipped += count
+
+    def _resync(self):
+        """Discard a false or damaged sync word; the next good frame counts as recovered"""
+        self.bytes_skipped += 1
+        self._resyncing = True
+
+
+class FrameReader:
+    """Asyncio API: ``async for packet in FrameReader(stream_reader)``"""
+
+    def __init__(self, stream: asyncio.StreamReader, sync: Optional[FrameSync] = None,
+                 chunk_size: int = 512):
+        self.stream = stream
+        self.sync = sync or FrameSync()
+        self.chunk_size = chunk_size
+        self._pending: Deque[RoamENPacket] = deque()
+
+    def __aiter__(self) -> 'FrameReader':
+        return self
+
+    async def __anext__(self) -> RoamENPacket:
+        while not self._pending:
+            chunk = await self.stream.read(self.chunk_size)
+            if not chunk:
+                raise StopAsyncIteration
+            self._pending.extend(self.sync.feed(chunk))
+        return self._pending.popleft()
@@ -0,0 +1,207 @@
+"""Receive-path instrumentation: decode counters, timing histogram, sampled log
+
+Every frame handed to ``RoamENPacket.unpack`` or a ``FrameSync`` is counted
+in a ``DecodeMetrics`` (the shared ``METRICS`` unless another is passed).
+Recording is a dictionary increment keyed by plain ints, decode time is
+measured on one frame in ``time_every`` and checksum failures are logged
+at DEBUG on one failure in ``log_every``, so it can stay on in production.
+
+``metrics_app`` / ``serve_metrics`` expose the counters over HTTP for
+scraping: ``/metrics`` in the Prometheus text format, ``/metrics.json``
+as JSON.
+"""
+
+import bisect
+import json
+import logging
+import re
+import time
+from typing import Callable, Dict, Mapping, Optional, Tuple
+
+try:
+    from aiohttp import web
+except ImportError:  # pragma: no cover - only the HTTP endpoint needs aiohttp
+    web = None
+
+logger = logging.getLogger('roamen.protocol')
+
+# Upper bounds (ns) of the decode time histogram buckets; the last is open
+DECODE_BUCKETS_NS = (1_000, 2_000, 5_000, 10_000, 20_000, 50_000, 100_000, 1_000_000,
+                     float('inf'))
+
+# Why a frame was dropped without being decoded
+DROP_REASONS = ('short', 'sync', 'truncated', 'unknown_type')
+
+Source = Callable[[], dict]
+
+
+class DecodeMetrics:
+    """Counters for frames decoded, dropped and failing their checksum
+
+    Decoded and checksum-failed frames are counted per (packet type,
+    priority) as found in the header; ``snapshot`` adds the per-type and
+    per-priority totals. A failed frame's header is unverified, so its
+    type and priority are only a hint.
+    """
+
+    def __init__(self, time_every: int = 64, log_every: int = 1000,
+                 clock: Callable[[], int] = time.perf_counter_ns):
+        self.time_every = time_every
+        self.log_every = log_every
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        self.decoded: Dict[int, int] = {}          # type << 8 | priority -> frames
+        self.checksum_failed: Dict[int, int] = {}  # type << 8 | priority -> frames
+        self.dropped = dict.fromkeys(DROP_REASONS, 0)
+        self.decode_ns = [0] * len(DECODE_BUCKETS_NS)
+        self.decode_ns_sum = 0
+        self.countdown = self.time_every
+        self._failures = 0
+
+    def record_decoded(self, packet_type: int, priority: int, count: int = 1):
+        key = packet_type << 8 | priority
+        self.decoded[key] = self.decoded.get(key, 0) + count
+
+    def record_dropped(self, reason: str):
+        self.dropped[reason] += 1
+
+    def record_checksum_failure(self, packet_type: int, priority: int,
+                                expected: Optional[int] = None, actual: Optional[int] = None):
+        key = packet_type << 8 | priority
+        self.checksum_failed[key] = self.checksum_failed.get(key, 0) + 1
+        self._failures += 1
+        if self._failures % self.log_every == 1 and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Checksum mismatch (type 0x%02x, priority %d): expected %s, got %s "
+                         "[%d failures, 1 in %d logged]", packet_type, priority, expected,
+                         actual, self._failures, self.log_every)
+
+    def observe(self, elapsed_ns: int):
+        """Add one timed decode; the caller resets ``countdown`` when it starts timing"""
+        self.decode_ns[bisect.bisect_left(DECODE_BUCKETS_NS, elapsed_ns)] += 1
+        self.decode_ns_sum += elapsed_ns
+
+    def snapshot(self) -> dict:
+        """Counters with type and priority names, plus totals"""
+        result = {'dropped': dict(self.dropped)}
+        for name, counts in (('decoded', self.decoded), ('checksum_failed', self.checksum_failed)):
+            by_type: Dict[str, int] = {}
+            by_priority: Dict[str, int] = {}
+            for key, count in counts.items():
+                type_name, priority_name = _label(key)
+                by_type[type_name] = by_type.get(type_name, 0) + count
+                by_priority[priority_name] = by_priority.get(priority_name, 0) + count
+            result[name] = {'total': sum(counts.values()), 'by_type': by_type,
+                            'by_priority': by_priority,
+                            'by_type_priority': {'/'.join(_label(key)): count
+                                                 for key, count in counts.items()}}
+        timed = sum(self.decode_ns)
+        result['decode_time'] = {
+            'sampled': timed,
+            'mean_ns': self.decode_ns_sum / timed if timed else None,
+            'buckets': dict(zip(_BUCKET_LABELS, self.decode_ns)),
+        }
+        return result
+
+    def prometheus(self) -> str:
+        """Counters and histogram in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+        for name, help_text in (('decoded', "Frames decoded"),
+                                ('checksum_failed', "Frames failing their checksum")):
+            metric = f"roamen_frames_{name}_total"
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            for key, count in snapshot[name]['by_type_priority'].items():
+                packet_type, priority = key.split('/')
+                lines.append(f'{metric}{{type="{packet_type}",priority="{priority}"}} {count}')
+        metric = "roamen_frames_dropped_total"
+        lines += [f"# HELP {metric} Frames dropped undecoded", f"# TYPE {metric} counter"]
+        lines += [f'{metric}{{reason="{reason}"}} {count}'
+                  for reason, count in self.dropped.items()]
+
+        metric = "roamen_decode_seconds"
+        lines += [f"# HELP {metric} Sampled frame decode time", f"# TYPE {metric} histogram"]
+        cumulative = 0
+        for bound, count in zip(DECODE_BUCKETS_NS, self.decode_ns):
+            cumulative += count
+            le = "+Inf" if bound == float('inf') else f"{bound / 1e9:g}"
+            lines.append(f'{metric}_bucket{{le="{le}"}} {cumulative}')
+        lines += [f"{metric}_sum {self.decode_ns_sum / 1e9:g}", f"{metric}_count {cumulative}"]
+        return '\n'.join(lines) + '\n'
+
+
+def _label(key: int) -> Tuple[str, str]:
+    """Type and priority names for a counter key; numbers if not valid"""
+    # Imported here: packet.py imports this module
+    from .packet import PacketType, Priority
+    packet_type, priority = key >> 8, key & 0xFF
+    try:
+        type_name = PacketType(packet_type).name
+    except ValueError:
+        type_name = f"0x{packet_type:02x}"
+    try:
+        priority_name = Priority(priority).name
+    except ValueError:
+        priority_name = str(priority)
+    return type_name, priority_name
+
+
+_BUCKET_LABELS = tuple(f"<={bound / 1000:g}us" for bound in DECODE_BUCKETS_NS[:-1]) + (
+    f">{DECODE_BUCKETS_NS[-2] / 1000:g}us",)
+
+METRICS = DecodeMetrics()
+
+
+def _gauges(prefix: str, values: Mapping) -> list:
+    """Prometheus lines for the numeric leaves of a stats dictionary"""
+    lines = []
+    for key, value in values.items():
+        name = re.sub(r'\W', '_', f"{prefix}_{key}")
+        if isinstance(value, Mapping):
+            lines += _gauges(name, value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            lines.append(f"{name} {value}")
+    return lines
+
+
+def metrics_app(metrics: Optional[DecodeMetrics] = None,
+                sources: Optional[Dict[str, Source]] = None) -> 'web.Application':
+    """aiohttp application serving ``/metrics`` and ``/metrics.json``
+
+    Args:
+        metrics: Decode metrics to expose (default: the shared ``METRICS``)
+        sources: Other stats to include, by name, e.g.
+            ``{'framing': lambda: sync.stats, 'delivery': manager.metrics}``
+    """
+    if web is None:
+        raise RuntimeError("The metrics endpoint needs aiohttp")
+    metrics = METRICS if metrics is None else metrics
+    sources = sources or {}
+
+    async def text(request):
+        body = metrics.prometheus()
+        for name, source in sources.items():
+            body += '\n'.join(_gauges(f"roamen_{name}", source())) + '\n'
+        return web.Response(text=body, content_type='text/plain', charset='utf-8')
+
+    async def as_json(request):
+        body = {'decode': metrics.snapshot()}
+        body.update((name, source()) for name, source in sources.items())
+        return web.Response(text=json.dumps(body, default=str),
+                            content_type='application/json')
+
+    app = web.Application()
+    app.router.add_get('/metrics', text)
+    app.router.add_get('/metrics.json', as_json)
+    return app
+
+
+async def serve_metrics(host: str = '127.0.0.1', port: int = 9464,
+                        metrics: Optional[DecodeMetrics] = None,
+                        sources: Optional[Dict[str, Source]] = None) -> 'web.AppRunner':
+    """Start the metrics endpoint; ``await runner.cleanup()`` stops it"""
+    runner = web.AppRunner(metrics_app(metrics, sources))
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
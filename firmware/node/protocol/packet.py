@@ -1,7 +1,35 @@
+import re
 import struct
 import time
 from enum import IntEnum
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Type
+
+from . import crc
+from .metrics import METRICS, DecodeMetrics
+from .payloads import (Ack, Aggregate, Alert, Beacon, EmergencyBroadcast, FileChunk, FileData,
+                       FileOffer, FileStatus, Payload, Text, VoiceData, VoiceEnd, VoiceStart)
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - batch APIs need numpy
+    np = None
+
+# Precompiled header layout (see PROTOCOL_SPEC §2.2)
+HEADER_STRUCT = struct.Struct('4s B B H H B B I H H B 11x')
+CHECKSUM_OFFSET = 18
+ATTEMPT_OFFSET = 20
+MAX_PAYLOAD_SIZE = 256  # Protocol payload limit (PROTOCOL_SPEC §7.2)
+_U16 = struct.Struct('H')
+_U32 = struct.Struct('I')
+_U16_PAIR = struct.Struct('H H')
+_BE16_PAIR = struct.Struct('!H H')
+_ZERO_CHECKSUM = b'\x00\x00'
+
+# Compact header (PROTOCOL_SPEC §2.5): sync, version, type|priority, source,
+# dest, TTL, 16-bit timestamp, payload length, checksum - 15 bytes, no padding
+COMPACT_HEADER_STRUCT = struct.Struct('!2s B B H H B H H H')
+COMPACT_CHECKSUM_OFFSET = 13
+COMPACT_LENGTH_OFFSET = 11
 
 class PacketType(IntEnum):
     """RoamEN packet types"""
@@ -12,6 +40,7 @@ class PacketType(IntEnum):
     VOICE_END = 0x05
     ALERT = 0x06
     ACK = 0x07
+    AGGREGATE = 0x08
     FILE_CHUNK = 0x10
     EMERGENCY_BROADCAST = 0xFF
 
@@ -23,12 +52,25 @@ class Priority(IntEnum):
     EMERGENCY = 9
 
 class RoamENPacket:
-    """RoamEN protocol packet with 32-byte header"""
+    """RoamEN protocol packet with 32-byte header (or 15-byte compact header)"""
     
     SYNC = b'ROAM'
     VERSION = 0x01
     HEADER_SIZE = 32
     
+    COMPACT_SYNC = b'RM'
+    COMPACT_VERSION = 0x02
+    COMPACT_HEADER_SIZE = COMPACT_HEADER_STRUCT.size
+    COMPACT_SIGNATURE = COMPACT_SYNC + bytes([COMPACT_VERSION])
+    
+    # Compact type codes that differ from the type value (low nibble of byte 3)
+    COMPACT_TYPE_CODES = {0x10: 0x0E, 0xFF: 0x0F}
+    COMPACT_TYPES = {code: packet_type for packet_type, code in COMPACT_TYPE_CODES.items()}
+    
+    # Decoded payload and the payload object it came from (see ``fields``)
+    _fields: Optional[Payload] = None
+    _fields_of = None
+    
     def __init__(self, packet_type: PacketType, source_id: int, dest_id: int,
                  priority: Priority = Priority.NORMAL, payload: bytes = b''):
         self.packet_type = packet_type
@@ -38,14 +80,24 @@ class RoamENPacket:
         self.ttl = 5
         self.timestamp = int(time.time())
         self.payload = payload
+        self.compact = False  # Header format pack() uses by default
+        self.attempt = 0  # Retransmission number, 0 for the first transmission
     
-    def pack(self) -> bytes:
-        """Pack packet into bytes for transmission"""
+    def pack(self, compact: Optional[bool] = None) -> bytes:
+        """Pack packet into bytes for transmission
+        
+        Args:
+            compact: Use the 15-byte compact header (§2.5); defaults to
+                ``self.compact``, which ``unpack`` sets from the received frame.
+                Retransmissions (``attempt`` > 0) default to the classic
+                header, the only one with an ATTEMPT field.
+        """
+        if compact or (compact is None and self.compact and not self.attempt):
+            return self._pack_compact()
         payload_len = len(self.payload)
         
         # Pack header (checksum field = 0 for now)
-        header = struct.pack(
-            '4s B B H H B B I H H 12x',
+        header = HEADER_STRUCT.pack(
             self.SYNC,           # 4 bytes: Sync word
             self.VERSION,        # 1 byte: Protocol version
             self.packet_type,    # 1 byte: Packet type
@@ -55,15 +107,15 @@ class RoamENPacket:
             self.ttl,            # 1 byte: Time to live (hops)
             self.timestamp,      # 4 bytes: Unix timestamp
             payload_len,         # 2 bytes: Payload length
-            0                    # 2 bytes: Checksum (calculated next)
+            0,                   # 2 bytes: Checksum (calculated next)
+            self.attempt         # 1 byte: Retransmission number
         )
         
-        # Calculate checksum over header + payload
-        checksum = self._crc16(header + self.payload)
+        # Calculate checksum over header + payload without concatenating them
+        checksum = crc.update(crc.update(crc.INITIAL, header), self.payload)
         
         # Rebuild header with correct checksum
-        header = struct.pack(
-            '4s B B H H B B I H H 12x',
+        header = HEADER_STRUCT.pack(
             self.SYNC,
             self.VERSION,
             self.packet_type,
@@ -73,22 +125,62 @@ class RoamENPacket:
             self.ttl,
             self.timestamp,
             payload_len,
-            checksum
+            checksum,
+            self.attempt
         )
         
         return header + self.payload
     
+    def _pack_compact(self) -> bytes:
+        packet_type = int(self.packet_type)
+        code = self.COMPACT_TYPE_CODES.get(packet_type, packet_type)
+        if code > 0x0F or self.priority > 0x0F or self.attempt:
+            raise ValueError(f"{self!r} cannot use the compact header")
+        fields = [self.COMPACT_SYNC, self.COMPACT_VERSION, int(self.priority) << 4 | code,
+                  self.source_id, self.dest_id, self.ttl, self.timestamp & 0xFFFF,
+                  len(self.payload), 0]
+        header = COMPACT_HEADER_STRUCT.pack(*fields)
+        fields[-1] = crc.update(crc.update(crc.INITIAL, header), self.payload)
+        return COMPACT_HEADER_STRUCT.pack(*fields) + self.payload
+    
+    @classmethod
+    def unpack(cls, data: bytes, now: Optional[float] = None) -> Optional['RoamENPacket']:
+        """Unpack received bytes into packet (classic or compact header)
+        
+        Args:
+            data: One frame
+            now: Receiver's Unix time, used to rebuild a compact frame's
+                16-bit timestamp (defaults to ``time.time()``)
+        
+        The outcome is counted in ``protocol.metrics.METRICS`` and one call
+        in ``METRICS.time_every`` is timed.
+        """
+        metrics = METRICS
+        metrics.countdown -= 1
+        if metrics.countdown > 0:
+            return cls._unpack(data, now, metrics)
+        metrics.countdown = metrics.time_every
+        start = metrics.clock()
+        try:
+            return cls._unpack(data, now, metrics)
+        finally:
+            metrics.observe(metrics.clock() - start)
+    
     @classmethod
-    def unpack(cls, data: bytes) -> Optional['RoamENPacket']:
-        """Unpack received bytes into packet"""
+    def _unpack(cls, data: bytes, now: Optional[float],
+                metrics: DecodeMetrics) -> Optional['RoamENPacket']:
+        if data[:3] == cls.COMPACT_SIGNATURE:
+            return cls._unpack_compact(data, now, metrics)
         if len(data) < cls.HEADER_SIZE:
+            metrics.record_dropped('short')
             return None
         
         # Unpack header
-        header = struct.unpack('4s B B H H B B I H H 12x', data[:cls.HEADER_SIZE])
+        header = HEADER_STRUCT.unpack_from(data)
         
         # Validate sync word
         if header[0] != cls.SYNC:
+            metrics.record_dropped('sync')
             return None
         
         # Extract fields
@@ -97,93 +189,739 @@ class RoamENPacket:
         
         # Validate packet length
         if len(data) < cls.HEADER_SIZE + payload_len:
+            metrics.record_dropped('truncated')
             return None
         
-        # Verify checksum (zero out checksum field first)
-        verify_data = data[:18] + b'\x00\x00' + data[20:]
-        actual_checksum = cls._crc16(verify_data)
+        # Verify checksum (checksum field counts as zero)
+        actual_checksum = frame_checksum(data, 0, cls.HEADER_SIZE + payload_len)
         
         if expected_checksum != actual_checksum:
-            print(f"⚠️  Checksum mismatch: expected {expected_checksum}, got {actual_checksum}")
+            metrics.record_checksum_failure(header[2], header[5], expected_checksum,
+                                            actual_checksum)
             return None
         
         # Create packet
-        packet = cls(
-            packet_type=PacketType(header[2]),
-            source_id=header[3],
-            dest_id=header[4],
-            priority=Priority(header[5]),
-            payload=data[cls.HEADER_SIZE:cls.HEADER_SIZE + payload_len]
-        )
+        try:
+            packet = cls(
+                packet_type=PacketType(header[2]),
+                source_id=header[3],
+                dest_id=header[4],
+                priority=Priority(header[5]),
+                payload=data[cls.HEADER_SIZE:cls.HEADER_SIZE + payload_len]
+            )
+        except ValueError:
+            metrics.record_dropped('unknown_type')
+            raise
         packet.ttl = header[6]
         packet.timestamp = header[7]
+        packet.attempt = header[10]
+        metrics.record_decoded(header[2], header[5])
+        
+        return packet
+    
+    @classmethod
+    def _unpack_compact(cls, data: bytes, now: Optional[float],
+                        metrics: DecodeMetrics) -> Optional['RoamENPacket']:
+        if len(data) < cls.COMPACT_HEADER_SIZE:
+            metrics.record_dropped('short')
+            return None
+        type_priority = data[3]
+        payload_len, expected_checksum = _BE16_PAIR.unpack_from(data, COMPACT_LENGTH_OFFSET)
+        end = cls.COMPACT_HEADER_SIZE + payload_len
+        code = type_priority & 0x0F
+        packet_type = cls.COMPACT_TYPES.get(code, code)
+        if len(data) < end:
+            metrics.record_dropped('truncated')
+            return None
+        
+        actual_checksum = frame_checksum(data, 0, end, COMPACT_CHECKSUM_OFFSET)
+        if expected_checksum != actual_checksum:
+            metrics.record_checksum_failure(packet_type, type_priority >> 4, expected_checksum,
+                                            actual_checksum)
+            return None
         
+        try:
+            packet = cls._from_compact(data, 0, now)
+        except ValueError:
+            metrics.record_dropped('unknown_type')
+            raise
+        metrics.record_decoded(packet_type, type_priority >> 4)
         return packet
     
+    @classmethod
+    def _from_compact(cls, buffer, offset: int, now: Optional[float]) -> 'RoamENPacket':
+        """Build a packet from a compact frame whose checksum was already checked
+        
+        Raises:
+            ValueError: Unknown packet type or priority
+        """
+        (_, _, type_priority, source_id, dest_id, ttl, timestamp, payload_len,
+         _) = COMPACT_HEADER_STRUCT.unpack_from(buffer, offset)
+        code = type_priority & 0x0F
+        start = offset + cls.COMPACT_HEADER_SIZE
+        packet = cls(
+            packet_type=PacketType(cls.COMPACT_TYPES.get(code, code)),
+            source_id=source_id,
+            dest_id=dest_id,
+            priority=Priority(type_priority >> 4),
+            payload=bytes(buffer[start:start + payload_len])
+        )
+        packet.ttl = ttl
+        packet.timestamp = widen_timestamp(timestamp, now)
+        packet.compact = True
+        return packet
+    
+    @classmethod
+    def unpack_view(cls, buffer, offset: int = 0) -> Optional['PacketView']:
+        """Validate a frame in place and return a zero-copy view of it.
+        
+        Args:
+            buffer: Receive buffer (memoryview, bytearray or bytes)
+            offset: Start of the frame within ``buffer``
+        
+        Returns:
+            PacketView over the frame, or None if it is short, unsynced or corrupt
+        """
+        if not isinstance(buffer, memoryview):
+            buffer = memoryview(buffer)
+        
+        if len(buffer) - offset < cls.HEADER_SIZE:
+            return None
+        if _U32.unpack_from(buffer, offset)[0] != _SYNC_WORD:
+            return None
+        
+        end = offset + cls.HEADER_SIZE + _U16.unpack_from(buffer, offset + 16)[0]
+        if len(buffer) < end:
+            return None
+        
+        expected_checksum = _U16.unpack_from(buffer, offset + CHECKSUM_OFFSET)[0]
+        if frame_checksum(buffer, offset, end) != expected_checksum:
+            return None
+        
+        return PacketView(buffer, offset)
+    
     @staticmethod
     def _crc16(data: bytes) -> int:
         """Calculate CRC16-CCITT checksum"""
-        crc = 0xFFFF
-        for byte in data:
-            crc ^= byte << 8
-            for _ in range(8):
-                if crc & 0x8000:
-                    crc = (crc << 1) ^ 0x1021
-                else:
-                    crc <<= 1
-                crc &= 0xFFFF
-        return crc
+        return crc.crc16(data)
     
     def is_for_me(self, my_id: int) -> bool:
         """Check if packet is addressed to this node"""
         return self.dest_id == my_id or self.dest_id == 0xFFFF
     
+    @property
+    def fields(self) -> Optional[Payload]:
+        """Typed payload (``protocol.payloads``), or None if malformed
+        
+        Decoded through ``PAYLOAD_CODECS`` on first access and kept until
+        ``payload`` is replaced, so packets nobody inspects are never decoded.
+        """
+        payload = self.payload
+        if self._fields_of is not payload:
+            self._fields = decode_payload(self.packet_type, payload)
+            self._fields_of = payload
+        return self._fields
+    
     def __repr__(self):
         return (f"RoamENPacket(type={self.packet_type.name}, "
                 f"src={self.source_id}, dst={self.dest_id}, "
                 f"pri={self.priority.name}, payload={len(self.payload)}B)")
 
+_SYNC_WORD = _U32.unpack(RoamENPacket.SYNC)[0]
+
+def widen_timestamp(timestamp: int, now: Optional[float] = None) -> int:
+    """Unix time nearest ``now`` whose low 16 bits are a compact frame's timestamp
+    
+    Node clocks agree to ±30 s (§6.3), well inside the ±9 h this resolves.
+    """
+    reference = int(time.time() if now is None else now)
+    return reference + ((timestamp - reference + 0x8000) & 0xFFFF) - 0x8000
+
+def frame_checksum(buffer, offset: int, end: int,
+                   checksum_offset: int = CHECKSUM_OFFSET) -> int:
+    """CRC16 of the frame at buffer[offset:end] with its checksum field zeroed"""
+    if not isinstance(buffer, memoryview):
+        buffer = memoryview(buffer)
+    checksum_at = offset + checksum_offset
+    value = crc.update(crc.INITIAL, buffer[offset:checksum_at])
+    value = crc.update(value, _ZERO_CHECKSUM)
+    return crc.update(value, buffer[checksum_at + 2:end])
+
+class PacketView:
+    """Zero-copy view of a validated frame inside a receive buffer
+    
+    Header fields are read from the buffer only when accessed and are
+    returned as plain ints (they compare equal to PacketType/Priority
+    members). The view is only valid until the buffer is reused; call
+    ``to_packet()`` to keep a frame.
+    """
+    
+    __slots__ = ('buffer', 'offset')
+    
+    def __init__(self, buffer: memoryview, offset: int = 0):
+        self.buffer = buffer
+        self.offset = offset
+    
+    @property
+    def version(self) -> int:
+        return self.buffer[self.offset + 4]
+    
+    @property
+    def packet_type(self) -> int:
+        return self.buffer[self.offset + 5]
+    
+    @property
+    def source_id(self) -> int:
+        return _U16.unpack_from(self.buffer, self.offset + 6)[0]
+    
+    @property
+    def dest_id(self) -> int:
+        return _U16.unpack_from(self.buffer, self.offset + 8)[0]
+    
+    @property
+    def priority(self) -> int:
+        return self.buffer[self.offset + 10]
+    
+    @property
+    def ttl(self) -> int:
+        return self.buffer[self.offset + 11]
+    
+    @property
+    def timestamp(self) -> int:
+        return _U32.unpack_from(self.buffer, self.offset + 12)[0]
+    
+    @property
+    def payload_len(self) -> int:
+        return _U16.unpack_from(self.buffer, self.offset + 16)[0]
+    
+    @property
+    def checksum(self) -> int:
+        return _U16.unpack_from(self.buffer, self.offset + CHECKSUM_OFFSET)[0]
+    
+    @property
+    def attempt(self) -> int:
+        return self.buffer[self.offset + ATTEMPT_OFFSET]
+    
+    @property
+    def size(self) -> int:
+        """Total frame length (header + payload)"""
+        return RoamENPacket.HEADER_SIZE + self.payload_len
+    
+    @property
+    def payload(self) -> memoryview:
+        start = self.offset + RoamENPacket.HEADER_SIZE
+        return self.buffer[start:start + self.payload_len]
+    
+    def is_for_me(self, my_id: int) -> bool:
+        """Check if packet is addressed to this node"""
+        dest_id = self.dest_id
+        return dest_id == my_id or dest_id == 0xFFFF
+    
+    def to_packet(self) -> RoamENPacket:
+        """Materialise a full RoamENPacket, copying the payload out"""
+        packet = RoamENPacket(
+            packet_type=PacketType(self.packet_type),
+            source_id=self.source_id,
+            dest_id=self.dest_id,
+            priority=Priority(self.priority),
+            payload=bytes(self.payload)
+        )
+        packet.ttl = self.ttl
+        packet.timestamp = self.timestamp
+        packet.attempt = self.attempt
+        return packet
+    
+    def __repr__(self):
+        return (f"PacketView(type={self.packet_type:#04x}, "
+                f"src={self.source_id}, dst={self.dest_id}, "
+                f"pri={self.priority}, payload={self.payload_len}B)")
+
+# Structured dtype with exactly the 32-byte header layout of HEADER_STRUCT
+HEADER_DTYPE = None if np is None else np.dtype([
+    ('sync', 'S4'),
+    ('version', 'u1'),
+    ('type', 'u1'),
+    ('source_id', 'u2'),
+    ('dest_id', 'u2'),
+    ('priority', 'u1'),
+    ('ttl', 'u1'),
+    ('timestamp', 'u4'),
+    ('payload_len', 'u2'),
+    ('checksum', 'u2'),
+    ('attempt', 'u1'),
+    ('reserved', 'V11'),
+])
+
+# Compact header (COMPACT_HEADER_STRUCT) as a 15-byte structured row
+_COMPACT_DTYPE = None if np is None else np.dtype([
+    ('sync', 'S2'),
+    ('version', 'u1'),
+    ('type_priority', 'u1'),
+    ('source_id', '>u2'),
+    ('dest_id', '>u2'),
+    ('ttl', 'u1'),
+    ('timestamp', '>u2'),
+    ('payload_len', '>u2'),
+    ('checksum', '>u2'),
+])
+
+# Compact type code -> packet type, for all 16 codes
+_COMPACT_TYPE_TABLE = None if np is None else np.array(
+    [RoamENPacket.COMPACT_TYPES.get(code, code) for code in range(16)], dtype=np.uint8)
+
+# Either sync word; re searches any buffer, so a memoryview is never copied
+_SIGNATURES = re.compile(re.escape(RoamENPacket.SYNC) + b'|'
+                         + re.escape(RoamENPacket.COMPACT_SIGNATURE))
+
+_BATCH_ROWS = 65536  # Bounds the temporary index arrays used for gathers
+
+def unpack_many(buffer, validate: bool = True,
+                now: Optional[float] = None) -> Tuple['np.ndarray', 'np.ndarray']:
+    """Decode a contiguous buffer of back-to-back frames into columns.
+    
+    Frame boundaries are found with one pass over the PAYLOAD_LEN fields;
+    bytes that do not start with a sync word are skipped up to the next one.
+    Header bytes are then gathered into a single structured array, so no
+    per-frame Python object is created. Compact frames (§2.5) get the same
+    row layout, as FrameSync would decode them: version 2, ATTEMPT 0, the
+    timestamp widened against ``now`` and their own (compact) checksum.
+    
+    Args:
+        buffer: bytes, bytearray, mmap or memoryview holding the frames
+        validate: Drop frames whose CRC does not match
+        now: Receiver's Unix time for compact timestamps (defaults to ``time.time()``)
+    
+    Returns:
+        Tuple of (headers, payload_offsets): a HEADER_DTYPE array and an
+        int64 array of payload start offsets into ``buffer``
+    """
+    if np is None:
+        raise RuntimeError("unpack_many requires numpy")
+    
+    view = memoryview(buffer)
+    search = _SIGNATURES.search
+    header_size = RoamENPacket.HEADER_SIZE
+    compact_size = RoamENPacket.COMPACT_HEADER_SIZE
+    compact_signature = RoamENPacket.COMPACT_SIGNATURE
+    size = len(view)
+    sync_word = _U32.unpack_from
+    length_and_checksum = _U16_PAIR.unpack_from
+    compact_length_and_checksum = _BE16_PAIR.unpack_from
+    update = crc.update
+    starts = []
+    compact_starts = []
+    pos = 0
+    
+    while size - pos >= compact_size:
+        if size - pos >= header_size and sync_word(view, pos)[0] == _SYNC_WORD:
+            payload_len, expected_checksum = length_and_checksum(view, pos + 16)
+            end = pos + header_size + payload_len
+            checksum_offset = CHECKSUM_OFFSET
+            found = starts
+        elif view[pos:pos + 3] == compact_signature:
+            payload_len, expected_checksum = compact_length_and_checksum(
+                view, pos + COMPACT_LENGTH_OFFSET)
+            end = pos + compact_size + payload_len
+            checksum_offset = COMPACT_CHECKSUM_OFFSET
+            found = compact_starts
+        else:
+            match = search(view, pos + 1)
+            if match is None:
+                break
+            pos = match.start()
+            continue
+        
+        if end > size:
+            break
+        if validate:
+            actual_checksum = update(crc.INITIAL, view[pos:pos + checksum_offset])
+            actual_checksum = update(actual_checksum, _ZERO_CHECKSUM)
+            if update(actual_checksum, view[pos + checksum_offset + 2:end]) != expected_checksum:
+                pos += 1
+                continue
+        
+        found.append(pos)
+        pos = end
+    
+    data = np.frombuffer(view, dtype=np.uint8)
+    classic = np.array(starts, dtype=np.int64)
+    compact = np.array(compact_starts, dtype=np.int64)
+    order = np.argsort(np.concatenate([classic, compact]), kind='stable')
+    headers = np.empty(len(order), dtype=HEADER_DTYPE)
+    offsets = np.empty(len(order), dtype=np.int64)
+    classic_rows = order < len(classic)
+    
+    rows = np.empty(len(classic), dtype=HEADER_DTYPE)
+    _gather(data, classic, rows.view(np.uint8).reshape(-1, header_size))
+    headers[classic_rows] = rows
+    offsets[classic_rows] = classic + header_size
+    
+    if len(compact):
+        small = np.empty(len(compact), dtype=_COMPACT_DTYPE)
+        _gather(data, compact, small.view(np.uint8).reshape(-1, compact_size))
+        rows = np.zeros(len(compact), dtype=HEADER_DTYPE)
+        rows['sync'] = compact_signature
+        rows['version'] = small['version']
+        rows['type'] = _COMPACT_TYPE_TABLE[small['type_priority'] & 0x0F]
+        rows['priority'] = small['type_priority'] >> 4
+        for name in ('source_id', 'dest_id', 'ttl', 'payload_len', 'checksum'):
+            rows[name] = small[name]
+        # As RoamENPacket.unpack: the time nearest ``now`` with these low 16 bits
+        reference = int(time.time() if now is None else now)
+        low = small['timestamp'].astype(np.int64)
+        rows['timestamp'] = reference + ((low - reference + 0x8000) & 0xFFFF) - 0x8000
+        headers[~classic_rows] = rows
+        offsets[~classic_rows] = compact + compact_size
+    
+    return headers, offsets
+
+def _gather(data: 'np.ndarray', starts: 'np.ndarray', rows: 'np.ndarray'):
+    """Copy ``rows.shape[1]`` bytes from each of ``starts`` into ``rows``"""
+    columns = np.arange(rows.shape[1])
+    for first in range(0, len(starts), _BATCH_ROWS):
+        block = starts[first:first + _BATCH_ROWS]
+        rows[first:first + len(block)] = data[block[:, None] + columns]
+
+def pack_many(headers: 'np.ndarray', payloads: Sequence[bytes]) -> bytes:
+    """Encode many frames from a structured header array in one call.
+    
+    Only the type, source_id, dest_id, priority, ttl and timestamp columns
+    are read from ``headers``; sync, version, payload_len and checksum are
+    filled in here.
+    
+    Args:
+        headers: HEADER_DTYPE array, one row per frame
+        payloads: Payload bytes for each row
+    
+    Returns:
+        The frames concatenated back to back
+    """
+    if np is None:
+        raise RuntimeError("pack_many requires numpy")
+    if len(headers) != len(payloads):
+        raise ValueError("headers and payloads must have the same length")
+    
+    count = len(payloads)
+    out = np.zeros(count, dtype=HEADER_DTYPE)
+    for name in ('type', 'source_id', 'dest_id', 'priority', 'ttl', 'timestamp'):
+        out[name] = headers[name]
+    out['sync'] = RoamENPacket.SYNC
+    out['version'] = RoamENPacket.VERSION
+    out['payload_len'] = np.fromiter(map(len, payloads), dtype=np.uint16, count=count)
+    
+    header_size = RoamENPacket.HEADER_SIZE
+    raw = memoryview(out.view(np.uint8))
+    update = crc.update
+    out['checksum'] = [
+        update(update(crc.INITIAL, raw[i * header_size:(i + 1) * header_size]), payload)
+        for i, payload in enumerate(payloads)
+    ]
+    
+    parts = []
+    for i, payload in enumerate(payloads):
+        parts.append(raw[i * header_size:(i + 1) * header_size])
+        parts.append(payload)
+    return b''.join(parts)
+
 class AlertPacket:
-    """Helper for creating and parsing alert packets"""
+    """Helper for creating and parsing alert packets (layout in ``payloads.Alert``)"""
+    
+    # Flag bits in the alert type byte (§3.7); alert types themselves are 0-9
+    VARIABLE = Alert.VARIABLE
+    COMPRESSED = Alert.COMPRESSED
+    TYPE_MASK = Alert.TYPE_MASK
+    
+    FIXED = Alert.FIXED
+    VARIABLE_HEADER = Alert.VARIABLE_HEADER
     
     @staticmethod
     def create(source_id: int, dest_id: int, alert_type: int, 
-               message: str) -> RoamENPacket:
-        """Create an alert packet with tone and message"""
-        msg_bytes = message.encode('utf-8')[:256]
-        
-        # Payload: alert_type (1B) + tone_id (1B) + message (256B)
-        payload = struct.pack('B B 256s', alert_type, 1, msg_bytes)
+               message: str, tone_id: Optional[int] = None,
+               compact: bool = False, compress: bool = True) -> RoamENPacket:
+        """Create an alert packet with tone and message
         
-        # Set priority based on alert type
+        Args:
+            source_id: Sending node
+            dest_id: Recipient or 0xFFFF for broadcast
+            alert_type: 0-9 (9 = emergency, 2 = urgent)
+            message: Alert text (up to 256 bytes of UTF-8)
+            tone_id: Tone to play (defaults to the one for ``alert_type``)
+            compact: Send the variable-length form. v0.1 nodes only decode
+                the fixed 258-byte default, so set this only for recipients
+                whose beacon advertises ``BeaconPacket.VARIABLE_ALERTS``
+            compress: In the variable form, deflate the message against
+                ALERT_DICTIONARY when that makes it smaller
+        """
+        # Set priority and default tone (§3.7) based on alert type
         if alert_type == 9:
             priority = Priority.EMERGENCY
+            default_tone = 3
         elif alert_type == 2:
             priority = Priority.URGENT
+            default_tone = 2
         else:
             priority = Priority.NORMAL
+            default_tone = 1
+        if tone_id is None:
+            tone_id = default_tone
         
         return RoamENPacket(
             packet_type=PacketType.ALERT,
             source_id=source_id,
             dest_id=dest_id,
             priority=priority,
-            payload=payload
+            payload=Alert(alert_type, tone_id, message).encode(compact, compress)
         )
     
     @staticmethod
-    def parse(packet: RoamENPacket) -> Optional[dict]:
-        """Parse alert packet payload"""
+    def parse(packet) -> Optional[dict]:
+        """Parse alert packet payload (fixed or variable-length form)"""
         if packet.packet_type != PacketType.ALERT:
             return None
-        
-        alert_type, tone_id, msg_bytes = struct.unpack('B B 256s', packet.payload)
-        message = msg_bytes.decode('utf-8').rstrip('\x00')
-        
+        alert = Alert.decode(packet.payload)
+        if alert is None:
+            return None
         return {
-            'alert_type': alert_type,
-            'tone_id': tone_id,
-            'message': message,
+            'alert_type': alert.alert_type,
+            'tone_id': alert.tone_id,
+            'message': alert.message,
             'source': packet.source_id,
             'priority': packet.priority
         }
+
+class BeaconPacket:
+    """Helper for creating and parsing beacon packets (PROTOCOL_SPEC §3.2)"""
+    
+    PAYLOAD = Beacon.STRUCT
+    ROUTE = Beacon.ROUTE
+    MAX_ROUTES = Beacon.MAX_ROUTES
+    
+    # Capability bits (§3.2)
+    VARIABLE_ALERTS = Beacon.VARIABLE_ALERTS
+    
+    @staticmethod
+    def create(source_id: int, callsign: str, capabilities: int = 0,
+               routes: Optional[dict] = None) -> RoamENPacket:
+        """Create a broadcast beacon announcing this node and, optionally, its routes"""
+        return RoamENPacket(
+            packet_type=PacketType.BEACON,
+            source_id=source_id,
+            dest_id=0xFFFF,
+            priority=Priority.INFO,
+            payload=Beacon(callsign, capabilities, routes).encode()
+        )
+    
+    @staticmethod
+    def parse(packet) -> Optional[dict]:
+        """Parse beacon payload (short, callsign-only payloads are accepted)"""
+        if packet.packet_type != PacketType.BEACON:
+            return None
+        beacon = Beacon.decode(packet.payload)
+        return {
+            'callsign': beacon.callsign,
+            'capabilities': beacon.capabilities,
+            'source': packet.source_id,
+            'routes': beacon.routes
+        }
+
+class VoicePacket:
+    """Helper for creating and parsing voice packets (PROTOCOL_SPEC §3.4-3.6)"""
+    
+    CODEC2 = VoiceStart.CODEC2
+    
+    START = VoiceStart.STRUCT
+    DATA = VoiceData.STRUCT
+    END = VoiceEnd.STRUCT
+    
+    @staticmethod
+    def start(source_id: int, dest_id: int, session_id: int, codec: int = CODEC2,
+              priority: Priority = Priority.NORMAL) -> RoamENPacket:
+        """Create a VOICE_START announcing a new session"""
+        return RoamENPacket(PacketType.VOICE_START, source_id, dest_id, priority,
+                            VoiceStart(session_id, codec).encode())
+    
+    @staticmethod
+    def data(source_id: int, dest_id: int, session_id: int, sequence: int,
+             frame: bytes, priority: Priority = Priority.NORMAL) -> RoamENPacket:
+        """Create a VOICE_DATA carrying one encoded frame"""
+        return RoamENPacket(PacketType.VOICE_DATA, source_id, dest_id, priority,
+                            VoiceData(session_id, sequence, frame).encode())
+    
+    @staticmethod
+    def end(source_id: int, dest_id: int, session_id: int, final_sequence: int,
+            priority: Priority = Priority.NORMAL) -> RoamENPacket:
+        """Create a VOICE_END closing a session"""
+        return RoamENPacket(PacketType.VOICE_END, source_id, dest_id, priority,
+                            VoiceEnd(session_id, final_sequence).encode())
+    
+    @staticmethod
+    def parse(packet) -> Optional[dict]:
+        """Parse any of the three voice payloads"""
+        codec = _VOICE_CODECS.get(packet.packet_type)
+        voice = None if codec is None else codec.decode(packet.payload)
+        if voice is None:
+            return None
+        info = voice.as_dict()
+        info['source'] = packet.source_id
+        return info
+
+class FilePacket:
+    """Helper for creating and parsing FILE_CHUNK packets (PROTOCOL_SPEC §3.10)"""
+    
+    KIND_OFFER = FileChunk.KIND_OFFER
+    KIND_DATA = FileChunk.KIND_DATA
+    KIND_STATUS = FileChunk.KIND_STATUS
+    
+    POLL = 0x01        # Receiver should answer with a STATUS
+    COMPLETE = 0x02    # STATUS: every chunk has been received
+    ATTEMPT_SHIFT = 4  # High nibble of flags: send attempt, so resends are not deduplicated
+    
+    HEADER = FileChunk.HEADER
+    OFFER = FileOffer.STRUCT
+    DATA = FileData.STRUCT
+    STATUS = FileStatus.STRUCT
+    STATUS_BITS = 256
+    MAX_CHUNKS = 0xFFFF
+    
+    @staticmethod
+    def offer(source_id: int, dest_id: int, transfer_id: int, size: int, chunk_size: int,
+              name: str, flags: int = 0, priority: Priority = Priority.NORMAL) -> RoamENPacket:
+        """Announce a transfer so the receiver can allocate the file"""
+        payload = FileOffer(transfer_id, size, chunk_size, name, flags).encode()
+        return RoamENPacket(PacketType.FILE_CHUNK, source_id, dest_id, priority, payload)
+    
+    @staticmethod
+    def data(source_id: int, dest_id: int, transfer_id: int, index: int, chunk: bytes,
+             flags: int = 0, priority: Priority = Priority.NORMAL) -> RoamENPacket:
+        """Carry chunk ``index`` of a transfer"""
+        payload = FileData(transfer_id, index, chunk, flags).encode()
+        return RoamENPacket(PacketType.FILE_CHUNK, source_id, dest_id, priority, payload)
+    
+    @staticmethod
+    def status(source_id: int, dest_id: int, transfer_id: int, base: int, bitmap: bytes,
+               flags: int = 0, priority: Priority = Priority.NORMAL) -> RoamENPacket:
+        """Selective-repeat report: all chunks below ``base`` plus bit i = chunk base+1+i"""
+        payload = FileStatus(transfer_id, base, bitmap, flags).encode()
+        return RoamENPacket(PacketType.FILE_CHUNK, source_id, dest_id, priority, payload)
+    
+    @staticmethod
+    def parse(packet) -> Optional[dict]:
+        """Parse any FILE_CHUNK payload"""
+        if packet.packet_type != PacketType.FILE_CHUNK:
+            return None
+        chunk = FileChunk.decode(packet.payload)
+        if chunk is None:
+            return None
+        info = chunk.as_dict()
+        info['kind'] = chunk.KIND
+        info['source'] = packet.source_id
+        return info
+
+class AckPacket:
+    """Helper for creating and parsing ACK packets (PROTOCOL_SPEC §3.8)"""
+    
+    SINGLE = Ack.SINGLE
+    COUNT = Ack.COUNT
+    BLOCK = Ack.BLOCK
+    MAX_SPAN = Ack.MAX_SPAN
+    
+    @staticmethod
+    def create(source_id: int, dest_id: int, acked_source: int, acked_timestamp: int,
+               status: int = 0, priority: Priority = Priority.INFO) -> RoamENPacket:
+        """Acknowledge one packet, identified by its (source, timestamp)"""
+        payload = Ack([(acked_source, acked_timestamp)], status).encode()
+        return RoamENPacket(PacketType.ACK, source_id, dest_id, priority, payload)
+    
+    @staticmethod
+    def block(source_id: int, dest_id: int, acked: Iterable[Tuple[int, int]],
+              priority: Priority = Priority.INFO) -> RoamENPacket:
+        """Acknowledge many packets at once, in the block form (see ``Ack.encode``)
+        
+        Args:
+            source_id: This node
+            dest_id: Node the acknowledgements go to
+            acked: (source, timestamp) pairs of the packets received
+            priority: Priority to send with
+        """
+        payload = Ack(acked).encode(block=True)
+        return RoamENPacket(PacketType.ACK, source_id, dest_id, priority, payload)
+    
+    @staticmethod
+    def parse(packet) -> Optional[dict]:
+        """Parse either ACK form; an 8-byte payload is the single form"""
+        if packet.packet_type != PacketType.ACK:
+            return None
+        ack = Ack.decode(packet.payload)
+        if ack is None:
+            return None
+        return {'acked': ack.acked, 'status': ack.status, 'source': packet.source_id}
+
+
+class AggregatePacket:
+    """Several small packets for one next hop under a single header (PROTOCOL_SPEC §3.11)
+    
+    Each member keeps its own type, priority, addressing, TTL and timestamp
+    in a 13-byte record header, so the receiver recovers the original
+    packets exactly. The outer packet is sent with TTL 0: it is never
+    relayed, only its members are.
+    """
+    
+    RECORD = Aggregate.RECORD
+    
+    @staticmethod
+    def create(source_id: int, dest_id: int, packets: Sequence[RoamENPacket],
+               priority: Optional[Priority] = None) -> RoamENPacket:
+        """Pack ``packets`` into one AGGREGATE (priority defaults to the highest member's)"""
+        payload = Aggregate([(packet.packet_type, packet.priority, packet.source_id,
+                              packet.dest_id, packet.ttl, packet.timestamp, packet.payload)
+                             for packet in packets]).encode()
+        if priority is None:
+            priority = max(packet.priority for packet in packets)
+        aggregate = RoamENPacket(PacketType.AGGREGATE, source_id, dest_id, priority, payload)
+        aggregate.ttl = 0
+        return aggregate
+    
+    @staticmethod
+    def parse(packet) -> Optional[List[RoamENPacket]]:
+        """Member packets, or None if the payload is malformed or has unknown types"""
+        if packet.packet_type != PacketType.AGGREGATE:
+            return None
+        aggregate = Aggregate.decode(packet.payload)
+        if aggregate is None:
+            return None
+        members = []
+        try:
+            for packet_type, priority, source_id, dest_id, ttl, timestamp, payload in (
+                    aggregate.members):
+                member = RoamENPacket(PacketType(packet_type), source_id, dest_id,
+                                      Priority(priority), payload)
+                member.ttl = ttl
+                member.timestamp = timestamp
+                members.append(member)
+        except ValueError:
+            return None
+        return members
+
+
+# Payload class for every packet type; RoamENPacket.fields dispatches through this table
+PAYLOAD_CODECS: Dict[PacketType, Type[Payload]] = {
+    PacketType.BEACON: Beacon,
+    PacketType.TEXT_MESSAGE: Text,
+    PacketType.VOICE_START: VoiceStart,
+    PacketType.VOICE_DATA: VoiceData,
+    PacketType.VOICE_END: VoiceEnd,
+    PacketType.ALERT: Alert,
+    PacketType.ACK: Ack,
+    PacketType.AGGREGATE: Aggregate,
+    PacketType.FILE_CHUNK: FileChunk,
+    PacketType.EMERGENCY_BROADCAST: EmergencyBroadcast,
+}
+
+_VOICE_CODECS = {packet_type: PAYLOAD_CODECS[packet_type] for packet_type in
+                 (PacketType.VOICE_START, PacketType.VOICE_DATA, PacketType.VOICE_END)}
+
+
+def decode_payload(packet_type: int, data) -> Optional[Payload]:
+    """Typed payload of a ``packet_type`` packet, or None if malformed or of unknown type"""
+    codec = PAYLOAD_CODECS.get(packet_type)
+    return None if codec is None else codec.decode(data)
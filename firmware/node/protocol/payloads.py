@@ -0,0 +1,516 @@
+"""Typed payload codecs for every packet type (PROTOCOL_SPEC §3)
+
+Each payload layout is a small class with ``__slots__`` and precompiled
+``struct.Struct`` layouts. ``decode(data)`` returns an instance, or None if
+the payload is malformed, and never raises on bad input; ``encode()``
+returns the payload bytes. ``protocol.packet.PAYLOAD_CODECS`` maps every
+PacketType to its class, and ``RoamENPacket.fields`` decodes through that
+table the first time it is read, so packets that are only relayed or
+counted are never decoded.
+
+This module only deals in payload bytes and plain values; the packet
+helpers (``AlertPacket``, ``AckPacket`` ...) build on it.
+"""
+
+import struct
+import zlib
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .alert_dictionary import ALERT_DICTIONARY
+
+
+def _utf8(text: str, limit: int) -> bytes:
+    """UTF-8 of ``text``, cut to at most ``limit`` bytes without splitting a character"""
+    data = text.encode('utf-8')
+    if len(data) > limit:
+        data = data[:limit].decode('utf-8', 'ignore').encode('utf-8')
+    return data
+
+
+class Payload(ABC):
+    """Base of the payload classes: field-wise equality, repr and a dict view
+
+    ``FIELDS`` lists the slots of a class and its bases, in order. Concrete
+    classes implement ``decode`` and ``encode``.
+    """
+
+    __slots__ = ()
+    FIELDS: Tuple[str, ...] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.FIELDS = tuple(name for klass in reversed(cls.__mro__)
+                           for name in klass.__dict__.get('__slots__', ()))
+
+    @classmethod
+    @abstractmethod
+    def decode(cls, data) -> Optional['Payload']:
+        """Instance for ``data``, or None if it is malformed"""
+
+    @abstractmethod
+    def encode(self) -> bytes:
+        """Payload bytes"""
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.FIELDS)
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.FIELDS)
+        return f"{type(self).__name__}({fields})"
+
+
+class Beacon(Payload):
+    """BEACON (§3.2): callsign, capabilities and optional route advertisements"""
+
+    __slots__ = ('callsign', 'capabilities', 'routes')
+
+    # callsign (16B) + capabilities (1B) + reserved (3B)
+    STRUCT = struct.Struct('16s B 3x')
+    # Optional trailing route advertisements: destination (2B) + hops (1B)
+    ROUTE = struct.Struct('!H B')
+    MAX_ROUTES = (256 - 20) // 3
+    # Capability bits: the node decodes variable-length alerts (§3.7)
+    VARIABLE_ALERTS = 0x01
+
+    def __init__(self, callsign: str = '', capabilities: int = 0,
+                 routes: Optional[Dict[int, int]] = None):
+        self.callsign = callsign
+        self.capabilities = capabilities
+        self.routes = {} if routes is None else routes  # destination -> hops
+
+    @classmethod
+    def decode(cls, data) -> 'Beacon':
+        """Short, callsign-only payloads are accepted"""
+        data = bytes(data)
+        routes = {}
+        for offset in range(cls.STRUCT.size, len(data) - 2, cls.ROUTE.size):
+            dest, hops = cls.ROUTE.unpack_from(data, offset)
+            routes[dest] = hops
+        return cls(data[:16].rstrip(b'\x00').decode('utf-8', 'replace'),
+                   data[16] if len(data) > 16 else 0, routes)
+
+    def encode(self) -> bytes:
+        """Routes beyond ``MAX_ROUTES`` are dropped, farthest first"""
+        payload = self.STRUCT.pack(_utf8(self.callsign, 16), self.capabilities)
+        if self.routes:
+            entries = sorted(self.routes.items(), key=lambda item: item[1])[:self.MAX_ROUTES]
+            payload += b''.join(self.ROUTE.pack(dest, hops) for dest, hops in entries)
+        return payload
+
+
+class Text(Payload):
+    """TEXT_MESSAGE (§3.3): UTF-8 text"""
+
+    __slots__ = ('text',)
+
+    def __init__(self, text: str = ''):
+        self.text = text
+
+    @classmethod
+    def decode(cls, data) -> 'Text':
+        return cls(bytes(data).decode('utf-8', 'replace'))
+
+    def encode(self) -> bytes:
+        return self.text.encode('utf-8')
+
+
+class EmergencyBroadcast(Text):
+    """EMERGENCY_BROADCAST (§3.9): UTF-8 text of at most 256 bytes"""
+
+    __slots__ = ()
+
+    MAX_SIZE = 256
+
+    def encode(self) -> bytes:
+        return _utf8(self.text, self.MAX_SIZE)
+
+
+class VoiceStart(Payload):
+    """VOICE_START (§3.4): opens a voice session"""
+
+    __slots__ = ('session_id', 'codec', 'flags')
+
+    CODEC2 = 0x01
+
+    # codec (1B) + flags (1B) + session ID (2B)
+    STRUCT = struct.Struct('!B B H')
+
+    def __init__(self, session_id: int, codec: int = CODEC2, flags: int = 0):
+        self.session_id = session_id
+        self.codec = codec
+        self.flags = flags
+
+    @classmethod
+    def decode(cls, data) -> Optional['VoiceStart']:
+        if len(data) < cls.STRUCT.size:
+            return None
+        codec, flags, session_id = cls.STRUCT.unpack_from(data)
+        return cls(session_id, codec, flags)
+
+    def encode(self) -> bytes:
+        return self.STRUCT.pack(self.codec, self.flags, self.session_id)
+
+
+class VoiceData(Payload):
+    """VOICE_DATA (§3.5): one encoded voice frame of a session"""
+
+    __slots__ = ('session_id', 'sequence', 'frame')
+
+    # session ID (2B) + sequence (2B), followed by the voice frame
+    STRUCT = struct.Struct('!H H')
+
+    def __init__(self, session_id: int, sequence: int, frame: bytes = b''):
+        self.session_id = session_id
+        self.sequence = sequence
+        self.frame = frame
+
+    @classmethod
+    def decode(cls, data) -> Optional['VoiceData']:
+        if len(data) < cls.STRUCT.size:
+            return None
+        session_id, sequence = cls.STRUCT.unpack_from(data)
+        return cls(session_id, sequence, bytes(data[cls.STRUCT.size:]))
+
+    def encode(self) -> bytes:
+        return self.STRUCT.pack(self.session_id, self.sequence & 0xFFFF) + self.frame
+
+
+class VoiceEnd(Payload):
+    """VOICE_END (§3.6): closes a voice session"""
+
+    __slots__ = ('session_id', 'final_sequence')
+
+    # session ID (2B) + final sequence (2B)
+    STRUCT = struct.Struct('!H H')
+
+    def __init__(self, session_id: int, final_sequence: int):
+        self.session_id = session_id
+        self.final_sequence = final_sequence
+
+    @classmethod
+    def decode(cls, data) -> Optional['VoiceEnd']:
+        if len(data) < cls.STRUCT.size:
+            return None
+        return cls(*cls.STRUCT.unpack_from(data))
+
+    def encode(self) -> bytes:
+        return self.STRUCT.pack(self.session_id, self.final_sequence & 0xFFFF)
+
+
+class Alert(Payload):
+    """ALERT (§3.7) in the fixed 258-byte form or the variable, optionally deflated, form"""
+
+    __slots__ = ('alert_type', 'tone_id', 'message')
+
+    # Flag bits in the alert type byte; alert types themselves are 0-9
+    VARIABLE = 0x80    # Message is length-prefixed instead of padded to 256 bytes
+    COMPRESSED = 0x40  # Message is raw deflate against ALERT_DICTIONARY
+    TYPE_MASK = 0x0F
+    MAX_MESSAGE = 256
+
+    # Fixed form: alert_type (1B) + tone_id (1B) + message (256B)
+    FIXED = struct.Struct('B B 256s')
+    # Variable form: alert_type|flags (1B) + tone_id (1B) + length (1B), then the message
+    VARIABLE_HEADER = struct.Struct('B B B')
+
+    # Raw deflate with a 2 KB window: the dictionary plus the longest message.
+    # Small windows and hash tables keep copying the primed state cheap.
+    _compressor = zlib.compressobj(9, zlib.DEFLATED, -11, 4, zlib.Z_DEFAULT_STRATEGY,
+                                   ALERT_DICTIONARY)
+    _decompressor = zlib.decompressobj(-11, ALERT_DICTIONARY)
+
+    def __init__(self, alert_type: int, tone_id: int, message: str):
+        self.alert_type = alert_type
+        self.tone_id = tone_id
+        self.message = message
+
+    @classmethod
+    def decode(cls, data) -> Optional['Alert']:
+        if len(data) < cls.VARIABLE_HEADER.size:
+            return None
+        alert_type, tone_id, length = cls.VARIABLE_HEADER.unpack_from(data)
+        if alert_type & cls.VARIABLE:
+            size = cls.VARIABLE_HEADER.size
+            message = bytes(data[size:size + length])
+            if len(message) != length:
+                return None
+            if alert_type & cls.COMPRESSED:
+                try:
+                    message = cls._decompressor.copy().decompress(message, cls.MAX_MESSAGE)
+                except zlib.error:
+                    return None
+        elif len(data) == cls.FIXED.size:
+            message = cls.FIXED.unpack_from(data)[2].rstrip(b'\x00')
+        else:
+            return None
+        return cls(alert_type & cls.TYPE_MASK, tone_id, message.decode('utf-8', 'replace'))
+
+    def encode(self, compact: bool = True, compress: bool = True) -> bytes:
+        """Payload bytes; messages are cut to 256 bytes of UTF-8
+
+        Args:
+            compact: Use the variable-length form; False (or a 256-byte
+                message) gives the fixed 258-byte form for v0.1 nodes
+            compress: In the variable form, deflate the message against
+                ALERT_DICTIONARY when that makes it smaller
+        """
+        message = _utf8(self.message, self.MAX_MESSAGE)
+        if not compact or len(message) > 0xFF:
+            return self.FIXED.pack(self.alert_type, self.tone_id, message)
+        flags = self.VARIABLE
+        if compress:
+            compressor = self._compressor.copy()
+            packed = compressor.compress(message) + compressor.flush()
+            if len(packed) < len(message):
+                flags |= self.COMPRESSED
+                message = packed
+        return self.VARIABLE_HEADER.pack(self.alert_type | flags, self.tone_id,
+                                         len(message)) + message
+
+
+class Ack(Payload):
+    """ACK (§3.8): the (source, timestamp) pairs acknowledged, in single or block form"""
+
+    __slots__ = ('acked', 'status')
+
+    # Single form: ACK'd timestamp (4B) + ACK'd source (2B) + status (2B)
+    SINGLE = struct.Struct('!I H H')
+    # Block form: block count (1B), then per block: ACK'd source (2B) +
+    # base timestamp (4B) + bitmap length (1B), followed by the bitmap
+    COUNT = struct.Struct('!B')
+    BLOCK = struct.Struct('!H I B')
+    MAX_SPAN = 64  # Seconds one block's bitmap covers
+
+    def __init__(self, acked: Sequence[Tuple[int, int]] = (), status: int = 0):
+        self.acked: List[Tuple[int, int]] = list(acked)
+        self.status = status
+
+    @classmethod
+    def decode(cls, data) -> Optional['Ack']:
+        """An 8-byte payload is the single form, anything else the block form"""
+        if len(data) == cls.SINGLE.size:
+            timestamp, acked_source, status = cls.SINGLE.unpack_from(data)
+            return cls([(acked_source, timestamp)], status)
+
+        if not data:
+            return None
+        acked = []
+        offset = cls.COUNT.size
+        for _ in range(data[0]):
+            if offset + cls.BLOCK.size > len(data):
+                return None
+            acked_source, base, length = cls.BLOCK.unpack_from(data, offset)
+            offset += cls.BLOCK.size
+            if offset + length > len(data):
+                return None
+            for index in range(length):
+                bits = data[offset + index]
+                while bits:
+                    low = bits & -bits
+                    timestamp = base + index * 8 + low.bit_length() - 1
+                    acked.append((acked_source, timestamp & 0xFFFFFFFF))
+                    bits ^= low
+            offset += length
+        return cls(acked)
+
+    def encode(self, block: bool = False) -> bytes:
+        """Single form for exactly one acknowledgement (unless ``block``), else block form
+
+        Packets from one source are identified by their timestamps, so each
+        block carries a base timestamp and a bitmap whose bit i (LSB first)
+        acknowledges base + i.
+        """
+        if len(self.acked) == 1 and not block:
+            acked_source, timestamp = self.acked[0]
+            return self.SINGLE.pack(timestamp, acked_source, self.status)
+        if self.status:
+            raise ValueError("block-form ACKs always carry status 0")
+
+        by_source: Dict[int, List[int]] = {}
+        for acked_source, timestamp in self.acked:
+            by_source.setdefault(acked_source, []).append(timestamp)
+        blocks = []
+        for acked_source, timestamps in by_source.items():
+            timestamps.sort()
+            base = None
+            bitmap = bytearray()
+            for timestamp in timestamps:
+                if base is not None and timestamp - base >= self.MAX_SPAN:
+                    blocks.append(self.BLOCK.pack(acked_source, base, len(bitmap)) + bitmap)
+                    base = None
+                if base is None:
+                    base = timestamp
+                    bitmap = bytearray()
+                offset = timestamp - base
+                bitmap.extend(bytes(offset // 8 + 1 - len(bitmap)))
+                bitmap[offset // 8] |= 1 << (offset % 8)
+            blocks.append(self.BLOCK.pack(acked_source, base, len(bitmap)) + bitmap)
+        if len(blocks) > 0xFF:
+            raise ValueError("too many ACK blocks for one packet")
+        return self.COUNT.pack(len(blocks)) + b''.join(blocks)
+
+
+# One aggregated packet: (type, priority, source, dest, TTL, timestamp, payload)
+AggregateMember = Tuple[int, int, int, int, int, int, bytes]
+
+
+class Aggregate(Payload):
+    """AGGREGATE (§3.11): several packets' headers and payloads, back to back"""
+
+    __slots__ = ('members',)
+
+    # type (1B) + priority (1B) + source (2B) + dest (2B) + TTL (1B) +
+    # timestamp (4B) + payload length (2B), followed by the payload
+    RECORD = struct.Struct('!B B H H B I H')
+
+    def __init__(self, members: Sequence[AggregateMember] = ()):
+        self.members: List[AggregateMember] = list(members)
+
+    @classmethod
+    def decode(cls, data) -> Optional['Aggregate']:
+        """Member types and priorities are not checked against the enums here"""
+        data = bytes(data)
+        record = cls.RECORD
+        members = []
+        offset = 0
+        while offset < len(data):
+            if offset + record.size > len(data):
+                return None
+            *fields, length = record.unpack_from(data, offset)
+            offset += record.size
+            if offset + length > len(data):
+                return None
+            members.append((*fields, data[offset:offset + length]))
+            offset += length
+        return cls(members)
+
+    def encode(self) -> bytes:
+        record = self.RECORD
+        return b''.join(record.pack(*member[:6], len(member[6])) + member[6]
+                        for member in self.members)
+
+
+class FileChunk(Payload):
+    """FILE_CHUNK (§3.10): decodes to a FileOffer, FileData or FileStatus by its kind byte
+
+    The kinds implement ``encode`` and ``_decode``; FileChunk itself is
+    never instantiated.
+    """
+
+    __slots__ = ('transfer_id', 'flags')
+
+    KIND = -1
+    KIND_OFFER = 0
+    KIND_DATA = 1
+    KIND_STATUS = 2
+
+    # kind (1B) + flags (1B) + transfer ID (2B)
+    HEADER = struct.Struct('!B B H')
+    STRUCT = HEADER
+
+    @classmethod
+    def decode(cls, data) -> Optional['FileChunk']:
+        if len(data) < cls.STRUCT.size:
+            return None
+        codec = _FILE_KINDS.get(data[0])
+        if codec is None or (cls is not FileChunk and codec is not cls):
+            return None
+        if len(data) < codec.STRUCT.size:
+            return None
+        return codec._decode(data)
+
+    @classmethod
+    @abstractmethod
+    def _decode(cls, data) -> 'FileChunk':
+        """Instance for ``data``, already checked to be of this kind and long enough"""
+
+
+class FileOffer(FileChunk):
+    """Announces a transfer so the receiver can allocate the file"""
+
+    __slots__ = ('size', 'chunk_size', 'name')
+
+    KIND = FileChunk.KIND_OFFER
+    MAX_NAME = 64
+
+    # header + file size (4B) + chunk size (2B), followed by the file name
+    STRUCT = struct.Struct('!B B H I H')
+
+    def __init__(self, transfer_id: int, size: int, chunk_size: int, name: str = '',
+                 flags: int = 0):
+        self.transfer_id = transfer_id
+        self.flags = flags
+        self.size = size
+        self.chunk_size = chunk_size
+        self.name = name
+
+    @classmethod
+    def _decode(cls, data) -> 'FileOffer':
+        _, flags, transfer_id, size, chunk_size = cls.STRUCT.unpack_from(data)
+        name = bytes(data[cls.STRUCT.size:]).decode('utf-8', 'replace')
+        return cls(transfer_id, size, chunk_size, name, flags)
+
+    def encode(self) -> bytes:
+        return self.STRUCT.pack(self.KIND, self.flags, self.transfer_id, self.size,
+                                self.chunk_size) + _utf8(self.name, self.MAX_NAME)
+
+
+class FileData(FileChunk):
+    """Carries one chunk of a transfer"""
+
+    __slots__ = ('index', 'chunk')
+
+    KIND = FileChunk.KIND_DATA
+
+    # header + chunk index (2B), followed by the chunk
+    STRUCT = struct.Struct('!B B H H')
+
+    def __init__(self, transfer_id: int, index: int, chunk: bytes = b'', flags: int = 0):
+        self.transfer_id = transfer_id
+        self.flags = flags
+        self.index = index
+        self.chunk = chunk
+
+    @classmethod
+    def _decode(cls, data) -> 'FileData':
+        _, flags, transfer_id, index = cls.STRUCT.unpack_from(data)
+        return cls(transfer_id, index, bytes(data[cls.STRUCT.size:]), flags)
+
+    def encode(self) -> bytes:
+        return self.STRUCT.pack(self.KIND, self.flags, self.transfer_id,
+                                self.index) + self.chunk
+
+
+class FileStatus(FileChunk):
+    """Selective-repeat report: all chunks below ``base`` plus bit i = chunk base+1+i"""
+
+    __slots__ = ('base', 'bitmap')
+
+    KIND = FileChunk.KIND_STATUS
+
+    # header + first missing chunk (2B), followed by a bitmap of the next chunks
+    STRUCT = struct.Struct('!B B H H')
+
+    def __init__(self, transfer_id: int, base: int, bitmap: bytes = b'', flags: int = 0):
+        self.transfer_id = transfer_id
+        self.flags = flags
+        self.base = base
+        self.bitmap = bitmap
+
+    @classmethod
+    def _decode(cls, data) -> 'FileStatus':
+        _, flags, transfer_id, base = cls.STRUCT.unpack_from(data)
+        return cls(transfer_id, base, bytes(data[cls.STRUCT.size:]), flags)
+
+    def encode(self) -> bytes:
+        return self.STRUCT.pack(self.KIND, self.flags, self.transfer_id,
+                                self.base) + self.bitmap
+
+
+_FILE_KINDS = {codec.KIND: codec for codec in (FileOffer, FileData, FileStatus)}
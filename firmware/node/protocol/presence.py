@@ -0,0 +1,202 @@
+"""Presence and buddy tracking from BEACON packets (PROTOCOL_SPEC §6.1, §6.2)"""
+
+import time
+from array import array
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from .packet import PacketType
+
+CALLSIGN_SIZE = 16
+MAX_NODES = 0x10000  # Node IDs are 16-bit
+
+# Per-node state values
+UNKNOWN = 0
+OFFLINE = 1
+ONLINE = 2
+
+WHEEL_ENTRY_BYTES = 72  # (node_id, deadline) tuple plus its bucket slot
+
+# (node_id, online, callsign)
+PresenceCallback = Callable[[int, bool, str], None]
+
+
+class TimingWheel:
+    """Hierarchical timing wheel over integer node IDs
+
+    Level 0 has ``slots`` buckets of one tick each, level 1 buckets span
+    ``slots`` ticks, and so on. Scheduling appends to one bucket; each tick
+    fires one level-0 bucket and, every ``slots`` ticks, cascades one bucket
+    from the level above into finer buckets. Both are O(1) amortised per
+    timer, independent of how many timers exist.
+    """
+
+    def __init__(self, tick: float = 1.0, slots: int = 64, levels: int = 3,
+                 start: float = 0.0):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.now_tick = int(start // tick)
+        self._wheels: List[List[List[Tuple[int, int]]]] = [
+            [[] for _ in range(slots)] for _ in range(levels)
+        ]
+        self.span = slots ** levels  # Longest delay in ticks
+
+    def schedule(self, item: int, deadline: float):
+        """Fire ``item`` when the wheel reaches the tick containing ``deadline``"""
+        self._insert(item, max(int(deadline // self.tick), self.now_tick + 1))
+
+    def _insert(self, item: int, deadline_tick: int):
+        delay = deadline_tick - self.now_tick
+        if delay >= self.span:
+            deadline_tick = self.now_tick + self.span - 1
+            delay = self.span - 1
+        level = 0
+        width = 1
+        while delay >= width * self.slots:
+            level += 1
+            width *= self.slots
+        self._wheels[level][(deadline_tick // width) % self.slots].append(
+            (item, deadline_tick))
+
+    def advance(self, now: float) -> Iterator[int]:
+        """Move time forward, yielding every item whose deadline has passed"""
+        target = int(now // self.tick)
+        slots = self.slots
+        while self.now_tick < target:
+            self.now_tick += 1
+            tick = self.now_tick
+
+            # Cascade coarser levels whose bucket boundary we just crossed
+            width = slots
+            for level in range(1, self.levels):
+                if tick % width:
+                    break
+                bucket = self._wheels[level][(tick // width) % slots]
+                self._wheels[level][(tick // width) % slots] = []
+                for item, deadline_tick in bucket:
+                    self._insert(item, deadline_tick)
+                width *= slots
+
+            bucket = self._wheels[0][tick % slots]
+            if bucket:
+                self._wheels[0][tick % slots] = []
+                for item, deadline_tick in bucket:
+                    if deadline_tick <= tick:
+                        yield item
+                    else:
+                        self._insert(item, deadline_tick)
+
+
+class PresenceTracker:
+    """Tracks which nodes are online from their beacons
+
+    Per-node state lives in flat arrays indexed by node ID: last-heard tick
+    (uint32), capabilities (uint8), a state byte and a 16-byte callsign.
+    A beacon from a node already online only updates its array entries; its
+    timer is left in the wheel and, when it fires, is either rescheduled
+    from the latest beacon or turned into an offline event. With beacons
+    every 30 s and a 300 s timeout that is one wheel operation per node per
+    timeout period, not a scan of all nodes each tick.
+    """
+
+    def __init__(self, timeout: float = 300.0, tick: float = 1.0,
+                 capacity: int = MAX_NODES,
+                 clock: Callable[[], float] = time.monotonic):
+        self.timeout = timeout
+        self.tick = tick
+        self.capacity = capacity
+        self.clock = clock
+        self.last_heard = array('I', bytes(4 * capacity))
+        self.capabilities = array('B', bytes(capacity))
+        self.state = bytearray(capacity)
+        self.callsigns = bytearray(CALLSIGN_SIZE * capacity)
+        self.online_count = 0
+        self.known_count = 0
+        self._wheel = TimingWheel(tick=tick, start=clock())
+        self._subscribers: List[PresenceCallback] = []
+
+    @classmethod
+    def from_config(cls, config_path: str, **kwargs) -> 'PresenceTracker':
+        """Use ``network.buddy_timeout`` from node_config.yaml"""
+        import yaml
+
+        with open(config_path) as f:
+            config = yaml.safe_load(f)
+        return cls(timeout=config['network']['buddy_timeout'], **kwargs)
+
+    def subscribe(self, callback: PresenceCallback):
+        """Call ``callback(node_id, online, callsign)`` on every change"""
+        self._subscribers.append(callback)
+
+    def on_beacon(self, packet, now: Optional[float] = None):
+        """Record a BEACON (RoamENPacket or PacketView) from ``packet.source_id``"""
+        if packet.packet_type != PacketType.BEACON:
+            return
+        if now is None:
+            now = self.clock()
+        self.advance(now)
+
+        node_id = packet.source_id
+        payload = packet.payload
+        start = node_id * CALLSIGN_SIZE
+        callsign = bytes(payload[:CALLSIGN_SIZE])
+        self.callsigns[start:start + CALLSIGN_SIZE] = callsign.ljust(CALLSIGN_SIZE, b'\x00')
+        if len(payload) > CALLSIGN_SIZE:
+            self.capabilities[node_id] = payload[CALLSIGN_SIZE]
+        self.last_heard[node_id] = int(now // self.tick)
+
+        state = self.state[node_id]
+        if state != ONLINE:
+            if state == UNKNOWN:
+                self.known_count += 1
+            self.state[node_id] = ONLINE
+            self.online_count += 1
+            self._wheel.schedule(node_id, now + self.timeout)
+            self._publish(node_id, True)
+
+    def advance(self, now: Optional[float] = None):
+        """Expire nodes whose last beacon is older than the timeout"""
+        if now is None:
+            now = self.clock()
+        timeout_ticks = int(self.timeout // self.tick)
+        for node_id in self._wheel.advance(now):
+            if self.state[node_id] != ONLINE:
+                continue
+            deadline_tick = self.last_heard[node_id] + timeout_ticks
+            if deadline_tick > self._wheel.now_tick:
+                # Heard since the timer was set: push it out to the new deadline
+                self._wheel.schedule(node_id, deadline_tick * self.tick)
+                continue
+            self.state[node_id] = OFFLINE
+            self.online_count -= 1
+            self._publish(node_id, False)
+
+    def is_online(self, node_id: int) -> bool:
+        return self.state[node_id] == ONLINE
+
+    def supports(self, node_id: int, capability: int) -> bool:
+        """Whether the last beacon from ``node_id`` advertised ``capability``"""
+        return bool(self.capabilities[node_id] & capability)
+
+    def callsign(self, node_id: int) -> str:
+        start = node_id * CALLSIGN_SIZE
+        raw = bytes(self.callsigns[start:start + CALLSIGN_SIZE])
+        return raw.rstrip(b'\x00').decode('utf-8', 'replace')
+
+    @property
+    def memory_bytes(self) -> int:
+        """Bytes held by the per-node arrays plus pending wheel timers"""
+        arrays = (self.last_heard.itemsize * len(self.last_heard)
+                  + self.capabilities.itemsize * len(self.capabilities)
+                  + len(self.state) + len(self.callsigns))
+        return arrays + self.online_count * WHEEL_ENTRY_BYTES
+
+    @property
+    def bytes_per_node(self) -> float:
+        """Memory per node ever heard from (arrays are sized by ``capacity``)"""
+        return self.memory_bytes / max(self.known_count, 1)
+
+    def _publish(self, node_id: int, online: bool):
+        callsign = self.callsign(node_id)
+        for callback in self._subscribers:
+            callback(node_id, online, callsign)
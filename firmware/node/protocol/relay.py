@@ -0,0 +1,171 @@
+"""In-place mesh relay fast path (PROTOCOL_SPEC §5.4)"""
+
+import struct
+from typing import Optional
+
+from . import crc
+from .dedup import DuplicateCache
+from .packet import (ATTEMPT_OFFSET, CHECKSUM_OFFSET, COMPACT_CHECKSUM_OFFSET,
+                     COMPACT_LENGTH_OFFSET, RoamENPacket, frame_checksum, widen_timestamp)
+from .routing import RoutingTable
+
+BROADCAST = 0xFFFF
+TTL_OFFSET = 11
+COMPACT_TTL_OFFSET = 8
+
+# type (5), source_id (6), dest_id (8), priority (10), ttl (11), timestamp (12),
+# payload_len (16), checksum (18)
+_RELAY_FIELDS = struct.Struct('=B H H B B I H H')
+# Compact (§2.5): type|priority (3), source_id (4), dest_id (6), ttl (8), timestamp (9),
+# payload_len (11), checksum (13)
+_COMPACT_RELAY_FIELDS = struct.Struct('!B H H B H H H')
+_U16 = struct.Struct('H')
+_BE16 = struct.Struct('!H')
+_ZEROS = memoryview(bytes(RoamENPacket.HEADER_SIZE + 512))
+
+
+def ttl_checksum(checksum: int, old_ttl: int, new_ttl: int, frame_len: int,
+                 ttl_offset: int = TTL_OFFSET) -> int:
+    """Checksum of a frame after its TTL byte changes, without a full pass.
+
+    CRC16 is linear, so changing one byte changes the CRC by the CRC (zero
+    initial value) of that byte's XOR difference followed by the rest of the
+    frame as zeros. That is a single C-level ``crc_hqx`` over a shared zero
+    buffer and does not read the frame bytes at all.
+
+    Args:
+        checksum: Current CHECKSUM field
+        old_ttl: TTL the checksum was computed with
+        new_ttl: TTL being written
+        frame_len: Header + payload length
+        ttl_offset: Position of TTL in the header (``COMPACT_TTL_OFFSET``
+            for compact frames)
+
+    Returns:
+        New CHECKSUM value
+    """
+    trailing = frame_len - ttl_offset - 1
+    return checksum ^ crc.update(crc.TABLE[old_ttl ^ new_ttl], _ZEROS[:trailing])
+
+
+def patch_ttl(buffer: memoryview, offset: int, ttl: int):
+    """Rewrite the TTL byte of a validated frame in place and fix its checksum"""
+    if buffer[offset:offset + 3] == RoamENPacket.COMPACT_SIGNATURE:
+        ttl_offset, checksum_offset, field = COMPACT_TTL_OFFSET, COMPACT_CHECKSUM_OFFSET, _BE16
+        frame_len = (RoamENPacket.COMPACT_HEADER_SIZE
+                     + _BE16.unpack_from(buffer, offset + COMPACT_LENGTH_OFFSET)[0])
+    else:
+        ttl_offset, checksum_offset, field = TTL_OFFSET, CHECKSUM_OFFSET, _U16
+        frame_len = RoamENPacket.HEADER_SIZE + _U16.unpack_from(buffer, offset + 16)[0]
+    ttl_at = offset + ttl_offset
+    checksum_at = offset + checksum_offset
+    if frame_len - ttl_offset - 1 <= len(_ZEROS):
+        checksum = ttl_checksum(field.unpack_from(buffer, checksum_at)[0],
+                                buffer[ttl_at], ttl, frame_len, ttl_offset)
+        buffer[ttl_at] = ttl
+    else:
+        buffer[ttl_at] = ttl
+        checksum = frame_checksum(buffer, offset, offset + frame_len, checksum_offset)
+    field.pack_into(buffer, checksum_at, checksum)
+
+
+class Relay:
+    """Decides which received frames to forward and rewrites them in place
+
+    A frame is forwarded when it is unicast to another node, still has
+    TTL > 0, is on a useful path (when a routing table is supplied) and has
+    not been forwarded before. Forwarding decrements TTL and patches the
+    checksum directly in the receive buffer, so no packet object is created
+    on the relay path. Compact frames (§2.5) are relayed in their own
+    layout.
+    """
+
+    def __init__(self, node_id: int, cache: Optional[DuplicateCache] = None,
+                 router: Optional[RoutingTable] = None):
+        self.node_id = node_id
+        self.cache = cache if cache is not None else DuplicateCache()
+        self.router = router
+
+        self.forwarded = 0
+        self.dropped_local = 0
+        self.dropped_broadcast = 0
+        self.dropped_ttl = 0
+        self.dropped_off_path = 0
+        self.dropped_duplicate = 0
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'forwarded': self.forwarded,
+            'dropped_local': self.dropped_local,
+            'dropped_broadcast': self.dropped_broadcast,
+            'dropped_ttl': self.dropped_ttl,
+            'dropped_off_path': self.dropped_off_path,
+            'dropped_duplicate': self.dropped_duplicate,
+        }
+
+    def forward(self, buffer, offset: int = 0) -> Optional[memoryview]:
+        """Prepare a received frame for retransmission.
+
+        Header fields are read with one precompiled unpack and the frame is
+        only written if every relay rule passes.
+
+        Args:
+            buffer: Writable receive buffer (bytearray or memoryview of one)
+                holding a frame that has already passed its CRC check
+            offset: Start of the frame within ``buffer``
+
+        Returns:
+            View of the rewritten frame to hand to the transmitter, or None
+            if it should not be relayed
+        """
+        if not isinstance(buffer, memoryview):
+            buffer = memoryview(buffer)
+        if buffer[offset:offset + 3] == RoamENPacket.COMPACT_SIGNATURE:
+            (type_priority, source_id, dest_id, ttl, timestamp, payload_len,
+             checksum) = _COMPACT_RELAY_FIELDS.unpack_from(buffer, offset + 3)
+            code = type_priority & 0x0F
+            packet_type = RoamENPacket.COMPACT_TYPES.get(code, code)
+            timestamp = widen_timestamp(timestamp)
+            header_size, ttl_offset = RoamENPacket.COMPACT_HEADER_SIZE, COMPACT_TTL_OFFSET
+            attempt = 0
+        else:
+            (packet_type, source_id, dest_id, _, ttl, timestamp,
+             payload_len, checksum) = _RELAY_FIELDS.unpack_from(buffer, offset + 5)
+            header_size, ttl_offset = RoamENPacket.HEADER_SIZE, TTL_OFFSET
+            attempt = buffer[offset + ATTEMPT_OFFSET]
+
+        if dest_id == BROADCAST:
+            self.dropped_broadcast += 1
+            return None
+        if dest_id == self.node_id:
+            self.dropped_local += 1
+            return None
+        if ttl == 0:
+            self.dropped_ttl += 1
+            return None
+        if self.router is not None and not self.router.should_relay(dest_id, ttl):
+            self.dropped_off_path += 1
+            return None
+
+        # Same key as dedup.frame_key, built from the fields already unpacked
+        start = offset + header_size
+        end = start + payload_len
+        key = (source_id, timestamp, packet_type, crc.crc16(buffer[start:end]), attempt)
+        if self.cache.seen(key):
+            self.dropped_duplicate += 1
+            return None
+
+        frame_len = end - offset
+        if frame_len - ttl_offset - 1 > len(_ZEROS):
+            patch_ttl(buffer, offset, ttl - 1)
+        elif ttl_offset == TTL_OFFSET:
+            buffer[offset + TTL_OFFSET] = ttl - 1
+            _U16.pack_into(buffer, offset + CHECKSUM_OFFSET,
+                           ttl_checksum(checksum, ttl, ttl - 1, frame_len))
+        else:
+            buffer[offset + COMPACT_TTL_OFFSET] = ttl - 1
+            _BE16.pack_into(buffer, offset + COMPACT_CHECKSUM_OFFSET,
+                            ttl_checksum(checksum, ttl, ttl - 1, frame_len, COMPACT_TTL_OFFSET))
+        self.forwarded += 1
+        return buffer[offset:end]
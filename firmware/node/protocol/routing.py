@@ -0,0 +1,192 @@
+"""Next-hop routing built from beacons (PROTOCOL_SPEC §5.3, §5.4)"""
+
+import time
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from .packet import BeaconPacket
+
+INITIAL_TTL = 5       # TTL a fresh packet is sent with (§2.4.5)
+MAX_HOPS = 15         # Routes longer than this are treated as unreachable
+RATIO_ALPHA = 0.2     # EWMA weight of each beacon interval in the delivery ratio
+MIN_RATIO = 0.05      # Below this a link is considered down
+
+
+class _Link:
+    __slots__ = ('neighbour', 'ratio', 'last_heard', 'advertised', 'aged')
+
+    def __init__(self, neighbour: int, now: float):
+        self.neighbour = neighbour
+        self.ratio = 1.0
+        self.last_heard = now
+        self.advertised: Dict[int, int] = {}
+        self.aged = 0  # Missed beacons already taken off the ratio by ``expire``
+
+    @property
+    def etx(self) -> float:
+        """Expected transmissions over this link"""
+        return 1.0 / max(self.ratio, MIN_RATIO)
+
+    def age(self, now: float, interval: float):
+        """Pull the ratio down for beacons missed since last heard, once each"""
+        missed = max(0, round((now - self.last_heard) / interval) - 1)
+        self.ratio *= (1 - RATIO_ALPHA) ** max(0, missed - self.aged)
+        self.aged = max(self.aged, missed)
+
+
+class RoutingTable:
+    """Distance-vector next-hop table fed by neighbour beacons
+
+    Each beacon refreshes the link to its sender, which is one hop away
+    (beacons are never relayed), and a per-link delivery ratio is kept as an
+    EWMA over beacon intervals (a missed interval pulls it down). Route
+    entries appended to the beacon (see BeaconPacket) are the neighbour's own
+    distances; MAX_HOPS or more withdraws a route. The best route to each
+    destination minimises advertised hops plus the link's expected
+    transmissions.
+
+    Only destinations touched by a change are re-evaluated, each against at
+    most one candidate per neighbour, and ``next_hop`` is a dict lookup.
+    """
+
+    def __init__(self, node_id: int, beacon_interval: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.node_id = node_id
+        self.beacon_interval = beacon_interval
+        self.clock = clock
+        self._links: Dict[int, _Link] = {}
+        self._via: Dict[int, Set[int]] = {}             # dest -> neighbours offering it
+        self._best: Dict[int, Tuple[int, int]] = {}     # dest -> (next_hop, hops)
+        self.recomputed = 0
+
+    @classmethod
+    def from_config(cls, config_path: str, **kwargs) -> 'RoutingTable':
+        """Use ``node.id`` and ``network.beacon_interval`` from node_config.yaml"""
+        import yaml
+
+        with open(config_path) as f:
+            config = yaml.safe_load(f)
+        return cls(config['node']['id'],
+                   beacon_interval=config['network']['beacon_interval'], **kwargs)
+
+    def __len__(self) -> int:
+        return len(self._best)
+
+    def next_hop(self, dest_id: int) -> Optional[int]:
+        """Neighbour to send through, or None if the destination is unknown"""
+        route = self._best.get(dest_id)
+        return route[0] if route else None
+
+    def hops(self, dest_id: int) -> Optional[int]:
+        route = self._best.get(dest_id)
+        return route[1] if route else None
+
+    def ttl_for(self, dest_id: int) -> int:
+        """TTL to send with: the route length, or a full flood when unknown"""
+        route = self._best.get(dest_id)
+        return route[1] if route else INITIAL_TTL
+
+    def should_relay(self, dest_id: int, ttl: int) -> bool:
+        """Controlled flooding rule for a unicast frame we overheard.
+
+        The header has no next-hop field, so senders set TTL to their route
+        length and a relay only forwards if it is closer to the destination
+        than the hops the frame has left. Unknown destinations are flooded.
+        """
+        route = self._best.get(dest_id)
+        if route is None:
+            return ttl > 0
+        return route[1] <= ttl - 1
+
+    def on_beacon(self, packet, now: Optional[float] = None):
+        """Update the link to the beacon's sender and its advertised routes"""
+        info = BeaconPacket.parse(packet)
+        if info is None or packet.source_id == self.node_id:
+            return
+        if now is None:
+            now = self.clock()
+
+        neighbour = packet.source_id
+        link = self._links.get(neighbour)
+        if link is None:
+            link = self._links[neighbour] = _Link(neighbour, now)
+        else:
+            link.age(now, self.beacon_interval)
+            link.ratio += RATIO_ALPHA * (1 - link.ratio)
+            link.last_heard = now
+            link.aged = 0
+
+        routes = {dest: hop for dest, hop in info['routes'].items()
+                  if dest != self.node_id and hop < MAX_HOPS}
+        routes[neighbour] = 0
+        withdrawn = set(link.advertised) - set(routes)
+        for dest in withdrawn:
+            self._via[dest].discard(neighbour)
+        for dest in routes:
+            self._via.setdefault(dest, set()).add(neighbour)
+        link.advertised = routes
+
+        # The link metric moved too, so every destination via it is re-ranked
+        self._reevaluate(withdrawn.union(routes))
+
+    def link_down(self, neighbour: int):
+        """Drop a neighbour (e.g. the buddy system timed it out)"""
+        link = self._links.pop(neighbour, None)
+        if link is None:
+            return
+        for dest in link.advertised:
+            self._via[dest].discard(neighbour)
+        self._reevaluate(set(link.advertised))
+
+    def expire(self, now: Optional[float] = None, missed_beacons: int = 10):
+        """Age link ratios for silent neighbours and drop dead links
+
+        A neighbour's routes are re-ranked as soon as it misses a beacon,
+        rather than when it is next heard from.
+        """
+        if now is None:
+            now = self.clock()
+        for neighbour, link in list(self._links.items()):
+            missed = (now - link.last_heard) / self.beacon_interval
+            if missed >= missed_beacons:
+                self.link_down(neighbour)
+                continue
+            aged = link.aged
+            link.age(now, self.beacon_interval)
+            if link.aged != aged:
+                self._reevaluate(set(link.advertised))
+
+    def advertisement(self, neighbour: Optional[int] = None) -> Dict[int, int]:
+        """Our own distances, for appending to outgoing beacons
+
+        Args:
+            neighbour: Recipient, if the routes are for one neighbour only.
+                Routes through it are advertised as MAX_HOPS (split horizon
+                with poison reverse), so after its own route fails it does
+                not come back through us and count to infinity.
+        """
+        return {dest: MAX_HOPS if next_hop == neighbour else hops
+                for dest, (next_hop, hops) in self._best.items()}
+
+    def link_quality(self, neighbour: int) -> Optional[float]:
+        link = self._links.get(neighbour)
+        return link.ratio if link else None
+
+    def _reevaluate(self, dests):
+        for dest in dests:
+            self.recomputed += 1
+            best = None
+            best_cost = None
+            for neighbour in self._via.get(dest, ()):
+                link = self._links[neighbour]
+                hops = 1 + link.advertised[dest]
+                if hops > MAX_HOPS:
+                    continue
+                cost = link.etx + link.advertised[dest]
+                if best_cost is None or cost < best_cost:
+                    best, best_cost = (neighbour, hops), cost
+            if best is None:
+                self._best.pop(dest, None)
+                if not self._via.get(dest):
+                    self._via.pop(dest, None)
+            else:
+                self._best[dest] = best
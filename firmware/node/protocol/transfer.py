@@ -0,0 +1,455 @@
+"""Windowed FILE_CHUNK transfer with selective repeat (PROTOCOL_SPEC §3.10)"""
+
+import mmap
+import os
+import tempfile
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from .packet import MAX_PAYLOAD_SIZE, FilePacket, PacketType, Priority, RoamENPacket
+
+CHUNK_SIZE = MAX_PAYLOAD_SIZE - FilePacket.DATA.size
+LOSS_GAIN = 0.25   # EWMA weight of each burst's loss sample
+LOSS_STEP = 0.15   # Each step of smoothed loss adds a redundant POLL to the burst
+MAX_POLLS = 3
+
+# (source_id, transfer_id, path)
+CompleteCallback = Callable[[int, int, str], None]
+
+
+def _attempt_flags(attempt: int) -> int:
+    return (attempt & 0x0F) << FilePacket.ATTEMPT_SHIFT
+
+
+class FileSender:
+    """Sends one file as a window of chunks and resends only what was missed
+
+    Chunks go out in bursts of up to ``window``; the last one of each burst
+    carries POLL and the sender then waits for the receiver's STATUS. That
+    report's cumulative base and bitmap mark chunks as delivered, and every
+    chunk of the burst not covered is queued for the next burst. If no
+    STATUS arrives within ``rto`` the last chunk is resent as a probe.
+
+    Lost chunks only cost their own resend, but a lost POLL or STATUS costs
+    a whole ``rto``, so that is what the adaptation targets. The smoothed
+    per-chunk loss rate sets how many of the last chunks in a burst carry
+    POLL. The window grows by one after every answered burst, amortising
+    the turnaround, and halves after consecutive timeouts, when the link
+    looks faded or congested rather than merely lossy.
+    """
+
+    def __init__(self, source_id: int, dest_id: int, transfer_id: int, data,
+                 name: str = '', chunk_size: int = CHUNK_SIZE, window: int = 8,
+                 min_window: int = 1, max_window: int = 32, rto: float = 10.0,
+                 priority: Priority = Priority.NORMAL,
+                 clock: Callable[[], float] = time.monotonic):
+        self.source_id = source_id
+        self.dest_id = dest_id
+        self.transfer_id = transfer_id
+        self.name = name
+        self.chunk_size = chunk_size
+        self.size = len(data)
+        self.chunks = -(-self.size // chunk_size)
+        if self.chunks > FilePacket.MAX_CHUNKS:
+            raise ValueError(f"File too large for {chunk_size}-byte chunks: {self.size} bytes")
+        self.window = window
+        self.min_window = min_window
+        self.max_window = min(max_window, FilePacket.STATUS_BITS)
+        self.rto = rto
+        self.priority = priority
+        self.clock = clock
+        self._data = memoryview(data) if self.size else memoryview(b'')
+        self._file = None
+        self._map = None
+
+        self.acked = bytearray(self.chunks)
+        self.base = 0
+        self.next_index = 0
+        self._attempts = bytearray(self.chunks)
+        self._in_flight: List[int] = []
+        self._retransmit: Deque[int] = deque()
+        self._offered = False
+        self._waiting_since: Optional[float] = None
+        self._timeouts_in_row = 0
+
+        self.loss = 0.0
+        self.data_sent = 0
+        self.retransmissions = 0
+        self.timeouts = 0
+        self.statuses = 0
+
+    @classmethod
+    def from_file(cls, path: str, source_id: int, dest_id: int, transfer_id: int,
+                  **kwargs) -> 'FileSender':
+        """Send a file through a read-only memory map instead of reading it in"""
+        f = open(path, 'rb')
+        size = os.fstat(f.fileno()).st_size
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        kwargs.setdefault('name', os.path.basename(path))
+        sender = cls(source_id, dest_id, transfer_id, mapped, **kwargs)
+        sender._file = f
+        sender._map = mapped if size else None
+        return sender
+
+    def close(self):
+        self._data.release()
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @property
+    def done(self) -> bool:
+        return self._offered and self.base >= self.chunks
+
+    @property
+    def deadline(self) -> Optional[float]:
+        """When ``next_packets`` will time out waiting for a STATUS, if it is waiting"""
+        if self._waiting_since is None:
+            return None
+        return self._waiting_since + self.rto
+
+    @property
+    def polls(self) -> int:
+        """How many chunks at the end of a burst carry POLL at the current loss rate"""
+        return min(1 + int(self.loss / LOSS_STEP), MAX_POLLS)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'chunks': self.chunks,
+            'acked': self.base if self.base >= self.chunks else sum(self.acked),
+            'data_sent': self.data_sent,
+            'retransmissions': self.retransmissions,
+            'retransmission_ratio': self.retransmissions / self.chunks if self.chunks else 0.0,
+            'timeouts': self.timeouts,
+            'statuses': self.statuses,
+            'window': self.window,
+            'loss': self.loss,
+        }
+
+    def next_packets(self, now: Optional[float] = None) -> List[RoamENPacket]:
+        """Next burst to transmit, or an empty list while waiting for a STATUS"""
+        if self.done:
+            return []
+        if now is None:
+            now = self.clock()
+        if self._waiting_since is not None:
+            if now < self._waiting_since + self.rto:
+                return []
+            return self._probe(now)
+
+        indices = []
+        in_flight = self._in_flight
+        limit = self.base + FilePacket.STATUS_BITS  # Highest index a STATUS can report
+        while len(in_flight) < self.window:
+            if self._retransmit:
+                index = self._retransmit.popleft()
+                if self.acked[index]:
+                    continue
+                self.retransmissions += 1
+            elif self.next_index < self.chunks and self.next_index <= limit:
+                index = self.next_index
+                self.next_index += 1
+            else:
+                break
+            in_flight.append(index)
+            indices.append(index)
+
+        packets = []
+        if not self._offered:
+            packets.append(self._offer(poll=not indices))
+        first_poll = len(indices) - self.polls
+        for i, index in enumerate(indices):
+            packets.append(self._chunk(index, poll=i >= first_poll))
+        if packets:
+            self._waiting_since = now
+        return packets
+
+    def on_packet(self, packet, now: Optional[float] = None) -> bool:
+        """Apply a STATUS from the receiver; returns False for anything else"""
+        if packet.packet_type != PacketType.FILE_CHUNK or packet.source_id != self.dest_id:
+            return False
+        payload = packet.payload
+        if len(payload) < FilePacket.STATUS.size:
+            return False
+        kind, flags, transfer_id, base = FilePacket.STATUS.unpack_from(payload)
+        if kind != FilePacket.KIND_STATUS or transfer_id != self.transfer_id:
+            return False
+
+        self.statuses += 1
+        self._offered = True
+        self._waiting_since = None
+        self._timeouts_in_row = 0
+        acked = self.acked
+        chunks = self.chunks
+        if flags & FilePacket.COMPLETE:
+            base = chunks
+        for index in range(self.base, min(base, chunks)):
+            acked[index] = 1
+        bitmap = payload[FilePacket.STATUS.size:]
+        for byte_index, byte in enumerate(bitmap):
+            if byte:
+                first = base + 1 + byte_index * 8
+                for bit in range(8):
+                    if byte >> bit & 1 and first + bit < chunks:
+                        acked[first + bit] = 1
+        while self.base < chunks and acked[self.base]:
+            self.base += 1
+
+        in_flight = self._in_flight
+        if in_flight:
+            missing = [index for index in in_flight if not acked[index]]
+            self._retransmit.extend(missing)
+            self.loss += LOSS_GAIN * (len(missing) / len(in_flight) - self.loss)
+            self.window = min(self.window + 1, self.max_window)
+            in_flight.clear()
+        return True
+
+    def _probe(self, now: float) -> List[RoamENPacket]:
+        """No STATUS in time: resend a POLL, backing off if this keeps happening"""
+        self.timeouts += 1
+        self._timeouts_in_row += 1
+        if self._timeouts_in_row > 1:
+            self.window = max(self.window // 2, self.min_window)
+        self._waiting_since = now
+        if not self._offered:
+            packets = [self._offer(poll=not self._in_flight)]
+        else:
+            packets = []
+        if self._in_flight:
+            self.retransmissions += 1
+            packets.append(self._chunk(self._in_flight[-1], poll=True))
+        return packets
+
+    def _offer(self, poll: bool) -> RoamENPacket:
+        return FilePacket.offer(self.source_id, self.dest_id, self.transfer_id, self.size,
+                                self.chunk_size, self.name,
+                                FilePacket.POLL if poll else 0, self.priority)
+
+    def _chunk(self, index: int, poll: bool) -> RoamENPacket:
+        attempt = self._attempts[index] = (self._attempts[index] + 1) & 0xFF
+        flags = _attempt_flags(attempt) | (FilePacket.POLL if poll else 0)
+        start = index * self.chunk_size
+        self.data_sent += 1
+        return FilePacket.data(self.source_id, self.dest_id, self.transfer_id, index,
+                               bytes(self._data[start:start + self.chunk_size]),
+                               flags, self.priority)
+
+
+class _Incoming:
+    """One transfer being reassembled into its own partial file
+
+    The partial file is created exclusively under a unique name, so no
+    other transfer (or OFFER) can reopen, truncate or overwrite it while
+    it is mapped. ``publish`` moves it to its final name once complete.
+    """
+
+    __slots__ = ('path', 'partial', 'file', 'map', 'size', 'chunk_size', 'chunks',
+                 'received', 'count', 'base')
+
+    def __init__(self, directory: str, name: str, key: Tuple[int, int], size: int,
+                 chunk_size: int):
+        self.path = os.path.join(directory, name)
+        self.size = size
+        self.chunk_size = chunk_size
+        self.chunks = -(-size // chunk_size)
+        self.received = bytearray(self.chunks)
+        self.count = 0
+        self.base = 0
+        fd, self.partial = tempfile.mkstemp(prefix=f".{name}.{key[0]}-{key[1]}.",
+                                            suffix='.part', dir=directory)
+        self.file = os.fdopen(fd, 'w+b')
+        if size:
+            self.file.truncate(size)
+            self.map = mmap.mmap(self.file.fileno(), size)
+        else:
+            self.map = None
+
+    def close(self):
+        if self.map is not None:
+            self.map.flush()
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+    def discard(self):
+        self.close()
+        try:
+            os.unlink(self.partial)
+        except FileNotFoundError:
+            pass
+
+    def publish(self) -> str:
+        """Move the finished file to its name, or ``name-N`` if that is taken
+
+        The final name is claimed with an exclusive create before the partial
+        file replaces it, so an existing file is never overwritten.
+        """
+        self.close()
+        stem, extension = os.path.splitext(self.path)
+        path, n = self.path, 0
+        while True:
+            try:
+                os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+                break
+            except FileExistsError:
+                n += 1
+                path = f"{stem}-{n}{extension}"
+        os.replace(self.partial, path)
+        self.path = path
+        return path
+
+
+class FileReceiver:
+    """Reassembles incoming transfers straight into memory-mapped files
+
+    An OFFER creates a private partial file at its final size and maps it;
+    each DATA chunk is written at its offset in the map, so a transfer never
+    holds more than one chunk in memory. A finished file is renamed into
+    place, next to (never over) any file that already has its name. Any
+    chunk carrying POLL is answered with a STATUS: the first missing chunk
+    plus a bitmap of the ones after it.
+    The chunk that completes a file is always answered, with COMPLETE set.
+    """
+
+    def __init__(self, node_id: int, directory: str, max_transfers: int = 4,
+                 priority: Priority = Priority.NORMAL):
+        self.node_id = node_id
+        self.directory = directory
+        self.max_transfers = max_transfers
+        self.priority = priority
+        self._transfers: Dict[Tuple[int, int], _Incoming] = {}
+        self._completed: 'OrderedDict[Tuple[int, int], str]' = OrderedDict()
+        self._subscribers: List[CompleteCallback] = []
+
+        self.chunks_received = 0
+        self.duplicates = 0
+        self.statuses_sent = 0
+        self.rejected = 0
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'active': len(self._transfers),
+            'completed': len(self._completed),
+            'chunks_received': self.chunks_received,
+            'duplicates': self.duplicates,
+            'statuses_sent': self.statuses_sent,
+            'rejected': self.rejected,
+        }
+
+    def subscribe(self, callback: CompleteCallback):
+        """Call ``callback(source_id, transfer_id, path)`` when a file is complete"""
+        self._subscribers.append(callback)
+
+    def on_packet(self, packet) -> Optional[RoamENPacket]:
+        """Handle an OFFER or DATA packet; returns the STATUS to send back, if any"""
+        if packet.packet_type != PacketType.FILE_CHUNK or packet.dest_id != self.node_id:
+            return None
+        payload = packet.payload
+        if len(payload) < FilePacket.HEADER.size:
+            return None
+        kind, flags, transfer_id = FilePacket.HEADER.unpack_from(payload)
+        key = (packet.source_id, transfer_id)
+
+        if kind == FilePacket.KIND_DATA and len(payload) >= FilePacket.DATA.size:
+            incoming = self._transfers.get(key)
+            if incoming is None:
+                return self._status_for_unknown(key, flags)
+            index = FilePacket.DATA.unpack_from(payload)[3]
+            if index < incoming.chunks:
+                self._store(incoming, index, payload)
+            if incoming.count == incoming.chunks:
+                self._finish(key, incoming)
+                return self._status(key, incoming.chunks, FilePacket.COMPLETE)
+            if flags & FilePacket.POLL:
+                return self._status(key, incoming.base, 0, incoming.received)
+            return None
+
+        if kind == FilePacket.KIND_OFFER and len(payload) >= FilePacket.OFFER.size:
+            if key not in self._transfers and key not in self._completed:
+                if not self._start(key, payload):
+                    return None
+            if flags & FilePacket.POLL:
+                return self._status_for_known(key)
+        return None
+
+    def close(self):
+        """Abandon every transfer still in progress, removing its partial file"""
+        for incoming in self._transfers.values():
+            incoming.discard()
+        self._transfers.clear()
+
+    def _start(self, key: Tuple[int, int], payload) -> bool:
+        if len(self._transfers) >= self.max_transfers:
+            self.rejected += 1
+            return False
+        _, _, _, size, chunk_size = FilePacket.OFFER.unpack_from(payload)
+        name = bytes(payload[FilePacket.OFFER.size:]).decode('utf-8', 'replace')
+        name = os.path.basename(name.replace('\\', '/')).strip()
+        if not name or name in ('.', '..'):
+            name = f"transfer-{key[0]}-{key[1]}"
+        if not chunk_size or -(-size // chunk_size) > FilePacket.MAX_CHUNKS:
+            self.rejected += 1
+            return False
+        incoming = _Incoming(self.directory, name, key, size, chunk_size)
+        self._transfers[key] = incoming
+        if not incoming.chunks:
+            self._finish(key, incoming)
+        return True
+
+    def _store(self, incoming: _Incoming, index: int, payload):
+        if incoming.received[index]:
+            self.duplicates += 1
+            return
+        start = index * incoming.chunk_size
+        length = min(incoming.chunk_size, incoming.size - start)
+        if len(payload) - FilePacket.DATA.size != length:
+            return
+        incoming.map[start:start + length] = payload[FilePacket.DATA.size:]
+        incoming.received[index] = 1
+        incoming.count += 1
+        self.chunks_received += 1
+        while incoming.base < incoming.chunks and incoming.received[incoming.base]:
+            incoming.base += 1
+
+    def _finish(self, key: Tuple[int, int], incoming: _Incoming):
+        path = incoming.publish()
+        del self._transfers[key]
+        self._completed[key] = path
+        if len(self._completed) > 32:
+            self._completed.popitem(last=False)
+        for callback in self._subscribers:
+            callback(key[0], key[1], path)
+
+    def _status_for_unknown(self, key: Tuple[int, int], flags: int) -> Optional[RoamENPacket]:
+        # A POLL for a finished transfer means our COMPLETE was lost
+        if flags & FilePacket.POLL and key in self._completed:
+            return self._status(key, 0, FilePacket.COMPLETE)
+        return None
+
+    def _status_for_known(self, key: Tuple[int, int]) -> Optional[RoamENPacket]:
+        if key in self._completed:
+            return self._status(key, 0, FilePacket.COMPLETE)
+        incoming = self._transfers.get(key)
+        if incoming is None:
+            return None
+        return self._status(key, incoming.base, 0, incoming.received)
+
+    def _status(self, key: Tuple[int, int], base: int, flags: int,
+                received: Optional[bytearray] = None) -> RoamENPacket:
+        bitmap = bytearray()
+        if received is not None:
+            window = received[base + 1:base + 1 + FilePacket.STATUS_BITS]
+            bitmap = bytearray((len(window) + 7) // 8)
+            for i, have in enumerate(window):
+                if have:
+                    bitmap[i >> 3] |= 1 << (i & 7)
+            bitmap = bitmap.rstrip(b'\x00')
+        self.statuses_sent += 1
+        return FilePacket.status(self.node_id, key[0], key[1], base, bytes(bitmap),
+                                 flags, self.priority)
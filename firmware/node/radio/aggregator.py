@@ -0,0 +1,176 @@
+"""Coalesces small frames for one next hop into AGGREGATE frames (PROTOCOL_SPEC §3.11)"""
+
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from protocol.packet import AckPacket, AggregatePacket, PacketType, Priority, RoamENPacket
+
+# How long a packet may wait for company before its bin is sent (s)
+DEADLINES = {
+    Priority.INFO: 2.0,
+    Priority.NORMAL: 1.0,
+    Priority.URGENT: 0.25,
+}
+
+# Types worth holding back; voice and file traffic have their own pacing
+AGGREGATABLE = frozenset((PacketType.TEXT_MESSAGE, PacketType.ACK, PacketType.ALERT,
+                          PacketType.BEACON))
+
+
+class _Bin:
+    __slots__ = ('packets', 'acks', 'ack_priority', 'size', 'deadline', 'timer')
+
+    def __init__(self):
+        self.packets: List[RoamENPacket] = []
+        self.acks: Dict[int, List[Tuple[int, int]]] = {}  # dest -> (source, timestamp)
+        self.ack_priority: Dict[int, Priority] = {}
+        self.size = 0
+        self.deadline = float('inf')
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class Aggregator:
+    """Batches small packets per next hop in front of a TxScheduler
+
+    Each eligible packet joins the bin for its next hop. A bin is sent when
+    the next packet would not fit in ``max_payload``, or when its earliest
+    member reaches its priority's deadline. A bin holding one packet goes
+    out unchanged; otherwise its members share one AGGREGATE header.
+    Single-form ACKs this node sends are merged into one block ACK per
+    destination.
+
+    EMERGENCY traffic and packets that are large or of other types go
+    straight to the scheduler, so they are never delayed.
+    """
+
+    def __init__(self, scheduler, node_id: int, max_payload: int = 256,
+                 max_member: int = 96, deadlines: Optional[Dict[Priority, float]] = None):
+        self.scheduler = scheduler
+        self.node_id = node_id
+        self.max_payload = max_payload
+        self.max_member = max_member
+        self.deadlines = DEADLINES if deadlines is None else deadlines
+        self._bins: Dict[int, _Bin] = {}
+        self._flushing: List[asyncio.Task] = []
+
+        self.packets_in = 0
+        self.frames_out = 0
+        self.aggregated = 0
+        self.acks_merged = 0
+        self.bypassed = 0
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'packets_in': self.packets_in,
+            'frames_out': self.frames_out,
+            'aggregated': self.aggregated,
+            'acks_merged': self.acks_merged,
+            'bypassed': self.bypassed,
+            'pending': self.pending,
+        }
+
+    @property
+    def pending(self) -> int:
+        return sum(len(b.packets) + sum(map(len, b.acks.values())) for b in self._bins.values())
+
+    async def submit(self, packet: RoamENPacket, next_hop: Optional[int] = None):
+        """Queue ``packet`` for the neighbour ``next_hop`` (default: its destination)"""
+        self.packets_in += 1
+        deadline = self.deadlines.get(self.scheduler.level_for(packet))
+        if (deadline is None or packet.packet_type not in AGGREGATABLE
+                or len(packet.payload) > self.max_member):
+            self.bypassed += 1
+            self.frames_out += 1
+            await self.scheduler.submit(packet)
+            return
+
+        key = packet.dest_id if next_hop is None else next_hop
+        ack = self._single_ack(packet)
+        pending = self._bins.get(key)
+        if ack is None:
+            size = AggregatePacket.RECORD.size + len(packet.payload)
+        elif pending is not None and packet.dest_id in pending.acks:
+            size = AckPacket.BLOCK.size + 1  # At worst it starts a new block
+        else:
+            size = AggregatePacket.RECORD.size + AckPacket.COUNT.size + AckPacket.BLOCK.size + 1
+        full = None
+        if pending is not None and pending.size + size > self.max_payload:
+            # Detached before anything awaits, so concurrent submits start the next bin
+            full = self._detach(key)
+            pending = None
+        if pending is None:
+            pending = self._bins[key] = _Bin()
+
+        if ack is not None:
+            acks = pending.acks.setdefault(packet.dest_id, [])
+            if acks:
+                self.acks_merged += 1
+            acks.append(ack)
+            priority = pending.ack_priority.get(packet.dest_id, Priority.INFO)
+            pending.ack_priority[packet.dest_id] = max(priority, packet.priority)
+        else:
+            pending.packets.append(packet)
+        pending.size += size
+
+        loop = asyncio.get_running_loop()
+        due = loop.time() + deadline
+        if due < pending.deadline:
+            pending.deadline = due
+            if pending.timer is not None:
+                pending.timer.cancel()
+            pending.timer = loop.call_at(due, self._expire, key, pending)
+        if full is not None:
+            await self._send(key, full)
+
+    async def flush(self):
+        """Send every bin now (e.g. before the node shuts down)"""
+        for key in list(self._bins):
+            await self._flush(key)
+        if self._flushing:
+            await asyncio.gather(*self._flushing)
+
+    def _single_ack(self, packet: RoamENPacket) -> Optional[Tuple[int, int]]:
+        """(source, timestamp) of a successful single ACK from this node, else None"""
+        if packet.packet_type != PacketType.ACK or packet.source_id != self.node_id:
+            return None
+        info = AckPacket.parse(packet)
+        if info is None or info['status'] or len(packet.payload) != AckPacket.SINGLE.size:
+            return None
+        return info['acked'][0]
+
+    def _expire(self, key: int, pending: _Bin):
+        if self._bins.get(key) is pending:
+            task = asyncio.ensure_future(self._send(key, self._detach(key)))
+            self._flushing.append(task)
+            task.add_done_callback(self._flushing.remove)
+
+    async def _flush(self, key: int):
+        pending = self._detach(key)
+        if pending is not None:
+            await self._send(key, pending)
+
+    def _detach(self, key: int) -> Optional[_Bin]:
+        """Take the bin for ``key`` out of use; later packets start a new one"""
+        pending = self._bins.pop(key, None)
+        if pending is not None and pending.timer is not None:
+            pending.timer.cancel()
+        return pending
+
+    async def _send(self, key: int, pending: _Bin):
+        packets = pending.packets
+        for dest_id, acks in pending.acks.items():
+            priority = pending.ack_priority[dest_id]
+            if len(acks) == 1:
+                packets.append(AckPacket.create(self.node_id, dest_id, *acks[0],
+                                                priority=priority))
+            else:
+                packets.append(AckPacket.block(self.node_id, dest_id, acks, priority))
+
+        if len(packets) == 1:
+            frame = packets[0]
+        else:
+            frame = AggregatePacket.create(self.node_id, key, packets)
+            self.aggregated += len(packets)
+        self.frames_out += 1
+        await self.scheduler.submit(frame)
@@ -0,0 +1,36 @@
+"""In-memory radio stand-in for testing without hardware"""
+
+import asyncio
+from typing import List, Tuple
+
+
+class FakeRadio:
+    """Half-duplex radio that records frames and sleeps for their airtime
+
+    ``time_scale`` shrinks the simulated airtime so tests run quickly;
+    a cancelled transmit is recorded as aborted, like a keyed-down TX.
+    """
+
+    def __init__(self, time_scale: float = 1.0):
+        self.time_scale = time_scale
+        self.sent: List[bytes] = []
+        self.aborted: List[bytes] = []
+        self.log: List[Tuple[float, float, bytes]] = []
+        self._busy = False
+
+    async def transmit(self, frame: bytes, airtime: float):
+        """Key up for ``airtime`` seconds (scaled) and record the frame"""
+        if self._busy:
+            raise RuntimeError("FakeRadio is half-duplex: already transmitting")
+        loop = asyncio.get_running_loop()
+        self._busy = True
+        start = loop.time()
+        try:
+            await asyncio.sleep(airtime * self.time_scale)
+        except asyncio.CancelledError:
+            self.aborted.append(frame)
+            raise
+        finally:
+            self._busy = False
+        self.sent.append(frame)
+        self.log.append((start, loop.time(), frame))
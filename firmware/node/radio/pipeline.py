@@ -0,0 +1,435 @@
+"""Multi-process receive pipeline for gateways listening on several channels
+
+Each channel's byte stream is cut into chunks. A chunk is copied once into
+a slot of a shared-memory block, and a worker process validates every
+frame that *starts* in it: sync search, length, CRC, and the payload CRC
+used for duplicate keys. The slot also holds the next ``LOOKAHEAD`` bytes
+of the stream, so a frame that runs past the end of its chunk is still
+complete and no worker needs state from another. Only small tuples of
+header fields and each frame's duplicate key travel back; the frame bytes
+never go through pickle.
+
+The parent takes results in submission order, which is the order chunks
+arrived in. It drops frames that overlap the previous frame on their
+channel (what FrameSync's scan would have skipped), suppresses copies of
+one packet heard on several channels with one DuplicateCache lookup per
+chunk, and yields one ordered stream of ``(channel, rx_time, packet)``, or
+of lazy FrameViews over the slots from ``views``. That per-frame work is
+serial, so it bounds how far more workers help; ``views`` keeps it small.
+"""
+
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from protocol import crc
+from protocol.dedup import DuplicateCache, DuplicateKey
+from protocol.framing import MAX_PAYLOAD
+from protocol.metrics import METRICS, DecodeMetrics
+from protocol.packet import (COMPACT_CHECKSUM_OFFSET, COMPACT_HEADER_STRUCT, HEADER_STRUCT,
+                             PacketType, Priority, RoamENPacket, frame_checksum)
+
+CHUNK_SIZE = 64 << 10
+LOOKAHEAD = RoamENPacket.HEADER_SIZE + MAX_PAYLOAD  # Longest frame that can start in a chunk
+
+# Member lookups: calling an IntEnum costs several times a dict lookup
+_TYPES = {int(member): member for member in PacketType}
+_PRIORITIES = {int(member): member for member in Priority}
+_SYNC = RoamENPacket.SYNC
+_COMPACT_SIGNATURE = RoamENPacket.COMPACT_SIGNATURE
+_CLASSIC_SIZE = RoamENPacket.HEADER_SIZE
+_COMPACT_SIZE = RoamENPacket.COMPACT_HEADER_SIZE
+
+# A validated frame: start, end, header size, dest, priority, TTL and its duplicate key,
+# (source, timestamp, type, payload CRC, attempt) with compact timestamps rebuilt from
+# the receive time
+Frame = Tuple[int, int, int, int, int, int, DuplicateKey]
+# (frames, checksum failures as (type, priority) from their unverified header, dropped)
+ScanResult = Tuple[List[Frame], List[Tuple[int, int]], int]
+# (channel, bytes, receive time)
+Chunk = Tuple[int, bytes, float]
+
+
+def scan_chunk(data: bytes, owned: int, rx_time: float,
+               max_payload: int = MAX_PAYLOAD) -> ScanResult:
+    """Validate every classic or compact frame starting in ``data[:owned]``
+
+    Like FrameSync, the scan resumes after the end of each valid frame and
+    one byte after a bad sync word. Frames of unknown type or priority are
+    counted as dropped (§4.3).
+    """
+    view = memoryview(data)
+    size = len(data)
+    frames: List[Frame] = []
+    failures: List[Tuple[int, int]] = []
+    dropped = 0
+    pos = 0
+    classic_at = compact_at = -1
+    while True:
+        # Only sync words that start before ``owned``; ``size`` means none left
+        if classic_at < pos:
+            classic_at = data.find(_SYNC, pos, owned + len(_SYNC) - 1) % (size + 1)
+        if compact_at < pos:
+            compact_at = data.find(_COMPACT_SIGNATURE, pos,
+                                   owned + len(_COMPACT_SIGNATURE) - 1) % (size + 1)
+        pos = min(classic_at, compact_at)
+        if pos >= size:
+            return frames, failures, dropped
+
+        if compact_at < classic_at:
+            if size - pos < _COMPACT_SIZE:
+                pos += 1
+                continue
+            (_, _, type_priority, source_id, dest_id, ttl, timestamp, payload_len,
+             checksum) = COMPACT_HEADER_STRUCT.unpack_from(data, pos)
+            attempt = 0
+            code = type_priority & 0x0F
+            packet_type = RoamENPacket.COMPACT_TYPES.get(code, code)
+            priority = type_priority >> 4
+            header_size = _COMPACT_SIZE
+            end = pos + _COMPACT_SIZE + payload_len
+            if payload_len > max_payload or end > size:
+                pos += 1
+                continue
+            valid = checksum == frame_checksum(view, pos, end, COMPACT_CHECKSUM_OFFSET)
+            if valid:
+                reference = int(rx_time)
+                timestamp = reference + ((timestamp - reference + 0x8000) & 0xFFFF) - 0x8000
+        else:
+            if size - pos < _CLASSIC_SIZE:
+                pos += 1
+                continue
+            (_, _, packet_type, source_id, dest_id, priority, ttl, timestamp, payload_len,
+             checksum, attempt) = HEADER_STRUCT.unpack_from(data, pos)
+            header_size = _CLASSIC_SIZE
+            end = pos + _CLASSIC_SIZE + payload_len
+            if payload_len > max_payload or end > size:
+                pos += 1
+                continue
+            valid = checksum == frame_checksum(view, pos, end)
+
+        if not valid:
+            failures.append((packet_type, priority))
+            pos += 1
+            continue
+        if packet_type in _TYPES and priority in _PRIORITIES:
+            frames.append((pos, end, header_size, dest_id, priority, ttl,
+                           (source_id, timestamp, packet_type,
+                            crc.crc16(view[pos + header_size:end]), attempt)))
+        else:
+            dropped += 1
+        pos = end
+
+
+# Worker side: shared-memory blocks attached once per process, by name
+_attached: Dict[str, shared_memory.SharedMemory] = {}
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    block = _attached.get(name)
+    if block is None:
+        try:
+            block = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:  # Python < 3.13: no ``track``
+            block = shared_memory.SharedMemory(name=name)
+        _attached[name] = block
+    return block
+
+
+def _scan_slot(name: str, offset: int, length: int, owned: int, rx_time: float,
+               max_payload: int) -> ScanResult:
+    # bytes.find needs a bytes object; this copy stays inside the worker
+    data = bytes(_attach(name).buf[offset:offset + length])
+    return scan_chunk(data, owned, rx_time, max_payload)
+
+
+class _Channel:
+    __slots__ = ('buffer', 'base', 'last_end', 'rx_time')
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.base = 0       # Stream offset of buffer[0]
+        self.last_end = 0   # Stream offset just past the last frame accepted
+        self.rx_time = 0.0
+
+
+class FrameView:
+    """Lazy view of a frame a worker validated, over its shared-memory slot
+
+    Header fields are the ones the worker parsed and the payload is read from
+    the slot only when accessed, so the parent decodes nothing per frame.
+    Fields are plain ints, as in ``PacketView``. A view is only valid until
+    the next one is requested, when its slot may be reused; call
+    ``to_packet()`` to keep a frame.
+    """
+
+    __slots__ = ('frame', 'buffer', 'base')
+
+    def __init__(self, frame: Frame, buffer: memoryview, base: int):
+        self.frame = frame
+        self.buffer = buffer
+        self.base = base  # Offset of the slot in ``buffer``
+
+    @property
+    def key(self) -> DuplicateKey:
+        """``packet_key`` of the frame, as computed by the worker"""
+        return self.frame[6]
+
+    @property
+    def packet_type(self) -> int:
+        return self.frame[6][2]
+
+    @property
+    def source_id(self) -> int:
+        return self.frame[6][0]
+
+    @property
+    def dest_id(self) -> int:
+        return self.frame[3]
+
+    @property
+    def priority(self) -> int:
+        return self.frame[4]
+
+    @property
+    def ttl(self) -> int:
+        return self.frame[5]
+
+    @property
+    def timestamp(self) -> int:
+        return self.frame[6][1]
+
+    @property
+    def attempt(self) -> int:
+        return self.frame[6][4]
+
+    @property
+    def compact(self) -> bool:
+        return self.frame[2] == _COMPACT_SIZE
+
+    @property
+    def payload(self) -> memoryview:
+        start, end, header_size = self.frame[:3]
+        return self.buffer[self.base + start + header_size:self.base + end]
+
+    def to_packet(self) -> RoamENPacket:
+        """Materialise a full RoamENPacket, copying the payload out"""
+        start, end, header_size, dest_id, priority, ttl, key = self.frame
+        source_id, timestamp, packet_type, _, attempt = key
+        packet = RoamENPacket(_TYPES[packet_type], source_id, dest_id, _PRIORITIES[priority],
+                              bytes(self.buffer[self.base + start + header_size:self.base + end]))
+        packet.ttl = ttl
+        packet.timestamp = timestamp
+        packet.attempt = attempt
+        packet.compact = header_size == _COMPACT_SIZE
+        return packet
+
+    def __repr__(self):
+        return (f"FrameView(type={self.packet_type:#04x}, src={self.source_id}, "
+                f"dst={self.dest_id}, pri={self.priority}, "
+                f"payload={self.frame[1] - self.frame[0] - self.frame[2]}B)")
+
+
+class _Pending:
+    __slots__ = ('result', 'slot', 'channel', 'base', 'rx_time')
+
+    def __init__(self, result: Union[Future, ScanResult], slot: int, channel: int, base: int,
+                 rx_time: float):
+        self.result = result
+        self.slot = slot
+        self.channel = channel
+        self.base = base
+        self.rx_time = rx_time
+
+
+class ReceivePipeline:
+    """Decodes several channels' byte streams on a pool of worker processes
+
+    Args:
+        workers: Worker processes (default: one per CPU); 0 decodes in
+            this process, through the same code path
+        chunk_size: Bytes of stream each task owns
+        in_flight: Chunks queued or decoding at once (default: 2 per worker)
+        cache: Duplicate suppression across channels (keys use receive time)
+        metrics: Where decoded frames and checksum failures are counted
+    """
+
+    def __init__(self, workers: Optional[int] = None, chunk_size: int = CHUNK_SIZE,
+                 max_payload: int = MAX_PAYLOAD, in_flight: Optional[int] = None,
+                 cache: Optional[DuplicateCache] = None,
+                 metrics: Optional[DecodeMetrics] = None):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.chunk_size = chunk_size
+        self.max_payload = max_payload
+        self.lookahead = RoamENPacket.HEADER_SIZE + max_payload
+        self.cache = cache or DuplicateCache(capacity=8192, clock=time.time)
+        self.metrics = METRICS if metrics is None else metrics
+        self.slot_size = chunk_size + self.lookahead
+        slots = in_flight or max(2 * self.workers, 2)
+        self._block = shared_memory.SharedMemory(create=True, size=slots * self.slot_size)
+        self._free = list(range(slots))
+        self._executor = ProcessPoolExecutor(self.workers) if self.workers else None
+        self._channels: Dict[int, _Channel] = {}
+        self._pending: Deque[_Pending] = deque()
+
+        self.chunks = 0
+        self.bytes = 0
+        self.frames = 0
+        self.duplicates = 0
+        self.overlapped = 0
+        self.checksum_failures = 0
+        self.dropped = 0
+
+    def __enter__(self) -> 'ReceivePipeline':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'workers': self.workers,
+            'chunks': self.chunks,
+            'bytes': self.bytes,
+            'frames': self.frames,
+            'duplicates': self.duplicates,
+            'overlapped': self.overlapped,
+            'checksum_failures': self.checksum_failures,
+            'dropped': self.dropped,
+        }
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if self._block is not None:
+            self._block.close()
+            self._block.unlink()
+            self._block = None
+
+    def packets(self, chunks: Iterable[Chunk]) -> Iterator[Tuple[int, float, RoamENPacket]]:
+        """Decode ``(channel, bytes, rx_time)`` chunks until they run out
+
+        Yields:
+            ``(channel, rx_time, packet)`` in arrival order, without duplicates
+        """
+        for channel_id, rx_time, view in self.views(chunks):
+            yield channel_id, rx_time, view.to_packet()
+
+    def views(self, chunks: Iterable[Chunk]) -> Iterator[Tuple[int, float, FrameView]]:
+        """``packets``, yielding lazy FrameViews instead of building packets
+
+        Yields:
+            ``(channel, rx_time, view)``; each view is valid until the next
+            item is requested
+        """
+        threshold = self.chunk_size + self.lookahead
+        for channel_id, data, rx_time in chunks:
+            channel = self._channels.get(channel_id)
+            if channel is None:
+                channel = self._channels[channel_id] = _Channel()
+            channel.buffer += data
+            channel.rx_time = rx_time
+            self.bytes += len(data)
+            while len(channel.buffer) >= threshold:
+                yield from self._submit(channel_id, channel, self.chunk_size)
+            # Hand back whatever has already been decoded, without waiting
+            while self._pending and self._done(self._pending[0]):
+                yield from self._complete(self._pending.popleft())
+
+        # End of input: the rest of every stream, with no lookahead to wait for
+        for channel_id, channel in self._channels.items():
+            if channel.buffer:
+                yield from self._submit(channel_id, channel, len(channel.buffer))
+        while self._pending:
+            yield from self._complete(self._pending.popleft())
+
+    def _submit(self, channel_id: int, channel: _Channel, owned: int):
+        while not self._free:
+            yield from self._complete(self._pending.popleft())
+        slot = self._free.pop()
+        length = min(len(channel.buffer), self.slot_size)
+        offset = slot * self.slot_size
+        self._block.buf[offset:offset + length] = channel.buffer[:length]
+        if self._executor is None:
+            result = scan_chunk(bytes(channel.buffer[:length]), owned, channel.rx_time,
+                                self.max_payload)
+        else:
+            result = self._executor.submit(_scan_slot, self._block.name, offset, length, owned,
+                                           channel.rx_time, self.max_payload)
+        self._pending.append(_Pending(result, slot, channel_id, channel.base, channel.rx_time))
+        del channel.buffer[:owned]
+        channel.base += owned
+        self.chunks += 1
+
+    @staticmethod
+    def _done(pending: _Pending) -> bool:
+        return not isinstance(pending.result, Future) or pending.result.done()
+
+    def _complete(self, pending: _Pending) -> Iterator[Tuple[int, float, FrameView]]:
+        result = pending.result
+        frames, failures, dropped = result.result() if isinstance(result, Future) else result
+        channel = self._channels[pending.channel]
+        metrics = self.metrics
+        for packet_type, priority in failures:
+            metrics.record_checksum_failure(packet_type, priority)
+        self.checksum_failures += len(failures)
+        self.dropped += dropped
+
+        # Frames never overlap within a chunk, so only a leading run can start
+        # inside the previous frame, which ran over from the last chunk
+        first = 0
+        while first < len(frames) and pending.base + frames[first][0] < channel.last_end:
+            first += 1
+        self.overlapped += first
+        if first == len(frames):
+            self._free.append(pending.slot)
+            return
+        channel.last_end = pending.base + frames[-1][1]
+        duplicates = self.cache.seen_many([frame[6] for frame in frames[first:]],
+                                          pending.rx_time)
+
+        buffer = self._block.buf
+        base = pending.slot * self.slot_size
+        counts: Dict[int, int] = {}
+        try:
+            for frame, duplicate in zip(frames[first:], duplicates):
+                if duplicate:
+                    self.duplicates += 1
+                    continue
+                key = frame[6][2] << 8 | frame[4]
+                counts[key] = counts.get(key, 0) + 1
+                yield pending.channel, pending.rx_time, FrameView(frame, buffer, base)
+        finally:
+            self._free.append(pending.slot)
+            for key, count in counts.items():
+                metrics.record_decoded(key >> 8, key & 0xFF, count)
+                self.frames += count
+
+
+def file_channels(paths: Sequence[Union[str, Path]], read_size: int = 4096,
+                  clock=time.time) -> Iterator[Chunk]:
+    """Stand-in for a multi-channel receiver: one byte-stream file per channel
+
+    Reads ``read_size`` bytes from each file in turn, as a receiver hands
+    over demodulated buffers, until every file is exhausted.
+    """
+    files = [open(path, 'rb') for path in paths]
+    try:
+        active = list(enumerate(files))
+        while active:
+            still_active = []
+            for channel, f in active:
+                data = f.read(read_size)
+                if data:
+                    yield channel, data, clock()
+                    still_active.append((channel, f))
+            active = still_active
+    finally:
+        for f in files:
+            f.close()
@@ -0,0 +1,275 @@
+"""Priority-preemptive transmit scheduler for the shared half-duplex channel"""
+
+import asyncio
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional
+
+from protocol.packet import PacketType, Priority, RoamENPacket
+
+# Net bit rates of the FreeDV modes we can run (bits/s)
+FREEDV_BITRATES = {
+    'freedv_700c': 700,
+    'freedv_700d': 700,
+    'freedv_700e': 700,
+    'freedv_1600': 1600,
+    'freedv_datac0': 291,
+    'freedv_datac1': 980,
+    'freedv_datac3': 321,
+}
+
+# Highest first: EMERGENCY_BROADCAST frames always go in the EMERGENCY queue
+LEVELS = (Priority.EMERGENCY, Priority.URGENT, Priority.NORMAL, Priority.INFO)
+
+LATENCY_SAMPLES = 1024  # Recent samples kept per priority for percentiles
+
+
+def airtime(frame_len: int, bitrate: int, overhead: float = 0.0) -> float:
+    """Seconds on air for a frame of ``frame_len`` bytes plus fixed overhead"""
+    return overhead + frame_len * 8 / bitrate
+
+
+def load_bitrate(config_path: str) -> int:
+    """Look up the bit rate for ``radio.mode`` in a node_config.yaml file"""
+    import yaml
+
+    with open(config_path) as f:
+        config = yaml.safe_load(f)
+    mode = config['radio']['mode']
+    if mode not in FREEDV_BITRATES:
+        raise ValueError(f"Unknown FreeDV mode: {mode}")
+    return FREEDV_BITRATES[mode]
+
+
+class _Frame:
+    __slots__ = ('frame', 'source_id', 'level', 'enqueued', 'airtime')
+
+    def __init__(self, frame: bytes, source_id: int, level: Priority,
+                 enqueued: float, airtime: float):
+        self.frame = frame
+        self.source_id = source_id
+        self.level = level
+        self.enqueued = enqueued
+        self.airtime = airtime
+
+
+class _LevelQueue:
+    """One priority level: a deficit round-robin over per-source FIFOs"""
+
+    def __init__(self, quantum: int):
+        self.quantum = quantum
+        self.sources: 'OrderedDict[int, Deque[_Frame]]' = OrderedDict()
+        self.deficit: Dict[int, int] = {}
+        self.depth = 0
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self.sent = 0
+        self.preempted = 0
+
+    def push(self, item: _Frame, front: bool = False):
+        queue = self.sources.get(item.source_id)
+        if queue is None:
+            queue = self.sources[item.source_id] = deque()
+            self.deficit[item.source_id] = 0
+        if front:
+            queue.appendleft(item)
+            self.sources.move_to_end(item.source_id, last=False)
+        else:
+            queue.append(item)
+        self.depth += 1
+
+    def pop(self) -> _Frame:
+        sources, deficit = self.sources, self.deficit
+        while True:
+            source_id, queue = next(iter(sources.items()))
+            size = len(queue[0].frame)
+            if deficit[source_id] >= size:
+                deficit[source_id] -= size
+                item = queue.popleft()
+                if not queue:
+                    del sources[source_id]
+                    del deficit[source_id]
+                self.depth -= 1
+                return item
+            deficit[source_id] += self.quantum
+            sources.move_to_end(source_id)
+
+
+class TxScheduler:
+    """Orders transmissions by priority with airtime accounting
+
+    Each priority level has its own queue; within a level, sources share
+    the channel by deficit round-robin on bytes, so one chatty node cannot
+    starve the others. EMERGENCY traffic (including EMERGENCY_BROADCAST)
+    preempts: a lower-priority frame that is on air when it arrives is
+    aborted and put back at the head of its queue.
+
+    Producers get backpressure from ``submit``, which waits while the
+    frame's priority queue is full.
+    """
+
+    def __init__(self, radio, bitrate: int = FREEDV_BITRATES['freedv_700d'],
+                 max_queue: int = 64, overhead: float = 0.0,
+                 duty_cycle: Optional[float] = None,
+                 quantum: int = RoamENPacket.HEADER_SIZE):
+        self.radio = radio
+        self.bitrate = bitrate
+        self.max_queue = max_queue
+        self.overhead = overhead
+        self.duty_cycle = duty_cycle
+        self._levels = {level: _LevelQueue(quantum) for level in LEVELS}
+        self._changed = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._putters: Deque[asyncio.Future] = deque()
+        self._current: Optional[_Frame] = None
+        self._tx_task: Optional[asyncio.Task] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._budget = 0.0
+        self._budget_at = 0.0
+        self.airtime_used = 0.0
+
+    @classmethod
+    def from_config(cls, radio, config_path: str, **kwargs) -> 'TxScheduler':
+        """Build a scheduler using the FreeDV mode from node_config.yaml"""
+        return cls(radio, bitrate=load_bitrate(config_path), **kwargs)
+
+    @staticmethod
+    def level_for(packet: RoamENPacket) -> Priority:
+        """Queue a packet is scheduled in"""
+        if packet.packet_type == PacketType.EMERGENCY_BROADCAST:
+            return Priority.EMERGENCY
+        return Priority(packet.priority)
+
+    async def submit(self, packet: RoamENPacket):
+        """Queue a packet, waiting while its priority queue is full"""
+        level = self.level_for(packet)
+        queue = self._levels[level]
+        while queue.depth >= self.max_queue:
+            waiter = asyncio.get_running_loop().create_future()
+            self._putters.append(waiter)
+            await waiter
+        self._enqueue(packet, level)
+
+    def submit_nowait(self, packet: RoamENPacket):
+        """Queue a packet or raise ``asyncio.QueueFull``"""
+        level = self.level_for(packet)
+        if self._levels[level].depth >= self.max_queue:
+            raise asyncio.QueueFull
+        self._enqueue(packet, level)
+
+    def _enqueue(self, packet: RoamENPacket, level: Priority):
+        frame = packet.pack()
+        now = asyncio.get_running_loop().time()
+        item = _Frame(frame, packet.source_id, level, now,
+                      airtime(len(frame), self.bitrate, self.overhead))
+        self._levels[level].push(item)
+        self._changed.set()
+
+        current = self._current
+        if (level == Priority.EMERGENCY and current is not None
+                and current.level != Priority.EMERGENCY and self._tx_task is not None):
+            self._tx_task.cancel()
+
+    def start(self) -> asyncio.Task:
+        """Run the scheduler loop as a background task"""
+        self._runner = asyncio.ensure_future(self.run())
+        return self._runner
+
+    async def stop(self):
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+
+    async def drain(self):
+        """Wait until every queued frame has been transmitted"""
+        while self.pending or self._current is not None:
+            self._idle.clear()
+            await self._idle.wait()
+
+    @property
+    def pending(self) -> int:
+        return sum(queue.depth for queue in self._levels.values())
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self._budget_at = loop.time()
+        while True:
+            item = self._next()
+            if item is None:
+                self._changed.clear()
+                self._idle.set()
+                await self._changed.wait()
+                continue
+
+            if self.duty_cycle and item.level != Priority.EMERGENCY:
+                await self._wait_for_budget(item)
+                if self._levels[Priority.EMERGENCY].depth:
+                    # EMERGENCY arrived while we were waiting: it goes first
+                    self._levels[item.level].push(item, front=True)
+                    continue
+
+            self._current = item
+            self._tx_task = asyncio.ensure_future(self.radio.transmit(item.frame, item.airtime))
+            try:
+                await asyncio.shield(self._tx_task)
+            except asyncio.CancelledError:
+                if not self._tx_task.cancelled():
+                    # The scheduler itself is being stopped
+                    self._tx_task.cancel()
+                    raise
+                # Preempted by EMERGENCY traffic: retry after it
+                level = self._levels[item.level]
+                level.preempted += 1
+                level.push(item, front=True)
+                continue
+            finally:
+                self._current = None
+                self._tx_task = None
+
+            self.airtime_used += item.airtime
+            self._budget -= item.airtime
+            level = self._levels[item.level]
+            level.sent += 1
+            level.latencies.append(loop.time() - item.enqueued)
+
+    def _next(self) -> Optional[_Frame]:
+        for level in LEVELS:
+            queue = self._levels[level]
+            if queue.depth:
+                item = queue.pop()
+                # Wake blocked producers; each re-checks its own queue
+                while self._putters:
+                    waiter = self._putters.popleft()
+                    if not waiter.done():
+                        waiter.set_result(None)
+                return item
+        return None
+
+    async def _wait_for_budget(self, item: _Frame):
+        """Token bucket over airtime: refills at ``duty_cycle`` seconds per second"""
+        loop = asyncio.get_running_loop()
+        burst = max(item.airtime, 1.0)
+        now = loop.time()
+        self._budget = min(burst, self._budget + (now - self._budget_at) * self.duty_cycle)
+        self._budget_at = now
+        if self._budget < item.airtime:
+            await asyncio.sleep((item.airtime - self._budget) / self.duty_cycle)
+            self._budget = item.airtime
+            self._budget_at = loop.time()
+
+    def metrics(self) -> dict:
+        """Queue depths and latency per priority, plus total airtime"""
+        result = {'airtime_used': self.airtime_used, 'levels': {}}
+        for level, queue in self._levels.items():
+            samples: List[float] = sorted(queue.latencies)
+            result['levels'][level.name] = {
+                'depth': queue.depth,
+                'sent': queue.sent,
+                'preempted': queue.preempted,
+                'latency_mean': sum(samples) / len(samples) if samples else 0.0,
+                'latency_p95': samples[int(len(samples) * 0.95)] if samples else 0.0,
+                'latency_max': samples[-1] if samples else 0.0,
+            }
+        return result
@@ -0,0 +1,402 @@
+"""Discrete-event simulation of a RoamEN mesh on one shared channel
+
+Nodes live on the floors of one building. A frame is heard on its own floor
+and on the floors directly above and below, each with its own loss rate.
+Frames that overlap in time on a floor destroy each other there (no
+capture effect), and a node cannot receive while it transmits. Nodes use
+carrier sense with random backoff; a transmission only becomes audible to
+carrier sense ``sense_delay`` seconds after it starts, which is the window
+in which collisions happen.
+
+Every frame on the channel is a real packed RoamEN frame: nodes build
+packets with the protocol helpers, receivers decode them with
+``RoamENPacket.unpack``, and relays forward what they decoded.
+"""
+
+import heapq
+import math
+import random
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from protocol.dedup import DuplicateCache, packet_key
+from protocol.packet import BeaconPacket, PacketType, Priority, RoamENPacket
+from protocol.routing import INITIAL_TTL
+from radio.scheduler import FREEDV_BITRATES, airtime
+
+BROADCAST = 0xFFFF
+
+# Event kinds, in the heap as (time, sequence, kind, argument)
+_BEACON = 0
+_MESSAGE = 1
+_TRY_TX = 2
+_TX_END = 3
+_MOVE = 4
+_RELAY = 5
+
+
+class _Tx:
+    __slots__ = ('node', 'floor', 'frame', 'packet', 'start', 'collided')
+
+    def __init__(self, node: int, floor: int, frame: bytes, packet: RoamENPacket,
+                 start: float):
+        self.node = node
+        self.floor = floor
+        self.frame = frame
+        self.packet = packet
+        self.start = start
+        self.collided = 0  # Bit g set: destroyed on floor g
+
+
+class MeshSimulator:
+    """A building of fixed and portable nodes sharing one FreeDV channel
+
+    Node IDs 1..``fixed`` are fixed infrastructure nodes, spread evenly
+    over the floors. They relay unicast traffic by flooding, with
+    DuplicateCache suppression. The remaining ``portable`` IDs are staff
+    nodes. They start on random floors and move between floors after
+    exponentially distributed dwell times.
+
+    All nodes beacon every ``beacon_interval`` (±10% jitter). If
+    ``message_rate`` is set, portable nodes also send TEXT_MESSAGEs to
+    random other portable nodes at that rate (messages per node per hour).
+    Beacon receptions are counted per floor in aggregate, using a binomial
+    draw over the nodes on each floor. Fixed nodes and message destinations
+    are simulated one by one, because they act on what they hear.
+
+    The event loop is a heap of plain tuples. An hour of beacons from 5,000
+    nodes is about 3.4 million events and takes well under a minute.
+    """
+
+    def __init__(self, fixed: int = 50, portable: int = 5000, floors: int = 10,
+                 mode: str = 'freedv_700d', beacon_interval: float = 30.0,
+                 message_rate: float = 0.0, floor_loss: Sequence[float] = (0.05, 0.5),
+                 sense_delay: float = 0.1, backoff: float = 1.0, max_backoff: float = 16.0,
+                 dwell: float = 900.0, queue_limit: int = 8, message_ttl: int = INITIAL_TTL,
+                 relay_jitter: float = 1.0, overhead: float = 0.0, seed: int = 1):
+        if floors > 62:
+            raise ValueError("At most 62 floors are supported")
+        self.fixed = fixed
+        self.portable = portable
+        self.floors = floors
+        self.bitrate = FREEDV_BITRATES[mode]
+        self.beacon_interval = beacon_interval
+        self.message_rate = message_rate
+        self.floor_loss = tuple(floor_loss)
+        self.sense_delay = sense_delay
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.dwell = dwell
+        self.queue_limit = queue_limit
+        self.message_ttl = message_ttl
+        self.relay_jitter = relay_jitter
+        self.overhead = overhead
+        self.rng = random.Random(seed)
+        self.np_rng = np.random.default_rng(seed)
+
+        nodes = fixed + portable + 1  # Index 0 is unused: node IDs start at 1
+        self.floor_of = [0] * nodes
+        self.on_floor = [0] * floors
+        self.fixed_on_floor: List[List[int]] = [[] for _ in range(floors)]
+        for node in range(1, nodes):
+            if node <= fixed:
+                floor = (node - 1) * floors // max(fixed, 1)
+                self.fixed_on_floor[floor].append(node)
+            else:
+                floor = self.rng.randrange(floors)
+            self.floor_of[node] = floor
+            self.on_floor[floor] += 1
+
+        self._queues: List[Optional[Deque[RoamENPacket]]] = [None] * nodes
+        self._transmitting = bytearray(nodes)
+        self._attempts = bytearray(nodes)
+        self._caches: Dict[int, DuplicateCache] = {
+            node: DuplicateCache(capacity=256, fingerprint_slots=1 << 10, clock=lambda: 0.0)
+            for node in range(1, fixed + 1)
+        }
+        self._copies: Dict[int, Dict[tuple, int]] = {node: {} for node in range(1, fixed + 1)}
+        self._active: List[List[_Tx]] = [[] for _ in range(floors)]
+        self._busy_since = [0.0] * floors
+        self._busy_time = [0.0] * floors
+        self._events: List[tuple] = []
+        self._sequence = 0
+        self._message_seq = 0
+        self._messages: Dict[tuple, float] = {}
+        self.now = 0.0
+
+        self.events = 0
+        self.transmissions = 0
+        self.collisions = 0
+        self.deferrals = 0
+        self.queue_drops = 0
+        self.beacons_replaced = 0
+        self.beacon_pairs = 0
+        self.beacon_received = 0
+        self.messages_sent = 0
+        self.latencies: List[float] = []
+        self.relays = 0
+        self.relays_suppressed = 0
+        self.moves = 0
+
+    def run(self, duration: float) -> dict:
+        """Simulate ``duration`` seconds from the start and return ``report()``"""
+        started = time.perf_counter()
+        rng = self.rng
+        for node in range(1, self.fixed + self.portable + 1):
+            self._schedule(rng.uniform(0, self.beacon_interval), _BEACON, node)
+            if node > self.fixed:
+                self._schedule(rng.expovariate(1 / self.dwell), _MOVE, node)
+                if self.message_rate:
+                    self._schedule(rng.expovariate(self.message_rate / 3600), _MESSAGE, node)
+
+        events = self._events
+        pop = heapq.heappop
+        while events and events[0][0] <= duration:
+            now, _, kind, arg = pop(events)
+            self.now = now
+            self.events += 1
+            if kind == _TRY_TX:
+                self._try_tx(arg)
+            elif kind == _TX_END:
+                self._tx_end(arg)
+            elif kind == _BEACON:
+                self._beacon(arg)
+            elif kind == _MOVE:
+                self._move(arg)
+            elif kind == _RELAY:
+                self._enqueue(*arg)
+            else:
+                self._message(arg)
+
+        self.now = duration
+        for floor, active in enumerate(self._active):
+            if active:
+                self._busy_time[floor] += duration - self._busy_since[floor]
+        return self.report(duration, time.perf_counter() - started)
+
+    def report(self, duration: float, wall: float) -> dict:
+        latencies = sorted(self.latencies)
+
+        def percentile(fraction: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))]
+
+        utilization = [busy / duration for busy in self._busy_time]
+        return {
+            'simulated_s': duration,
+            'wall_s': wall,
+            'speedup': duration / wall if wall else math.inf,
+            'events': self.events,
+            'transmissions': self.transmissions,
+            'collided': self.collisions,
+            'deferrals': self.deferrals,
+            'queue_drops': self.queue_drops,
+            'beacons_replaced': self.beacons_replaced,
+            'beacon_delivery': (self.beacon_received / self.beacon_pairs
+                                if self.beacon_pairs else 0.0),
+            'messages_sent': self.messages_sent,
+            'messages_delivered': len(latencies),
+            'message_delivery': len(latencies) / self.messages_sent if self.messages_sent else 0.0,
+            'latency_p50': percentile(0.5),
+            'latency_p95': percentile(0.95),
+            'latency_p99': percentile(0.99),
+            'relays': self.relays,
+            'relays_suppressed': self.relays_suppressed,
+            'utilization_mean': sum(utilization) / len(utilization),
+            'utilization_max': max(utilization),
+            'moves': self.moves,
+        }
+
+    def _schedule(self, at: float, kind: int, arg):
+        self._sequence += 1
+        heapq.heappush(self._events, (at, self._sequence, kind, arg))
+
+    def _enqueue(self, node: int, packet: RoamENPacket):
+        queue = self._queues[node]
+        if queue is None:
+            queue = self._queues[node] = deque()
+        if len(queue) >= self.queue_limit:
+            self.queue_drops += 1
+            return
+        queue.append(packet)
+        if len(queue) == 1 and not self._transmitting[node]:
+            self._schedule(self.now, _TRY_TX, node)
+
+    def _beacon(self, node: int):
+        interval = self.beacon_interval
+        self._schedule(self.now + self.rng.uniform(0.9 * interval, 1.1 * interval), _BEACON, node)
+        queue = self._queues[node]
+        if queue:
+            # A beacon still waiting for the channel is replaced, not queued behind
+            for index, packet in enumerate(queue):
+                if packet.packet_type == PacketType.BEACON:
+                    queue[index] = self._beacon_packet(node)
+                    self.beacons_replaced += 1
+                    return
+        self._enqueue(node, self._beacon_packet(node))
+
+    def _beacon_packet(self, node: int) -> RoamENPacket:
+        packet = BeaconPacket.create(node, f"ROAM-{node:04d}")
+        packet.timestamp = int(self.now)
+        return packet
+
+    def _message(self, node: int):
+        self._schedule(self.now + self.rng.expovariate(self.message_rate / 3600), _MESSAGE, node)
+        dest = self.rng.randrange(self.fixed + 1, self.fixed + self.portable)
+        if dest >= node:
+            dest += 1
+        self._message_seq += 1
+        packet = RoamENPacket(PacketType.TEXT_MESSAGE, node, dest, Priority.NORMAL,
+                              b"msg %d" % self._message_seq)
+        packet.timestamp = int(self.now)
+        packet.ttl = self.message_ttl
+        self._messages[packet_key(packet)] = self.now
+        self.messages_sent += 1
+        self._enqueue(node, packet)
+
+    def _move(self, node: int):
+        self._schedule(self.now + self.rng.expovariate(1 / self.dwell), _MOVE, node)
+        old = self.floor_of[node]
+        if self.rng.random() < 0.8:
+            new = min(max(old + self.rng.choice((-1, 1)), 0), self.floors - 1)
+        else:
+            new = self.rng.randrange(self.floors)  # Took the lift
+        if new != old and not self._transmitting[node]:
+            self.on_floor[old] -= 1
+            self.on_floor[new] += 1
+            self.floor_of[node] = new
+            self.moves += 1
+
+    def _carrier_busy(self, floor: int) -> bool:
+        audible_from = self.now - self.sense_delay
+        for tx in self._active[floor]:
+            if tx.start <= audible_from:
+                return True
+        return False
+
+    def _try_tx(self, node: int):
+        queue = self._queues[node]
+        if not queue or self._transmitting[node]:
+            return
+        floor = self.floor_of[node]
+        if self._carrier_busy(floor):
+            self.deferrals += 1
+            attempts = min(self._attempts[node] + 1, 16)
+            self._attempts[node] = attempts
+            window = min(self.backoff * (1 << min(attempts - 1, 8)), self.max_backoff)
+            self._schedule(self.now + self.rng.uniform(0, window), _TRY_TX, node)
+            return
+
+        packet = queue.popleft()
+        if packet.source_id != node and self._suppressed(node, packet):
+            self.relays_suppressed += 1
+            if queue:
+                self._schedule(self.now, _TRY_TX, node)
+            return
+
+        self._attempts[node] = 0
+        frame = packet.pack()
+        end = self.now + airtime(len(frame), self.bitrate, self.overhead)
+        tx = _Tx(node, floor, frame, packet, self.now)
+        self._transmitting[node] = 1
+        self.transmissions += 1
+        for heard in range(max(floor - 1, 0), min(floor + 2, self.floors)):
+            active = self._active[heard]
+            if active:
+                bit = 1 << heard
+                tx.collided |= bit
+                for other in active:
+                    other.collided |= bit
+            else:
+                self._busy_since[heard] = self.now
+            active.append(tx)
+        self._schedule(end, _TX_END, tx)
+
+    def _tx_end(self, tx: _Tx):
+        now = self.now
+        self._transmitting[tx.node] = 0
+        for heard in range(max(tx.floor - 1, 0), min(tx.floor + 2, self.floors)):
+            active = self._active[heard]
+            active.remove(tx)
+            if not active:
+                self._busy_time[heard] += now - self._busy_since[heard]
+        if tx.collided:
+            self.collisions += 1
+        if self._queues[tx.node]:
+            self._schedule(now, _TRY_TX, tx.node)
+
+        decoded = None
+        beacon = tx.packet.packet_type == PacketType.BEACON
+        binomial = self.np_rng.binomial
+        random_ = self.rng.random
+        for heard in range(max(tx.floor - 1, 0), min(tx.floor + 2, self.floors)):
+            loss = self.floor_loss[abs(heard - tx.floor)]
+            listeners = self.on_floor[heard] - (heard == tx.floor)
+            clear = not tx.collided >> heard & 1
+            if beacon:
+                self.beacon_pairs += listeners
+                if clear and listeners:
+                    self.beacon_received += int(binomial(listeners, 1 - loss))
+                continue
+            if not clear:
+                continue
+
+            for node in self.fixed_on_floor[heard]:
+                if node != tx.node and random_() >= loss:
+                    if decoded is None:
+                        decoded = RoamENPacket.unpack(tx.frame)
+                    self._fixed_heard(node, decoded)
+            dest = tx.packet.dest_id
+            if dest != BROADCAST and dest > self.fixed and self.floor_of[dest] == heard:
+                if random_() >= loss:
+                    if decoded is None:
+                        decoded = RoamENPacket.unpack(tx.frame)
+                    self._delivered(decoded)
+
+    def _fixed_heard(self, node: int, packet: RoamENPacket):
+        key = packet_key(packet)
+        copies = self._copies[node]
+        copies[key] = copies.get(key, 0) + 1
+        if packet.source_id == node or self._caches[node].seen(key, self.now):
+            return
+        if packet.dest_id == node or packet.ttl <= 1:
+            return
+        relayed = RoamENPacket(packet.packet_type, packet.source_id, packet.dest_id,
+                               packet.priority, packet.payload)
+        relayed.timestamp = packet.timestamp
+        relayed.ttl = packet.ttl - 1
+        self.relays += 1
+        # Random hold-off so fixed nodes that heard the same frame do not all key up at once
+        self._schedule(self.now + self.rng.uniform(0, self.relay_jitter), _RELAY, (node, relayed))
+
+    def _suppressed(self, node: int, packet: RoamENPacket) -> bool:
+        """Counter-based flood suppression: skip a relay others already covered"""
+        copies = self._copies.get(node)
+        return copies is not None and copies.get(packet_key(packet), 0) >= 3
+
+    def _delivered(self, packet: RoamENPacket):
+        sent_at = self._messages.pop(packet_key(packet), None)
+        if sent_at is not None:
+            self.latencies.append(self.now - sent_at)
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    """``python -m sim.mesh [portable] [fixed] [seconds] [messages/node/hour]``"""
+    import sys
+
+    args = list(sys.argv[1:] if argv is None else argv)
+    portable = int(args[0]) if len(args) > 0 else 5000
+    fixed = int(args[1]) if len(args) > 1 else 50
+    duration = float(args[2]) if len(args) > 2 else 3600.0
+    rate = float(args[3]) if len(args) > 3 else 0.0
+    report = MeshSimulator(fixed=fixed, portable=portable, message_rate=rate).run(duration)
+    for name, value in report.items():
+        print(f"{name:20s} {value:.4g}" if isinstance(value, float) else f"{name:20s} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark GIF assembly: the old all-frames-in-memory save vs the streaming writer
+Reports wall time, peak RSS and output size for the demo screenshots and for
+a longer 1080p sequence with repeated frames, as a frequent capture would give.
+Each run happens in a fresh interpreter, so peak RSS is not shared between them.
+"""
+
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+from create_gif import FRAME_DURATION, write_gif
+
+SCREENSHOTS = Path(__file__).parent / "screenshots"
+HOLD = 6  # Captures per screenshot in the long sequence
+
+
+def save_all(paths, output_file):
+    """create_gif() before streaming: every frame open at once, Pillow's optimizer"""
+    images = [Image.open(path) for path in paths]
+    images[0].save(output_file, save_all=True, append_images=images[1:],
+                   duration=FRAME_DURATION, loop=0, optimize=True)
+
+
+def long_sequence(directory):
+    """Every screenshot at 1920x1080, held for HOLD captures with a ticking clock"""
+    paths = []
+    for source in sorted(SCREENSHOTS.glob("*.png")):
+        with Image.open(source) as image:
+            frame = image.convert('RGB').resize((1920, 1080), Image.Resampling.LANCZOS)
+        for tick in range(HOLD):
+            if tick:
+                ImageDraw.Draw(frame).text((1800, 20), f"00:0{tick}", fill=(255, 255, 255))
+            paths.append(Path(directory) / f"{len(paths):04d}.png")
+            frame.save(paths[-1], compress_level=1)
+    return paths
+
+
+def run(impl, paths, output_file):
+    """Child process: build one GIF and print its measurements as JSON"""
+    start = time.perf_counter()
+    if impl == 'old':
+        save_all(paths, output_file)
+    elif impl == 'streaming':
+        write_gif(paths, output_file)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        'seconds': elapsed,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'bytes': Path(output_file).stat().st_size if impl != 'idle' else 0,
+    }))
+
+
+def measure(impl, paths, output_file):
+    result = subprocess.run([sys.executable, __file__, '--run', impl, str(output_file),
+                             *map(str, paths)], capture_output=True, text=True, check=True,
+                            cwd=Path(__file__).parent)
+    return json.loads(result.stdout)
+
+
+def main():
+    if not any(SCREENSHOTS.glob("*.png")):
+        print("❌ No screenshots found. Run generate_screenshots.py first.")
+        return
+    idle = measure('idle', [], '/dev/null')
+    print(f"🐍 Interpreter with Pillow loaded: {idle['peak_rss_mb']:.0f} MB RSS")
+
+    with tempfile.TemporaryDirectory() as directory:
+        cases = {
+            'demo screenshots': sorted(SCREENSHOTS.glob("*.png")),
+            f'1080p, {HOLD} captures each': long_sequence(directory),
+        }
+        for name, paths in cases.items():
+            with Image.open(paths[0]) as image:
+                size = image.size
+            print(f"\n🎞️  {name}: {len(paths)} frames at {size[0]}x{size[1]}")
+            for impl in ('old', 'streaming'):
+                result = measure(impl, paths, Path(directory) / f"{impl}.gif")
+                print(f"   {impl:10s} {result['seconds']:6.2f}s  "
+                      f"{result['peak_rss_mb']:7.1f} MB peak RSS  "
+                      f"{result['bytes'] / 1024:8.0f} KB")
+    print("\n✅ Done")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ['--run']:
+        run(sys.argv[2], [Path(path) for path in sys.argv[4:]], sys.argv[3])
+    else:
+        main()
@@ -1,10 +1,110 @@
 #!/usr/bin/env python3
 """
 Create an animated GIF from screenshots using PIL/Pillow
+
+Frames are streamed to the file rather than collected in memory: each PNG
+is opened only when it is needed, mapped onto one palette shared by the
+whole animation, and compared with the frame currently on screen. A frame
+that (almost) matches it just extends that frame's display time; otherwise
+only the rectangle that changed is encoded. Peak memory is about two frames,
+whatever the frame count.
 """
 
 from pathlib import Path
-from PIL import Image
+from PIL import GifImagePlugin, Image, ImageChops
+
+FRAME_DURATION = 5000      # ms each screenshot is shown for
+MAX_DELAY = 65535 * 10     # Longest delay one GIF frame can hold (ms)
+SAMPLE_PIXELS = 1 << 20    # Pixels of downscaled frames the palette is built from
+NEAR_IDENTICAL = 0.001     # Changed pixels (fraction) below which frames merge
+
+
+def build_palette(paths, colors=256):
+    """One palette for every frame, quantized from a downscaled strip of them all
+
+    Frames are shrunk with nearest-neighbour sampling, so the strip holds the
+    UI's real colours rather than blends of them, and are opened one at a time.
+    """
+    with Image.open(paths[0]) as first:
+        width, height = first.size
+    scale = min(1.0, (SAMPLE_PIXELS / (width * height * len(paths))) ** 0.5)
+    size = (max(1, int(width * scale)), max(1, int(height * scale)))
+    strip = Image.new('RGB', (size[0], size[1] * len(paths)))
+    for i, path in enumerate(paths):
+        with Image.open(path) as image:
+            strip.paste(image.convert('RGB').resize(size, Image.Resampling.NEAREST),
+                        (0, size[1] * i))
+    return strip.quantize(colors)
+
+
+def write_gif(paths, output_file, duration=FRAME_DURATION, loop=0,
+              threshold=NEAR_IDENTICAL):
+    """Stream ``paths`` into an animated GIF at ``output_file``
+
+    Args:
+        paths: Frame images in display order, all the same size
+        output_file: Where to write the GIF
+        duration: How long each input frame is shown (ms)
+        loop: Times to loop; 0 loops forever
+        threshold: Fraction of changed pixels at or below which a frame is
+            merged into the one before it
+
+    Returns:
+        Dict with the frames read, frames written, frames merged and bytes written
+    """
+    paths = [Path(path) for path in paths]
+    palette = build_palette(paths)
+    stats = {'read': 0, 'written': 0, 'merged': 0, 'bytes': 0}
+
+    with open(output_file, 'wb') as fp:
+        shown = None    # Canvas as a viewer will show it after the pending frame
+        pending = None  # (image, offset, duration): written once its duration is final
+
+        def flush():
+            image, offset, delay = pending
+            # Disposal 1: leave each frame in place, so the next only draws its changes
+            for data in GifImagePlugin.getdata(image, offset, duration=delay, disposal=1):
+                fp.write(data)
+            stats['written'] += 1
+
+        for path in paths:
+            with Image.open(path) as image:
+                frame = image.convert('RGB').quantize(palette=palette,
+                                                      dither=Image.Dither.NONE)
+            stats['read'] += 1
+
+            if shown is None:
+                header, _ = GifImagePlugin.getheader(frame, info={'loop': loop,
+                                                                  'duration': duration})
+                for data in header:
+                    fp.write(data)
+                shown, pending = frame, (frame, (0, 0), duration)
+                continue
+            if frame.size != shown.size:
+                raise ValueError(f"{path.name} is {frame.size}, not {shown.size}")
+
+            diff = ImageChops.difference(shown, frame)
+            changed = frame.width * frame.height - diff.histogram()[0]
+            if changed <= threshold * frame.width * frame.height:
+                if pending[2] + duration <= MAX_DELAY:
+                    pending = pending[:2] + (pending[2] + duration,)
+                    stats['merged'] += 1
+                    continue
+                # Too long for one delay: redraw a pixel that is already on screen
+                update, offset = shown.crop((0, 0, 1, 1)), (0, 0)
+            else:
+                box = diff.getbbox()
+                update, offset = frame.crop(box), box[:2]
+                shown = frame  # Everything outside the box already matched
+
+            flush()
+            pending = (update, offset, duration)
+
+        if pending is not None:
+            flush()
+            fp.write(b';')  # Trailer
+        stats['bytes'] = fp.tell()
+    return stats
 
 
 def create_gif():
@@ -28,46 +128,22 @@ def create_gif():
         return False
 
     print(f"📸 Found {len(images_paths)} screenshots")
-    print(f"⏱️  Duration per frame: 5s")
+    print(f"⏱️  Duration per frame: {FRAME_DURATION // 1000}s")
     print()
 
-    # Load images
-    print("📂 Loading images...")
-    images = []
-    for i, img_path in enumerate(images_paths, 1):
-        img = Image.open(img_path)
-        # Resize for smaller file size if needed
-        # img = img.resize((img.width // 2, img.height // 2), Image.Resampling.LANCZOS)
-        images.append(img)
-        print(f"   ✓ {img_path.name}")
-
-    if not images:
-        print("❌ No images loaded")
-        return False
-
-    print()
     print("🎨 Creating animated GIF...")
-
-    # Save as animated GIF
-    # duration=5000 means 5000ms = 5 seconds per frame
-    images[0].save(
-        output_file,
-        save_all=True,
-        append_images=images[1:],
-        duration=5000,  # milliseconds
-        loop=0,  # loop forever
-        optimize=True
-    )
+    stats = write_gif(images_paths, output_file)
 
     # Get file size
     file_size_mb = output_file.stat().st_size / (1024 * 1024)
-    total_duration = len(images) * 5
+    total_duration = len(images_paths) * FRAME_DURATION // 1000
 
     print()
     print("✅ Animated GIF created!")
     print(f"📹 Output: {output_file}")
     print(f"📦 Size: {file_size_mb:.2f} MB")
-    print(f"⏱️  Duration: {total_duration}s ({len(images)} frames)")
+    print(f"⏱️  Duration: {total_duration}s ({stats['written']} frames, "
+          f"{stats['merged']} unchanged screenshot(s) merged)")
     print()
     print("💡 Tip: Open in browser or image viewer to see animation")
     print()
@@ -2,122 +2,201 @@
 """
 Generate screenshots of the RoamEN UI at key moments during the demo
 This creates a series of PNG images showing different features
+
+The demo page runs on Playwright's emulated clock, so each shot jumps
+straight to its moment instead of waiting for it in real time, and every
+shot is taken in its own browser context, all in parallel. A shot is
+skipped when its PNG exists and index.html, the assets it loads and the
+shot's own settings are unchanged since it was taken (the hashes are kept
+in screenshots/manifest.json).
+
+    python3 generate_screenshots.py [--force] [--jobs N]
 """
 
+import argparse
 import asyncio
+import hashlib
+import json
 import os
+import re
+import time
 from pathlib import Path
 from playwright.async_api import async_playwright
 
+# Page time the original real-time capture waited for after loading, before
+# counting shot times; the demo itself starts 1s after the load event
+SETTLE_MS = 2000
+
+# Wall-clock time the page sees when it loads, with the clock paused there, so
+# the times shown in the UI are the same on every run
+CLOCK_INSTALL = '2025-01-01T08:59:59Z'
+DEMO_EPOCH = '2025-01-01T09:00:00Z'
+
+ASSET_PATTERN = re.compile(r'<(?:script|link)\b[^>]*?(?:src|href)="([^":]+)"')
+
+# Screenshots at key moments (ms after SETTLE_MS)
+SCREENSHOTS = [
+    {
+        'name': '01-startup',
+        'time': 500,
+        'description': 'Initial startup screen'
+    },
+    {
+        'name': '02-messages',
+        'time': 8000,
+        'description': 'Message exchange view'
+    },
+    {
+        'name': '03-standard-alert',
+        'time': 11000,
+        'description': 'Standard alert notification'
+    },
+    {
+        'name': '04-alerts-view',
+        'time': 14000,
+        'description': 'Alerts view with multiple alerts'
+    },
+    {
+        'name': '05-urgent-alert',
+        'time': 17000,
+        'description': 'Urgent alert (power failure)'
+    },
+    {
+        'name': '06-voice-communication',
+        'time': 22000,
+        'description': 'Voice communication interface'
+    },
+    {
+        'name': '07-network-mesh',
+        'time': 26000,
+        'description': 'Network mesh visualization'
+    },
+    {
+        'name': '08-emergency-alert',
+        'time': 36000,
+        'description': 'Emergency alert modal'
+    },
+    {
+        'name': '09-alerts-list',
+        'time': 43000,
+        'description': 'Full alerts list'
+    },
+    {
+        'name': '10-final-messages',
+        'time': 48000,
+        'description': 'Final message coordination'
+    }
+]
+
 
 class ScreenshotGenerator:
-    def __init__(self):
+    def __init__(self, force=False, jobs=None):
         self.width = 1280
         self.height = 720
-        self.output_dir = Path(__file__).parent / "screenshots"
+        self.base_dir = Path(__file__).parent
+        self.output_dir = self.base_dir / "screenshots"
+        self.manifest_path = self.output_dir / "manifest.json"
+        self.force = force
+        self.jobs = jobs or os.cpu_count() or 1
+
+    def input_hash(self):
+        """Hash of index.html and every local script and stylesheet it loads"""
+        html_path = self.base_dir / 'index.html'
+        html = html_path.read_bytes()
+        digest = hashlib.sha256(html)
+        for asset in sorted(set(ASSET_PATTERN.findall(html.decode('utf-8')))):
+            asset_path = self.base_dir / asset
+            digest.update(asset.encode())
+            digest.update(asset_path.read_bytes() if asset_path.exists() else b'')
+        return digest.hexdigest()
+
+    def shot_hash(self, shot, inputs):
+        """Key for one shot: the page's inputs plus everything about the shot itself"""
+        spec = json.dumps([inputs, shot['time'], self.width, self.height, SETTLE_MS, DEMO_EPOCH])
+        return hashlib.sha256(spec.encode()).hexdigest()
+
+    def load_manifest(self):
+        try:
+            return json.loads(self.manifest_path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    async def capture(self, browser, shot, semaphore):
+        """Take one shot in a fresh context, fast-forwarding its clock to the moment"""
+        async with semaphore:
+            context = await browser.new_context(
+                viewport={'width': self.width, 'height': self.height},
+                timezone_id='UTC',
+            )
+            try:
+                page = await context.new_page()
+                await page.clock.install(time=CLOCK_INSTALL)
+                await page.clock.pause_at(DEMO_EPOCH)
+                html_path = self.base_dir / 'index.html'
+                await page.goto(f'file://{html_path.absolute()}')
+
+                # Fire every timer due by then: the demo steps run in order
+                await page.clock.run_for(SETTLE_MS + shot['time'])
+
+                output_path = self.output_dir / f"{shot['name']}.png"
+                # CSS transitions run on real time, so finish them before capturing
+                await page.screenshot(path=str(output_path), full_page=False,
+                                      animations='disabled')
+                return output_path
+            finally:
+                await context.close()
 
     async def generate(self):
         print("📸 Generating RoamEN UI Screenshots...")
         print(f"📐 Resolution: {self.width}x{self.height}")
+        start = time.perf_counter()
 
         # Create output directory
         self.output_dir.mkdir(exist_ok=True)
         print(f"📁 Output directory: {self.output_dir}")
         print()
 
-        async with async_playwright() as p:
-            # Launch browser
-            print("🌐 Launching browser...")
-            browser = await p.chromium.launch(
-                headless=True,
-                args=[
-                    '--no-sandbox',
-                    '--disable-setuid-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-accelerated-2d-canvas',
-                    '--disable-gpu',
-                    '--single-process',
-                ]
-            )
-
-            page = await browser.new_page(
-                viewport={'width': self.width, 'height': self.height}
-            )
-
-            # Navigate to demo page
-            html_path = Path(__file__).parent / 'index.html'
-            await page.goto(f'file://{html_path.absolute()}')
-            await page.wait_for_timeout(2000)
-
-            # Screenshots at key moments
-            screenshots = [
-                {
-                    'name': '01-startup',
-                    'time': 500,
-                    'description': 'Initial startup screen'
-                },
-                {
-                    'name': '02-messages',
-                    'time': 8000,
-                    'description': 'Message exchange view'
-                },
-                {
-                    'name': '03-standard-alert',
-                    'time': 11000,
-                    'description': 'Standard alert notification'
-                },
-                {
-                    'name': '04-alerts-view',
-                    'time': 14000,
-                    'description': 'Alerts view with multiple alerts'
-                },
-                {
-                    'name': '05-urgent-alert',
-                    'time': 17000,
-                    'description': 'Urgent alert (power failure)'
-                },
-                {
-                    'name': '06-voice-communication',
-                    'time': 22000,
-                    'description': 'Voice communication interface'
-                },
-                {
-                    'name': '07-network-mesh',
-                    'time': 26000,
-                    'description': 'Network mesh visualization'
-                },
-                {
-                    'name': '08-emergency-alert',
-                    'time': 36000,
-                    'description': 'Emergency alert modal'
-                },
-                {
-                    'name': '09-alerts-list',
-                    'time': 43000,
-                    'description': 'Full alerts list'
-                },
-                {
-                    'name': '10-final-messages',
-                    'time': 48000,
-                    'description': 'Final message coordination'
-                }
-            ]
-
-            for i, shot in enumerate(screenshots, 1):
-                # Wait until the specified time
-                await page.wait_for_timeout(shot['time'] if i == 1 else (shot['time'] - screenshots[i-2]['time']))
-
-                # Take screenshot
-                output_path = self.output_dir / f"{shot['name']}.png"
-                await page.screenshot(path=str(output_path), full_page=False)
-
-                print(f"✅ [{i}/{len(screenshots)}] {shot['description']}")
-                print(f"   📸 {output_path.name}")
-
-            await browser.close()
+        inputs = self.input_hash()
+        manifest = {} if self.force else self.load_manifest()
+        pending = []
+        for shot in SCREENSHOTS:
+            key = self.shot_hash(shot, inputs)
+            if (manifest.get(shot['name']) == key
+                    and (self.output_dir / f"{shot['name']}.png").exists()):
+                print(f"⏭️  {shot['description']} (unchanged)")
+            else:
+                pending.append((shot, key))
+
+        if pending:
+            async with async_playwright() as p:
+                # Launch browser
+                print(f"🌐 Launching browser ({len(pending)} shot(s), {self.jobs} at a time)...")
+                browser = await p.chromium.launch(
+                    headless=True,
+                    args=[
+                        '--no-sandbox',
+                        '--disable-setuid-sandbox',
+                        '--disable-dev-shm-usage',
+                        '--disable-accelerated-2d-canvas',
+                        '--disable-gpu',
+                    ]
+                )
+
+                semaphore = asyncio.Semaphore(self.jobs)
+                tasks = [self.capture(browser, shot, semaphore) for shot, _ in pending]
+                try:
+                    for i, (output_path, (shot, key)) in enumerate(
+                            zip(await asyncio.gather(*tasks), pending), 1):
+                        manifest[shot['name']] = key
+                        print(f"✅ [{i}/{len(pending)}] {shot['description']}")
+                        print(f"   📸 {output_path.name}")
+                finally:
+                    await browser.close()
+
+            self.manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True) + '\n')
 
         print()
-        print("🎉 All screenshots generated!")
+        print(f"🎉 All screenshots up to date in {time.perf_counter() - start:.1f}s!")
         print(f"📁 Location: {self.output_dir}")
 
         # List all generated files
@@ -127,7 +206,14 @@ class ScreenshotGenerator:
 
 
 async def main():
-    generator = ScreenshotGenerator()
+    parser = argparse.ArgumentParser(description="Generate RoamEN UI demo screenshots")
+    parser.add_argument('--force', action='store_true',
+                        help="retake every shot, even if its inputs are unchanged")
+    parser.add_argument('--jobs', type=int,
+                        help="browser contexts to run at once (default: CPU count)")
+    args = parser.parse_args()
+
+    generator = ScreenshotGenerator(force=args.force, jobs=args.jobs)
     try:
         await generator.generate()
     except Exception as e: